@@ -0,0 +1,8 @@
+import hashlib
+
+
+def get_account_key(email: str) -> str:
+    """
+    Returns a stable, file system safe key for the account that does not reveal the email.
+    """
+    return hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()[:16]
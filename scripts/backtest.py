@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+from scripts.columns import DATE_COLUMN
+from scripts.daily_series import DailyWeightSeries
+from scripts.predictions import (
+    DAYS_PER_WEEK,
+    LOOK_BACK_DAYS,
+    forecast_remaining_days_weights,
+)
+from scripts.process import COPY_ON_WRITE_OPTION, process_weekly_data
+from scripts.process_weight_data import BACKEND_PANDAS, process_weight_data
+from scripts.trend import BASIS_MOVING_AVERAGE
+
+
+def backtest(
+    daily_series: DailyWeightSeries,
+    backend: str = BACKEND_PANDAS,
+    basis: str = BASIS_MOVING_AVERAGE,
+) -> pd.DataFrame:
+    """
+    Replay DailyWeightForecaster over the full history: for every completed week, the
+    forecasts it would have made at the end of each day before it (7 to 1 remaining days)
+    are compared with the weights that were measured.
+
+    The moving averages and the targets only depend on the days before them, so the weekly
+    table is processed once for the whole history instead of once per forecast, and it
+    holds the target every week had at its time. All forecasts of all weeks are then made in
+    a single batched call, which keeps the backtest linear in the length of the history.
+
+    Returns:
+        pd.DataFrame: One row per backtested week, indexed by the date of its Sunday:
+        - ``target_weight_7d``: The target of the week.
+        - ``weight_7d``: The 7d moving average the week ended with.
+        - ``target_error``: How far the week ended from its target.
+        - ``forecast_mean_absolute_error``: The mean absolute difference of all forecasted
+          weights of the week to the measured ones.
+        - ``correctness_mismatches``: How many of the 7 forecasts failed the check of the
+          forecaster, i.e. the week would not have averaged the target with them.
+    """
+    with pd.option_context(COPY_ON_WRITE_OPTION, True):
+        df_weekly = process_weekly_data(
+            process_weight_data(weight_dataframe_creator=daily_series, backend=backend),
+            backend=backend,
+            basis=basis,
+            measured=daily_series.measured,
+        )
+    # the last row is the current week, which is not completed
+    df_weekly = df_weekly.iloc[:-1]
+
+    sundays = (
+        df_weekly[DATE_COLUMN].to_numpy().astype("datetime64[D]").astype(np.int64)
+        - daily_series.start_day
+    )
+    # the first forecast of a week needs the days before its Monday
+    backtested_weeks = sundays - DAYS_PER_WEEK - LOOK_BACK_DAYS + 1 >= 0
+    df_weekly = df_weekly[backtested_weeks]
+    sundays = sundays[backtested_weeks]
+    target_weights = df_weekly["target_weight_7d"].to_numpy()
+
+    weights = daily_series.weights.astype(np.float64)
+    # the weights of the weeks, Monday to Sunday
+    week_weights = weights[sundays[:, np.newaxis] + np.arange(-DAYS_PER_WEEK + 1, 1)]
+    forecasted_week_weights = _forecast_week_weights(weights, sundays, target_weights)
+
+    forecast_errors = forecasted_week_weights - week_weights[:, np.newaxis, :]
+    # the passed days are measured, the remaining ones forecasted
+    targeted_week_weights = np.where(
+        np.isnan(forecasted_week_weights),
+        week_weights[:, np.newaxis, :],
+        forecasted_week_weights,
+    )
+    average_targeted_weights = np.rint(targeted_week_weights.mean(axis=2))
+
+    weight_7d = week_weights.mean(axis=1)
+    return pd.DataFrame(
+        {
+            "target_weight_7d": target_weights,
+            "weight_7d": weight_7d,
+            "target_error": weight_7d - target_weights,
+            "forecast_mean_absolute_error": np.nanmean(
+                np.abs(forecast_errors), axis=(1, 2)
+            ),
+            "correctness_mismatches": (
+                average_targeted_weights != target_weights[:, np.newaxis]
+            ).sum(axis=1),
+        },
+        index=pd.DatetimeIndex(df_weekly[DATE_COLUMN], name=DATE_COLUMN),
+    )
+
+
+def _forecast_week_weights(
+    weights: np.ndarray, sundays: np.ndarray, target_weights: np.ndarray
+) -> np.ndarray:
+    """
+    Returns the forecasts of the weeks ending on the Sundays (indices into ``weights``) as
+    weeks x forecasts x days: one forecast per number of remaining days (7 to 1), made at the
+    end of the day before, aligned with the days of the week and NaN for the days that passed.
+    """
+    recent_weights_windows = np.lib.stride_tricks.sliding_window_view(
+        weights, LOOK_BACK_DAYS
+    )
+    remaining_days = np.arange(DAYS_PER_WEEK, 0, -1)
+    last_days = sundays[:, np.newaxis] - remaining_days
+    forecasts = forecast_remaining_days_weights(
+        recent_weights=recent_weights_windows[(last_days - LOOK_BACK_DAYS + 1).ravel()],
+        target_weights=np.repeat(target_weights, DAYS_PER_WEEK),
+        remaining_days=np.tile(remaining_days, len(sundays)),
+    ).reshape(len(sundays), DAYS_PER_WEEK, DAYS_PER_WEEK)
+
+    passed_days = DAYS_PER_WEEK - remaining_days
+    day_positions = np.arange(DAYS_PER_WEEK) - passed_days[:, np.newaxis]
+    forecasted_week_weights = np.take_along_axis(
+        forecasts,
+        np.broadcast_to(
+            np.where(day_positions >= 0, day_positions, DAYS_PER_WEEK - 1),
+            forecasts.shape,
+        ),
+        axis=2,
+    )
+    forecasted_week_weights[:, day_positions < 0] = np.nan
+    return forecasted_week_weights
@@ -0,0 +1,143 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from scripts.accounts import get_account_key
+from scripts.download_accounts import load_accounts
+from scripts.process import process_user
+from scripts.weight_store import get_weight_database_file
+
+
+@dataclass(frozen=True)
+class BatchUser:
+    storage_directory: str
+    # identifies the user in the SQLite store, if WEIGHT_DATABASE_FILE is set
+    user_id: str | None = None
+
+
+@dataclass(frozen=True)
+class UserResult:
+    storage_directory: str
+    success: bool
+    # None if the user's processing never finished, e.g. in a broken process pool
+    seconds: float | None
+    error: str | None = None
+
+
+def process_users(
+    users: list[BatchUser], max_workers: int | None = None
+) -> list[UserResult]:
+    """
+    Process many users in a pool of processes (one per CPU by default), which import the
+    libraries once and then process one user after another, instead of starting an
+    interpreter per user. Each user's figures are written to the user's storage directory.
+
+    A failing user does not stop the others, its error is reported in its result instead.
+    That includes a worker process that dies (e.g. killed for running out of memory), which
+    breaks the pool: the users it was processing and all users still waiting fail, without
+    a processing time.
+
+    Returns:
+        list[UserResult]: One result per user, in the order of ``users``.
+    """
+    if len(users) <= 1 or max_workers == 1:
+        return [_process_user(user) for user in users]
+
+    results: list[UserResult | None] = [None] * len(users)
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = {
+            executor.submit(_process_user, user): index
+            for index, user in enumerate(users)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                results[index] = UserResult(
+                    storage_directory=users[index].storage_directory,
+                    success=False,
+                    seconds=None,
+                    error=f"{type(e).__name__}: {e}",
+                )
+    return results
+
+
+def _process_user(user: BatchUser) -> UserResult:
+    start = time.perf_counter()
+    try:
+        text = process_user(
+            storage_directory=user.storage_directory, user_id=user.user_id
+        )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return UserResult(
+            storage_directory=user.storage_directory,
+            success=False,
+            seconds=time.perf_counter() - start,
+            error=f"{type(e).__name__}: {e}",
+        )
+    return UserResult(
+        storage_directory=user.storage_directory,
+        success=text is not None,
+        seconds=time.perf_counter() - start,
+        error=None if text is not None else "not enough data",
+    )
+
+
+def get_batch_users(storage_directories: list[str]) -> list[BatchUser]:
+    """
+    The users of the storage directories, or of the accounts in GARMIN_ACCOUNTS_FILE if
+    there are none. The users of the accounts are identified in the SQLite store if
+    WEIGHT_DATABASE_FILE is set. A storage directory does not identify its user there, so
+    passing storage directories raises a RuntimeError while the store is used.
+    """
+    use_store = get_weight_database_file() is not None
+    if storage_directories:
+        if use_store:
+            raise RuntimeError(
+                "The users are identified by their accounts in GARMIN_ACCOUNTS_FILE if "
+                "WEIGHT_DATABASE_FILE is set, do not pass storage directories"
+            )
+        return [
+            BatchUser(storage_directory) for storage_directory in storage_directories
+        ]
+
+    accounts_file = os.getenv("GARMIN_ACCOUNTS_FILE")
+    if accounts_file is None:
+        raise RuntimeError(
+            "Pass the storage directories of the users or set GARMIN_ACCOUNTS_FILE"
+        )
+    return [
+        BatchUser(
+            storage_directory=account.storage_directory,
+            user_id=get_account_key(account.email) if use_store else None,
+        )
+        for account in load_accounts(accounts_file)
+    ]
+
+
+def print_report(results: list[UserResult]) -> None:
+    for result in results:
+        status = "ok" if result.success else f"failed ({result.error})"
+        duration = "" if result.seconds is None else f" in {result.seconds:.2f}s"
+        print(f"{result.storage_directory}: {status}{duration}")
+    failed = sum(not result.success for result in results)
+    total_seconds = sum(
+        result.seconds for result in results if result.seconds is not None
+    )
+    print(
+        f"{len(results) - failed} of {len(results)} users processed successfully, "
+        f"{total_seconds:.2f}s processing time in total"
+    )
+
+
+if __name__ == "__main__":
+    workers = os.getenv("BATCH_MAX_WORKERS")
+    user_results = process_users(
+        get_batch_users(sys.argv[1:]),
+        max_workers=None if workers is None else int(workers),
+    )
+    print_report(user_results)
+    sys.exit(0 if all(result.success for result in user_results) else 1)
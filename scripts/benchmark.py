@@ -0,0 +1,147 @@
+import contextlib
+import importlib.util
+import io
+import multiprocessing
+import resource
+import sys
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from scripts.backtest import backtest
+from scripts.columns import DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN
+from scripts.daily_series import DailyWeightSeries
+from scripts.engine import ProcessingEngine
+from scripts.predictions import DailyWeightForecaster
+from scripts.process import process_daily_series, process_weekly_data
+from scripts.process_weight_data import (
+    BACKEND_NUMPY,
+    BACKEND_PANDAS,
+    BACKEND_POLARS,
+    MOVING_AVERAGE_WINDOWS,
+    get_processing_engine,
+    process_weight_data,
+)
+
+DEFAULT_YEARS = 12
+DEFAULT_REPEATS = 20
+# the longest history starting in 2010 that pandas timestamps (until 2262) can hold
+DEFAULT_MEMORY_YEARS = 250
+
+
+def create_daily_history(years: int = DEFAULT_YEARS, seed: int = 0) -> pd.DataFrame:
+    """
+    Create a synthetic daily weight history (a random walk around 80 kg) for benchmarks.
+    """
+    rng = np.random.default_rng(seed)
+    days = years * 365
+    return pd.DataFrame(
+        {WEIGHT_IN_GRAMS_COLUMN: 80000 + np.cumsum(rng.integers(-300, 301, size=days))},
+        index=pd.date_range(
+            start="2010-01-01", periods=days, freq="D", name=DATE_COLUMN
+        ),
+    )
+
+
+def benchmark_rolling(
+    years: int = DEFAULT_YEARS, repeats: int = DEFAULT_REPEATS
+) -> dict[str, float]:
+    """
+    Compare the moving averages and the weekly table of the processing engines (polars only
+    if it is installed). Returns the best time per run in seconds for each engine.
+    """
+    df = create_daily_history(years=years)
+    backends = [BACKEND_PANDAS, BACKEND_NUMPY]
+    if importlib.util.find_spec("polars") is not None:
+        backends.append(BACKEND_POLARS)
+
+    def run(engine: ProcessingEngine):
+        df_averages = engine.add_moving_averages(
+            df, WEIGHT_IN_GRAMS_COLUMN, MOVING_AVERAGE_WINDOWS
+        )
+        engine.create_weekly_table(
+            df_averages, WEIGHT_IN_GRAMS_COLUMN, MOVING_AVERAGE_WINDOWS
+        )
+
+    results = {}
+    for backend in backends:
+        engine = get_processing_engine(backend)
+        results[backend] = min(
+            timeit.repeat(lambda engine=engine: run(engine), number=1, repeat=repeats)
+        )
+    return results
+
+
+def benchmark_memory(years: int = DEFAULT_MEMORY_YEARS) -> dict[str, float]:
+    """
+    Compare the peak memory of processing a long daily history with defensive copies of
+    every frame (as ``process`` did before) with the copy-on-write pipeline of
+    ``process_daily_series``. Each path runs in a fresh process, and the increase of its
+    peak resident set size over the one before processing is returned in bytes.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for path in ("copies", "copy_on_write"):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[path] = executor.submit(_measure_peak_memory, path, years).result()
+    return results
+
+
+def _measure_peak_memory(path: str, years: int) -> float:
+    daily_series = DailyWeightSeries.from_dataframe(create_daily_history(years=years))
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # the forecaster prints whether its targets add up
+    with contextlib.redirect_stdout(io.StringIO()):
+        if path == "copies":
+            df_weight_data = process_weight_data(weight_dataframe_creator=daily_series)
+            df_daily_data = df_weight_data.copy().fillna(0).astype("int")
+            df_weekly_data = process_weekly_data(df_weight_data.copy())
+            remaining_days_weight = DailyWeightForecaster(
+                daily_series=daily_series, df_weekly=df_weekly_data.copy()
+            ).calculate()
+            # the copies that were passed to the plots
+            _ = (
+                df_daily_data.copy(),
+                df_weekly_data.copy(),
+                remaining_days_weight.copy(),
+            )
+        else:
+            process_daily_series(daily_series)
+
+    peak_rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (peak_rss_after - peak_rss_before) * 1024.0
+
+
+def benchmark_backtest(
+    years: int = DEFAULT_YEARS, repeats: int = DEFAULT_REPEATS
+) -> dict[str, float]:
+    """
+    Time the backtest of every week of a long daily history. Returns the best time per run
+    in seconds.
+    """
+    daily_series = DailyWeightSeries.from_dataframe(create_daily_history(years=years))
+    return {
+        "backtest": min(
+            timeit.repeat(lambda: backtest(daily_series), number=1, repeat=repeats)
+        )
+    }
+
+
+# name: (benchmark, unit, factor to convert the results to the unit)
+BENCHMARKS = {
+    "rolling": (benchmark_rolling, "ms", 1000),
+    "memory": (benchmark_memory, "MiB", 1 / 2**20),
+    "backtest": (benchmark_backtest, "ms", 1000),
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for benchmark_name in names:
+        benchmark, unit, factor = BENCHMARKS[benchmark_name]
+        for benchmark_path, result in benchmark().items():
+            print(f"{benchmark_name} {benchmark_path}: {result * factor:.2f} {unit}")
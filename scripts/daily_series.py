@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from scripts.columns import DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN
+
+
+class DailyWeightSeries:
+    """
+    The weight in grams of every day from ``start_day`` (days since the epoch) on, as one
+    contiguous int32 array. The weights are read-only, so the series can be shared by all
+    consumers without copying it.
+
+    This is all the daily DataFrame holds, without its index and block overhead, so the
+    series is what gets passed around, and a DataFrame is only created at the edges with
+    ``to_dataframe``. It also implements the WeightDataFrameCreator protocol, so it can be
+    passed to ``process_weight_data`` directly.
+
+    ``measured`` marks the days with a weigh-in, as opposed to interpolated ones. It is None
+    if that is not known, e.g. for a series created from a DataFrame, in which case every
+    day counts as measured.
+    """
+
+    __slots__ = ("measured", "start_day", "weights")
+
+    def __init__(
+        self, start_day: int, weights: np.ndarray, measured: np.ndarray | None = None
+    ):
+        self.start_day = int(start_day)
+        # a view, to not make the array of the caller read-only
+        self.weights = np.ascontiguousarray(weights, dtype=np.int32).view()
+        self.weights.flags.writeable = False
+        if measured is not None:
+            if len(measured) != len(self.weights):
+                raise ValueError("weights and measured must have the same length")
+            measured = np.ascontiguousarray(measured, dtype=bool).view()
+            measured.flags.writeable = False
+        self.measured = measured
+
+    @classmethod
+    def from_dataframe(
+        cls, df: pd.DataFrame, column: str = WEIGHT_IN_GRAMS_COLUMN
+    ) -> "DailyWeightSeries":
+        """
+        Create the series from a daily DataFrame indexed by date, with one row per day.
+        """
+        if df.empty:
+            return cls(start_day=0, weights=np.empty(0, dtype=np.int32))
+        start_day = df.index[0].to_datetime64().astype("datetime64[D]").astype(np.int64)
+        return cls(start_day=start_day, weights=df[column].to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    @property
+    def last_day(self) -> int:
+        return self.start_day + len(self.weights) - 1
+
+    @property
+    def days(self) -> np.ndarray:
+        return np.arange(self.start_day, self.start_day + len(self.weights))
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self.days.astype("datetime64[D]")
+
+    @property
+    def nbytes(self) -> int:
+        return self.weights.nbytes
+
+    def tail(self, days: int) -> "DailyWeightSeries":
+        """
+        Returns the last ``days`` days, sharing the weights with this series.
+        """
+        start = max(len(self.weights) - days, 0)
+        return DailyWeightSeries(
+            self.start_day + start,
+            self.weights[start:],
+            measured=None if self.measured is None else self.measured[start:],
+        )
+
+    def moving_average(self, window: int) -> np.ndarray:
+        """
+        The mean of the weights over the last ``window`` days for every day, NaN for the
+        first days without a full window. The sums are exact integers, so the means equal
+        the ones of ``pd.Series.rolling(window).mean()``.
+        """
+        sums = np.zeros(len(self.weights) + 1, dtype=np.int64)
+        np.cumsum(self.weights, dtype=np.int64, out=sums[1:])
+
+        moving_average = np.full(len(self.weights), np.nan)
+        if len(self.weights) >= window:
+            moving_average[window - 1 :] = (sums[window:] - sums[:-window]) / window
+        return moving_average
+
+    def get_dataframe(self) -> pd.DataFrame:
+        return self.to_dataframe()
+
+    def get_daily_series(self) -> "DailyWeightSeries":
+        return self
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the daily DataFrame indexed by date with the weights as int64, like the
+        WeightDataFrameCreator implementations create it.
+        """
+        if len(self.weights) == 0:
+            index = pd.DatetimeIndex([], dtype="datetime64[ns]", name=DATE_COLUMN)
+        else:
+            index = pd.date_range(
+                start=pd.Timestamp(self.start_day, unit="D"),
+                periods=len(self.weights),
+                freq="D",
+                name=DATE_COLUMN,
+            )
+        return pd.DataFrame(
+            {WEIGHT_IN_GRAMS_COLUMN: self.weights.astype(np.int64)}, index=index
+        )
@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.daily_series import DailyWeightSeries
+from scripts.dataframe_creator import WeightDataFrameCreator
+from scripts.files import RAW_DATA_FILE, WEIGHT_CACHE_FILE
+
+CACHE_FORMAT_VERSION = 2
+# version, modification time (ns) and size of the raw file, first day (days since the epoch)
+HEADER_SIZE = 4
+
+
+class CachedWeightDataFrameCreator(WeightDataFrameCreator):
+    # pylint: disable=too-few-public-methods
+    """
+    Caches the daily weights of another WeightDataFrameCreator in a binary file next to the
+    raw data, so that the raw data only has to be parsed again once it changed.
+
+    The cache is a single int64 ``.npy`` array: a header identifying the raw file it was
+    created from (modification time and size) and the first day, followed by one weight in
+    grams per day and then by one flag per day whether it was measured (see
+    ``DailyWeightSeries.measured``). It is memory mapped when read, and rebuilt whenever the
+    raw file changed. ``get_daily_series`` returns the cached weights without creating a
+    DataFrame.
+    """
+
+    def __init__(
+        self,
+        weight_dataframe_creator: WeightDataFrameCreator,
+        source_file: str = RAW_DATA_FILE,
+        cache_file: str = WEIGHT_CACHE_FILE,
+    ):
+        self._weight_dataframe_creator = weight_dataframe_creator
+        self._source_file = source_file
+        self._cache_file = cache_file
+
+    def get_dataframe(self) -> pd.DataFrame:
+        return self.get_daily_series().to_dataframe()
+
+    def get_daily_series(self) -> DailyWeightSeries:
+        source_key = self._get_source_key()
+
+        series = self._load_cache(source_key)
+        if series is not None:
+            return series
+
+        series = self._weight_dataframe_creator.get_daily_series()
+        self._store_cache(series, source_key)
+        return series
+
+    def _get_source_key(self) -> tuple[int, int]:
+        stat = os.stat(self._source_file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_cache(self, source_key: tuple[int, int]) -> DailyWeightSeries | None:
+        try:
+            cache = np.load(self._cache_file, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if cache.ndim != 1 or len(cache) < HEADER_SIZE or len(cache) % 2 != 0:
+            return None
+
+        version, mtime_ns, size, start_day = (
+            int(value) for value in cache[:HEADER_SIZE]
+        )
+        if version != CACHE_FORMAT_VERSION or (mtime_ns, size) != source_key:
+            return None
+
+        days = (len(cache) - HEADER_SIZE) // 2
+        return DailyWeightSeries(
+            start_day=start_day,
+            weights=cache[HEADER_SIZE : HEADER_SIZE + days],
+            measured=cache[HEADER_SIZE + days :] != 0,
+        )
+
+    def _store_cache(
+        self, series: DailyWeightSeries, source_key: tuple[int, int]
+    ) -> None:
+        if len(series) == 0:
+            return
+
+        header = np.array(
+            [CACHE_FORMAT_VERSION, *source_key, series.start_day], dtype=np.int64
+        )
+        measured = (
+            np.ones(len(series), dtype=np.int64)
+            if series.measured is None
+            else series.measured.astype(np.int64)
+        )
+        cache = np.concatenate([header, series.weights.astype(np.int64), measured])
+
+        # np.save appends ".npy" to paths without it, so write through a file object
+        temporary_file = f"{self._cache_file}.tmp"
+        with open(temporary_file, "wb") as f:
+            np.save(f, cache)
+        os.replace(temporary_file, self._cache_file)
@@ -1,11 +1,108 @@
 import json
+import os
 from abc import abstractmethod
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, time
 from typing import Protocol
 
+import numpy as np
 import pandas as pd
 
-from scripts.columns import DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN
+from scripts.daily_series import DailyWeightSeries
 from scripts.files import RAW_DATA_FILE
+from scripts.json_stream import iter_array_items
+from scripts.outliers import HampelFilter, report_outliers
+from scripts.sparse_series import SparseWeightSeries
+
+DAILY_WEIGHT_SUMMARIES_KEY = "dailyWeightSummaries"
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# rough size of a serialized daily summary, to preallocate the arrays when streaming
+ESTIMATED_SUMMARY_SIZE_IN_BYTES = 400
+
+AGGREGATION_FIRST = "first"
+AGGREGATION_MIN = "min"
+AGGREGATION_MEDIAN = "median"
+AGGREGATION_MEAN = "mean"
+AGGREGATIONS = (
+    AGGREGATION_FIRST,
+    AGGREGATION_MIN,
+    AGGREGATION_MEDIAN,
+    AGGREGATION_MEAN,
+)
+
+MILLISECONDS_PER_DAY = 24 * 60 * 60 * 1000
+
+
+@dataclass(frozen=True)
+class DailyWeightAggregation:
+    """
+    How the weigh-ins of a day are combined into the weight of the day.
+
+    ``method`` is one of "first" (the first weigh-in of the daily summary), "min", "median"
+    or "mean". With ``time_of_day_window`` (start included, end excluded, wrapping around
+    midnight if the start is after the end), only the weigh-ins within that local time of
+    day are used. With ``outlier_filter``, the weigh-ins it rejects are left out first. Days
+    without a weigh-in left are interpolated like days without any.
+    """
+
+    method: str = AGGREGATION_FIRST
+    time_of_day_window: tuple[time, time] | None = None
+    outlier_filter: HampelFilter | None = None
+
+    def __post_init__(self):
+        if self.method not in AGGREGATIONS:
+            raise ValueError(
+                f"Aggregation must be one of {', '.join(AGGREGATIONS)}, got {self.method}"
+            )
+
+    @classmethod
+    def from_env(cls) -> "DailyWeightAggregation":
+        """
+        Create the aggregation from the environment variables WEIGHT_AGGREGATION (default:
+        first), WEIGHT_TIME_OF_DAY_WINDOW (e.g. "05:00-10:00", default: the whole day) and
+        WEIGHT_OUTLIER_THRESHOLD (see ``HampelFilter.from_env``).
+        """
+        time_of_day_window = os.getenv("WEIGHT_TIME_OF_DAY_WINDOW")
+        if time_of_day_window is not None:
+            try:
+                start, end = time_of_day_window.split("-")
+                time_of_day_window = (
+                    time.fromisoformat(start),
+                    time.fromisoformat(end),
+                )
+            except ValueError as e:
+                raise ValueError(
+                    "Environment variable WEIGHT_TIME_OF_DAY_WINDOW must have the format "
+                    f"HH:MM-HH:MM, got {time_of_day_window}"
+                ) from e
+        return cls(
+            method=os.getenv("WEIGHT_AGGREGATION", AGGREGATION_FIRST),
+            time_of_day_window=time_of_day_window,
+            outlier_filter=HampelFilter.from_env(),
+        )
+
+    @property
+    def is_default(self) -> bool:
+        return (
+            self.method == AGGREGATION_FIRST
+            and self.time_of_day_window is None
+            and self.outlier_filter is None
+        )
+
+    @property
+    def name(self) -> str:
+        name = self.method
+        if self.time_of_day_window is not None:
+            start, end = self.time_of_day_window
+            name += f"_{start:%H%M}-{end:%H%M}"
+        if self.outlier_filter is not None:
+            name += f"_{self.outlier_filter.name}"
+        return name
+
+
+FIRST_WEIGH_IN = DailyWeightAggregation()
 
 
 class WeightDataFrameCreator(Protocol):
@@ -23,37 +120,236 @@ class WeightDataFrameCreator(Protocol):
             - Data includes exactly one row per day with no missing values
         """
 
+    def get_daily_series(self) -> DailyWeightSeries:
+        """
+        Return the daily weights as a compact DailyWeightSeries. Implementations that hold
+        the weights as an array already can override this to skip the DataFrame, and to keep
+        which days were measured.
+        """
+        return DailyWeightSeries.from_dataframe(self.get_dataframe())
+
 
 class GarminWeightDataFrameCreator(WeightDataFrameCreator):
     # pylint: disable=too-few-public-methods
     """
     Takes the weight of the first weight measurement of each day and rounds it to the nearest integer.
-    Loads the raw data from a local JSON file.
+    Loads the raw data from the local JSON file ``raw_data_file`` (by default weight.json in the
+    storage directory).
 
     This function expects a dictionary containing a "dailyWeightSummaries" key, where each item includes:
      - "summaryDate": A string representing the date.
      - "allWeightMetrics": A list of dictionaries with a "weight" key, specifying weight in grams.
+
+    With ``streaming=True`` the daily summaries are decoded one at a time from the raw file
+    instead of loading the whole document, which keeps the peak memory low for long histories.
+
+    With ``max_interpolated_gap_days``, only the weigh-ins after the last gap longer than that
+    many days are used, see ``create_daily_dataframe``.
+
+    With ``aggregation``, all weigh-ins of each day are combined instead of taking the first
+    one, see ``DailyWeightAggregation``.
     """
 
+    def __init__(
+        self,
+        streaming: bool = False,
+        max_interpolated_gap_days: int | None = None,
+        aggregation: DailyWeightAggregation = FIRST_WEIGH_IN,
+        raw_data_file: str | None = None,
+    ):
+        self._streaming = streaming
+        self._max_interpolated_gap_days = max_interpolated_gap_days
+        self._aggregation = aggregation
+        self._raw_data_file = raw_data_file or RAW_DATA_FILE
+
     def get_dataframe(self) -> pd.DataFrame:
-        data = self._load_data()
-        daily_weights = [
-            (d["summaryDate"], round(d["allWeightMetrics"][0]["weight"]))
-            for d in data["dailyWeightSummaries"]
-        ]
-        df = pd.DataFrame(daily_weights, columns=[DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN])
-
-        # fill in missing dates
-        df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN])
-        df.set_index(DATE_COLUMN, inplace=True)
-        df = df.resample("D").asfreq()
-
-        df[WEIGHT_IN_GRAMS_COLUMN] = (
-            df[WEIGHT_IN_GRAMS_COLUMN].interpolate(method="linear").round().astype(int)
-        )
+        return self.get_daily_series().to_dataframe()
 
-        return df
+    def get_daily_series(self) -> DailyWeightSeries:
+        if self._streaming:
+            with open(self._raw_data_file, "r", encoding="utf-8") as f:
+                days, weights = daily_weights_to_arrays(
+                    summaries=iter_array_items(f, DAILY_WEIGHT_SUMMARIES_KEY),
+                    capacity=os.path.getsize(self._raw_data_file)
+                    // ESTIMATED_SUMMARY_SIZE_IN_BYTES,
+                    aggregation=self._aggregation,
+                )
+        else:
+            data = self._load_data()
+            summaries = data[DAILY_WEIGHT_SUMMARIES_KEY]
+            days, weights = daily_weights_to_arrays(
+                summaries=summaries,
+                capacity=len(summaries),
+                aggregation=self._aggregation,
+            )
+
+        return create_daily_series(
+            days=days,
+            weights=weights,
+            max_interpolated_gap_days=self._max_interpolated_gap_days,
+        )
 
     def _load_data(self) -> dict:
-        with open(RAW_DATA_FILE, "r", encoding="utf-8") as f:
+        with open(self._raw_data_file, "r", encoding="utf-8") as f:
             return json.load(f)
+
+
+def create_daily_dataframe(
+    days: np.ndarray,
+    weights: np.ndarray,
+    max_interpolated_gap_days: int | None = None,
+) -> pd.DataFrame:
+    """
+    Create the daily DataFrame from the measurement days (days since the epoch) and the
+    weights in grams, filling in missing days by linear interpolation.
+
+    With ``max_interpolated_gap_days``, the history before the last gap longer than that is
+    dropped instead of being filled with interpolated days.
+    """
+    return create_daily_series(
+        days=days, weights=weights, max_interpolated_gap_days=max_interpolated_gap_days
+    ).to_dataframe()
+
+
+def create_daily_series(
+    days: np.ndarray,
+    weights: np.ndarray,
+    max_interpolated_gap_days: int | None = None,
+) -> DailyWeightSeries:
+    """
+    Like ``create_daily_dataframe``, but returns the DailyWeightSeries, which keeps which
+    days were measured.
+    """
+    series = SparseWeightSeries(days=days, weights=weights)
+    if max_interpolated_gap_days is not None:
+        series = series.get_last_segment(max_interpolated_gap_days)
+    return series.to_daily_series()
+
+
+def daily_weights_to_arrays(
+    summaries: Iterable[dict],
+    capacity: int,
+    aggregation: DailyWeightAggregation = FIRST_WEIGH_IN,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fill preallocated arrays with the day (days since the epoch) and the rounded weight of
+    the first measurement of each daily summary. The arrays grow if ``capacity`` is too small.
+
+    For any other aggregation, all weigh-ins are flattened into arrays first and aggregated
+    per day with ``aggregate_daily_weights``.
+    """
+    if not aggregation.is_default:
+        return aggregate_daily_weights(
+            *weight_metrics_to_arrays(summaries, capacity), aggregation=aggregation
+        )
+
+    days = np.empty(max(capacity, 1), dtype=np.int64)
+    weights = np.empty(max(capacity, 1), dtype=np.int64)
+
+    size = 0
+    for summary in summaries:
+        if size == len(days):
+            days = np.resize(days, 2 * size)
+            weights = np.resize(weights, 2 * size)
+        days[size] = (
+            date.fromisoformat(summary["summaryDate"]).toordinal() - EPOCH_ORDINAL
+        )
+        weights[size] = round(summary["allWeightMetrics"][0]["weight"])
+        size += 1
+
+    return days[:size], weights[:size]
+
+
+def weight_metrics_to_arrays(
+    summaries: Iterable[dict], capacity: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flatten all weigh-ins of the daily summaries into contiguous arrays, in the order of the
+    summaries and their "allWeightMetrics": the day (days since the epoch), the weight in
+    grams and the local time of day in milliseconds (from the "date" timestamp of the
+    weigh-in, -1 if it has none). The arrays grow if ``capacity`` is too small.
+    """
+    days = np.empty(max(capacity, 1), dtype=np.int64)
+    weights = np.empty(max(capacity, 1), dtype=np.float64)
+    times_of_day = np.empty(max(capacity, 1), dtype=np.int64)
+
+    size = 0
+    for summary in summaries:
+        day = date.fromisoformat(summary["summaryDate"]).toordinal() - EPOCH_ORDINAL
+        for metric in summary["allWeightMetrics"]:
+            if size == len(days):
+                days = np.resize(days, 2 * size)
+                weights = np.resize(weights, 2 * size)
+                times_of_day = np.resize(times_of_day, 2 * size)
+            days[size] = day
+            weights[size] = metric["weight"]
+            timestamp = metric.get("date")
+            times_of_day[size] = (
+                -1 if timestamp is None else timestamp % MILLISECONDS_PER_DAY
+            )
+            size += 1
+
+    return days[:size], weights[:size], times_of_day[:size]
+
+
+def aggregate_daily_weights(
+    days: np.ndarray,
+    weights: np.ndarray,
+    times_of_day: np.ndarray,
+    aggregation: DailyWeightAggregation,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregate the flattened weigh-ins (see ``weight_metrics_to_arrays``) per day with a
+    single grouped reduction: the weigh-ins are sorted by day (and by weight for "min" and
+    "median"), so that each day is a contiguous group.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The days in ascending order and their aggregated
+        weights, rounded to integer grams (half to even).
+    """
+    if aggregation.time_of_day_window is not None:
+        start, end = (_to_milliseconds(t) for t in aggregation.time_of_day_window)
+        if start <= end:
+            in_window = (times_of_day >= start) & (times_of_day < end)
+        else:
+            in_window = (times_of_day >= start) | (times_of_day < end)
+        in_window &= times_of_day >= 0
+        days, weights = days[in_window], weights[in_window]
+        times_of_day = times_of_day[in_window]
+
+    if aggregation.outlier_filter is not None:
+        # the filter compares each weigh-in with the ones before and after it in time
+        order = np.lexsort((times_of_day, days))
+        outliers = np.empty(len(days), dtype=bool)
+        outliers[order] = aggregation.outlier_filter.find_outliers(
+            weights[order][np.newaxis]
+        )[0]
+        report_outliers(days[outliers], weights[outliers])
+        days, weights = days[~outliers], weights[~outliers]
+
+    if aggregation.method in (AGGREGATION_MIN, AGGREGATION_MEDIAN):
+        order = np.lexsort((weights, days))
+    else:
+        # stable, to keep the order of the weigh-ins within a day
+        order = np.argsort(days, kind="stable")
+    days, weights = days[order], weights[order]
+
+    starts = np.flatnonzero(np.diff(days, prepend=days[:1] - 1) != 0)
+    counts = np.diff(starts, append=len(days))
+
+    if aggregation.method in (AGGREGATION_FIRST, AGGREGATION_MIN):
+        daily_weights = weights[starts]
+    elif aggregation.method == AGGREGATION_MEDIAN:
+        daily_weights = (
+            weights[starts + (counts - 1) // 2] + weights[starts + counts // 2]
+        ) / 2
+    else:
+        daily_weights = (
+            np.add.reduceat(weights, starts) / counts if len(days) else weights
+        )
+
+    return days[starts], np.rint(daily_weights).astype(np.int64)
+
+
+def _to_milliseconds(t: time) -> int:
+    return ((t.hour * 60 + t.minute) * 60 + t.second) * 1000 + t.microsecond // 1000
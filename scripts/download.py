@@ -1,10 +1,34 @@
 import json
 import os
-from datetime import date
+import sys
+from datetime import date, timedelta
 
 import garminconnect
+from garth.exc import GarthHTTPError
 
-from scripts.files import RAW_DATA_FILE
+from scripts.accounts import get_account_key
+from scripts.fetch import (
+    DAILY_WEIGHT_SUMMARIES_KEY,
+    DEFAULT_MAX_WORKERS,
+    fetch_weigh_ins_in_chunks,
+)
+from scripts.files import (
+    RAW_DATA_FILENAME,
+    SYNC_STATE_FILENAME,
+    WEIGH_IN_LOG_FILENAME,
+    get_full_storage_path,
+)
+from scripts.weigh_in_log import (
+    RAW_DATA_FORMAT_LOG,
+    append_weigh_ins,
+    compact,
+    get_raw_data_format,
+    needs_compaction,
+    read_summaries,
+)
+from scripts.weight_store import WeightStore, get_weight_database_file
+
+AUTH_FAILURE_STATUS_CODES = (401, 403)
 
 
 def get_start_date():
@@ -20,7 +44,132 @@ def get_start_date():
         ) from e
 
 
-def load_and_store_garmin_data():
+def get_token_store_directory(email: str) -> str:
+    """
+    Returns the directory of the persisted garth tokens of the account. The token stores of
+    all accounts live below the directory given by the environment variable GARTH_HOME.
+    """
+    garth_home = os.path.expanduser(os.getenv("GARTH_HOME", "~/.garth"))
+    return os.path.join(garth_home, get_account_key(email))
+
+
+def login(email: str, password: str, is_cn: bool = False) -> garminconnect.Garmin:
+    """
+    Log in to Garmin Connect, resuming the session from the persisted token store.
+
+    garth exchanges the stored OAuth1 token for a new OAuth2 token once the latter has
+    expired, so a full SSO login with the credentials is only done if there is no usable
+    token store or Garmin rejects the stored tokens. The (possibly refreshed) tokens are
+    persisted again afterwards.
+    """
+    garmin = garminconnect.Garmin(email, password, is_cn=is_cn)
+    token_store_directory = get_token_store_directory(email)
+
+    if not _resume_session(garmin=garmin, token_store_directory=token_store_directory):
+        garmin.login()
+
+    garmin.garth.dump(token_store_directory)
+    return garmin
+
+
+def _resume_session(garmin: garminconnect.Garmin, token_store_directory: str) -> bool:
+    if not os.path.isdir(token_store_directory):
+        return False
+
+    try:
+        garmin.login(tokenstore=token_store_directory)
+    except GarthHTTPError as e:
+        response = e.error.response
+        if response is not None and response.status_code in AUTH_FAILURE_STATUS_CODES:
+            return False
+        raise
+    except (OSError, ValueError, TypeError, KeyError):
+        # unreadable token store or the token exchange was refused
+        return False
+    return True
+
+
+def get_sync_overlap_days() -> int:
+    """
+    Returns the number of days before the last successful sync that are fetched again,
+    so that weigh-ins which were edited or deleted after the last sync are picked up.
+    Configured with the environment variable GARMIN_SYNC_OVERLAP_DAYS (default: 7).
+    """
+    overlap_days = os.getenv("GARMIN_SYNC_OVERLAP_DAYS", "7")
+    try:
+        overlap_days = int(overlap_days)
+    except ValueError as e:
+        raise ValueError(
+            f"Environment variable GARMIN_SYNC_OVERLAP_DAYS is not an integer: {e}"
+        ) from e
+    if overlap_days < 0:
+        raise ValueError("Environment variable GARMIN_SYNC_OVERLAP_DAYS must be >= 0")
+    return overlap_days
+
+
+def load_sync_state(sync_state_file: str) -> dict[str, str]:
+    """
+    Returns the high-water marks of the previous syncs, mapping each account to the
+    (ISO formatted) end date of its last successful sync.
+    """
+    if not os.path.isfile(sync_state_file):
+        return {}
+    with open(sync_state_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def store_sync_state(sync_state: dict[str, str], sync_state_file: str) -> None:
+    _write_json_atomically(sync_state_file, sync_state)
+
+
+def load_raw_data(raw_data_file: str) -> dict | None:
+    if not os.path.isfile(raw_data_file):
+        return None
+    with open(raw_data_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_sync_start_date(
+    startdate: str, last_synced: str | None, overlap_days: int
+) -> str:
+    """
+    Returns the first date to fetch: the configured start date for the first sync and
+    the last synced date minus the overlap afterwards (but never before the start date).
+    """
+    if last_synced is None:
+        return startdate
+
+    sync_startdate = date.fromisoformat(last_synced) - timedelta(days=overlap_days)
+    return max(startdate, sync_startdate.isoformat())
+
+
+def merge_weigh_ins(stored: dict | None, fetched: dict, window_start: str) -> dict:
+    """
+    Merge freshly fetched weigh-ins into the stored history.
+
+    All stored daily summaries from ``window_start`` onwards are replaced by the fetched
+    ones, so that weigh-ins deleted in Garmin Connect within the fetched window are
+    removed locally as well. The summaries of the result are sorted by date. All other
+    keys are taken from the fetched data.
+    """
+    if stored is None:
+        stored_summaries = []
+    else:
+        stored_summaries = [
+            summary
+            for summary in stored.get(DAILY_WEIGHT_SUMMARIES_KEY, [])
+            if summary["summaryDate"] < window_start
+        ]
+
+    merged = dict(fetched)
+    merged[DAILY_WEIGHT_SUMMARIES_KEY] = sorted(
+        stored_summaries + fetched.get(DAILY_WEIGHT_SUMMARIES_KEY, []),
+        key=lambda summary: summary["summaryDate"],
+    )
+    return merged
+
+
+def load_and_store_garmin_data(full_sync: bool = False):
     email = os.getenv("GARMIN_EMAIL")
     password = os.getenv("GARMIN_PASSWORD")
 
@@ -29,20 +178,102 @@ def load_and_store_garmin_data():
             "Environment variables GARMIN_EMAIL and GARMIN_PASSWORD must be set"
         )
 
-    garmin = garminconnect.Garmin(email, password)
-    garmin.login()
-    garmin.garth.dump(os.getenv("GARTH_HOME", "~/.garth"))
+    garmin = login(email=email, password=password)
+    sync_weigh_ins(garmin=garmin, email=email, full_sync=full_sync)
+
+
+def sync_weigh_ins(
+    garmin: garminconnect.Garmin,
+    email: str,
+    storage_directory: str | None = None,
+    full_sync: bool = False,
+    fetch_max_workers: int = DEFAULT_MAX_WORKERS,
+) -> None:
+    # pylint: disable=too-many-locals
+    """
+    Fetch the weigh-ins since the last sync of the account and merge them into the raw
+    data file of the storage directory (default: the one given by STORAGE_DIRECTORY), or
+    append them to the weigh-in log if RAW_DATA_FORMAT is "jsonl". The date windows are
+    fetched by at most ``fetch_max_workers`` threads, see ``fetch_weigh_ins_in_chunks``.
+    If WEIGHT_DATABASE_FILE is set, the weigh-ins are upserted into that store as well. The
+    first time the account is synced into the store, the full history is upserted, so that a
+    store added after earlier syncs does not only hold the days of the last window.
+    """
+    raw_data_format = get_raw_data_format()
+    raw_data_file = get_full_storage_path(
+        (
+            WEIGH_IN_LOG_FILENAME
+            if raw_data_format == RAW_DATA_FORMAT_LOG
+            else RAW_DATA_FILENAME
+        ),
+        storage_directory,
+    )
+    sync_state_file = get_full_storage_path(SYNC_STATE_FILENAME, storage_directory)
 
-    startdate = get_start_date()
+    sync_state = load_sync_state(sync_state_file)
+    has_stored_data = not full_sync and os.path.isfile(raw_data_file)
+    account_key = get_account_key(email)
+    last_synced = sync_state.get(account_key) if has_stored_data else None
+
+    startdate = get_sync_start_date(
+        startdate=get_start_date(),
+        last_synced=last_synced,
+        overlap_days=get_sync_overlap_days(),
+    )
     enddate = date.today().isoformat()
 
-    data = garmin.get_weigh_ins(startdate, enddate)
-    if data is None:
-        raise RuntimeError("Failed to retrieve data from Garmin")
+    data = fetch_weigh_ins_in_chunks(
+        get_weigh_ins=garmin.get_weigh_ins,
+        startdate=startdate,
+        enddate=enddate,
+        max_workers=fetch_max_workers,
+    )
+
+    if raw_data_format == RAW_DATA_FORMAT_LOG:
+        append_weigh_ins(
+            raw_data_file, data[DAILY_WEIGHT_SUMMARIES_KEY], window_start=startdate
+        )
+        if needs_compaction(raw_data_file):
+            compact(raw_data_file)
+        history = None
+    else:
+        stored = load_raw_data(raw_data_file) if has_stored_data else None
+        history = merge_weigh_ins(stored=stored, fetched=data, window_start=startdate)
+        _write_json_atomically(raw_data_file, history)
+
+    weight_database_file = get_weight_database_file()
+    if weight_database_file is not None:
+        with WeightStore(weight_database_file) as weight_store:
+            if weight_store.has_user(account_key):
+                weight_store.upsert_daily_weight_summaries(
+                    user_id=account_key,
+                    summaries=data[DAILY_WEIGHT_SUMMARIES_KEY],
+                    window_start=startdate,
+                )
+            else:
+                weight_store.upsert_daily_weight_summaries(
+                    user_id=account_key,
+                    summaries=(
+                        read_summaries(raw_data_file)
+                        if history is None
+                        else history[DAILY_WEIGHT_SUMMARIES_KEY]
+                    ),
+                )
+
+    sync_state[account_key] = enddate
+    store_sync_state(sync_state, sync_state_file)
+
 
-    with open(RAW_DATA_FILE, "w", encoding="utf-8") as f:
+def _write_json_atomically(path: str, data: dict) -> None:
+    """
+    Write to a temporary file first and move it into place afterwards, so that a crash
+    during the write never leaves a truncated file behind.
+    """
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f:
         f.write(json.dumps(data))
+    os.replace(temporary_path, path)
 
 
 if __name__ == "__main__":
-    load_and_store_garmin_data()
+    load_and_store_garmin_data(full_sync="--full" in sys.argv[1:])
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from scripts.accounts import get_account_key
+from scripts.download import login, sync_weigh_ins
+from scripts.fetch import is_rate_limited
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_CONCURRENCY_PER_HOST = 4
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_INITIAL_BACKOFF_SECONDS = 2.0
+DEFAULT_MAX_BACKOFF_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class Account:
+    email: str
+    password: str
+    storage_directory: str
+    is_cn: bool = False
+
+    @property
+    def host(self) -> str:
+        return "garmin.cn" if self.is_cn else "garmin.com"
+
+
+@dataclass(frozen=True)
+class AccountResult:
+    account_key: str
+    success: bool
+    latency_seconds: float
+    attempts: int
+    error: str | None = None
+
+
+def load_accounts(path: str) -> list[Account]:
+    """
+    Load the accounts from a JSON file containing a list of objects with the keys
+    "email", "password", "storage_directory" and optionally "is_cn".
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [Account(**account) for account in json.load(f)]
+
+
+async def download_accounts(
+    accounts: list[Account],
+    full_sync: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_concurrency_per_host: int = DEFAULT_MAX_CONCURRENCY_PER_HOST,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    initial_backoff_seconds: float = DEFAULT_INITIAL_BACKOFF_SECONDS,
+) -> list[AccountResult]:
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    """
+    Download the weigh-ins of all accounts concurrently into their storage directories.
+
+    At most ``max_concurrency`` accounts are downloaded at the same time, each in a thread of
+    a pool of that size, and at most ``max_concurrency_per_host`` of them from the same
+    Garmin host. Each account fetches its date windows one after another, so these limits
+    bound the requests to Garmin as well. Rate limited downloads (HTTP 429) are retried with
+    exponential backoff and jitter, all other failures are reported in the result of the
+    account instead of being raised.
+
+    Returns:
+        list[AccountResult]: One result per account, in the order of ``accounts``.
+    """
+    global_semaphore = asyncio.Semaphore(max_concurrency)
+    host_semaphores = {
+        host: asyncio.Semaphore(max_concurrency_per_host)
+        for host in {account.host for account in accounts}
+    }
+
+    # not the default executor of the loop, which has at most 32 threads
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return await asyncio.gather(
+            *[
+                _download_account(
+                    account=account,
+                    full_sync=full_sync,
+                    semaphores=(global_semaphore, host_semaphores[account.host]),
+                    executor=executor,
+                    max_attempts=max_attempts,
+                    initial_backoff_seconds=initial_backoff_seconds,
+                )
+                for account in accounts
+            ]
+        )
+
+
+async def _download_account(
+    account: Account,
+    full_sync: bool,
+    semaphores: tuple[asyncio.Semaphore, asyncio.Semaphore],
+    executor: ThreadPoolExecutor,
+    max_attempts: int,
+    initial_backoff_seconds: float,
+) -> AccountResult:
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    global_semaphore, host_semaphore = semaphores
+    start = time.perf_counter()
+    error = None
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            # the host slot first, so accounts waiting for a saturated host do not hold
+            # global slots that the accounts of other hosts could use
+            async with host_semaphore, global_semaphore:
+                await asyncio.get_running_loop().run_in_executor(
+                    executor, _sync_account, account, full_sync
+                )
+            return AccountResult(
+                account_key=get_account_key(account.email),
+                success=True,
+                latency_seconds=time.perf_counter() - start,
+                attempts=attempt,
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            error = e
+            if not is_rate_limited(e) or attempt == max_attempts:
+                break
+
+        # back off outside of the semaphores, so other accounts can proceed meanwhile
+        backoff_seconds = min(
+            initial_backoff_seconds * 2 ** (attempt - 1), DEFAULT_MAX_BACKOFF_SECONDS
+        )
+        await asyncio.sleep(random.uniform(0, backoff_seconds))
+
+    return AccountResult(
+        account_key=get_account_key(account.email),
+        success=False,
+        latency_seconds=time.perf_counter() - start,
+        attempts=attempt,
+        error=f"{type(error).__name__}: {error}",
+    )
+
+
+def _sync_account(account: Account, full_sync: bool) -> None:
+    garmin = login(email=account.email, password=account.password, is_cn=account.is_cn)
+    sync_weigh_ins(
+        garmin=garmin,
+        email=account.email,
+        storage_directory=account.storage_directory,
+        full_sync=full_sync,
+        # the accounts run concurrently already, within the limits of download_accounts
+        fetch_max_workers=1,
+    )
+
+
+def print_report(results: list[AccountResult]) -> None:
+    for result in results:
+        status = "ok" if result.success else f"failed ({result.error})"
+        print(
+            f"{result.account_key}: {status} after {result.attempts} attempt(s) "
+            f"in {result.latency_seconds:.2f}s"
+        )
+    failed = sum(not result.success for result in results)
+    print(f"{len(results) - failed} of {len(results)} accounts downloaded successfully")
+
+
+if __name__ == "__main__":
+    accounts_file = os.getenv("GARMIN_ACCOUNTS_FILE")
+    if accounts_file is None:
+        raise RuntimeError("Environment variable GARMIN_ACCOUNTS_FILE is not set")
+
+    account_results = asyncio.run(
+        download_accounts(
+            accounts=load_accounts(accounts_file),
+            full_sync="--full" in sys.argv[1:],
+            max_concurrency=int(
+                os.getenv("GARMIN_MAX_CONCURRENCY", str(DEFAULT_MAX_CONCURRENCY))
+            ),
+            max_concurrency_per_host=int(
+                os.getenv(
+                    "GARMIN_MAX_CONCURRENCY_PER_HOST",
+                    str(DEFAULT_MAX_CONCURRENCY_PER_HOST),
+                )
+            ),
+        )
+    )
+    print_report(account_results)
+    sys.exit(0 if all(result.success for result in account_results) else 1)
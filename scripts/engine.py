@@ -0,0 +1,35 @@
+from abc import abstractmethod
+from typing import Protocol
+
+import pandas as pd
+
+# the weekday of the last day of a week, Monday is 0 like in ``date.weekday()``
+SUNDAY = 6
+
+
+class ProcessingEngine(Protocol):
+    """
+    The core transformations of the processing, implemented by a dataframe library.
+
+    Both take and return pandas DataFrames, the daily one indexed by date with one row per
+    day, so that an engine only converts from and to pandas at its edges and the rest of the
+    pipeline is independent of it. Neither modifies its input.
+    """
+
+    @abstractmethod
+    def add_moving_averages(
+        self, df: pd.DataFrame, column: str, windows: tuple[int, ...]
+    ) -> pd.DataFrame:
+        """
+        Return the daily DataFrame with the rolling mean over each window of days added as
+        ``{column}_{window}d`` (NaN for the first days without a full window).
+        """
+
+    @abstractmethod
+    def create_weekly_table(
+        self, df: pd.DataFrame, column: str, windows: tuple[int, ...]
+    ) -> pd.DataFrame:
+        """
+        Return one row per completed week (Monday to Sunday) of the daily moving averages,
+        indexed by the date of the Sunday, see ``process_weight_data.create_weekly_table``.
+        """
@@ -0,0 +1,141 @@
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from garminconnect import GarminConnectTooManyRequestsError
+from garth.exc import GarthHTTPError
+
+DAILY_WEIGHT_SUMMARIES_KEY = "dailyWeightSummaries"
+
+DEFAULT_CHUNK_DAYS = 90
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY_SECONDS = 1.0
+
+TOO_MANY_REQUESTS_STATUS_CODE = 429
+
+GetWeighIns = Callable[[str, str], dict | None]
+
+
+def split_date_range(
+    startdate: str, enddate: str, chunk_days: int
+) -> list[tuple[str, str]]:
+    """
+    Split the inclusive date range into consecutive, non-overlapping windows of at most
+    ``chunk_days`` days. The dates are ISO formatted (YYYY-MM-DD).
+    """
+    if chunk_days < 1:
+        raise ValueError("chunk_days must be at least 1")
+
+    start = date.fromisoformat(startdate)
+    end = date.fromisoformat(enddate)
+
+    windows = []
+    while start <= end:
+        window_end = min(start + timedelta(days=chunk_days - 1), end)
+        windows.append((start.isoformat(), window_end.isoformat()))
+        start = window_end + timedelta(days=1)
+    return windows
+
+
+def fetch_weigh_ins_in_chunks(
+    get_weigh_ins: GetWeighIns,
+    startdate: str,
+    enddate: str,
+    chunk_days: int = DEFAULT_CHUNK_DAYS,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    retry_delay_seconds: float = DEFAULT_RETRY_DELAY_SECONDS,
+) -> dict:
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    """
+    Fetch the weigh-ins between startdate and enddate in windows of ``chunk_days`` days.
+
+    The windows are fetched concurrently by at most ``max_workers`` threads. A failed
+    window is retried on its own (up to ``max_attempts`` attempts in total, with an
+    exponentially growing delay), so a single failure does not restart the whole range.
+    Rate limit errors (HTTP 429) are raised right away instead, so that the caller backs
+    off, see ``is_rate_limited``.
+
+    Args:
+        get_weigh_ins: Fetches a single window, e.g. ``garminconnect.Garmin.get_weigh_ins``.
+        startdate: First date to fetch (YYYY-MM-DD).
+        enddate: Last date to fetch (YYYY-MM-DD).
+
+    Returns:
+        dict: The response of the most recent window, with the "dailyWeightSummaries" of
+        all windows stitched together in ascending date order.
+    """
+    windows = split_date_range(startdate, enddate, chunk_days)
+    if not windows:
+        return {DAILY_WEIGHT_SUMMARIES_KEY: []}
+
+    def fetch_window(window: tuple[str, str]) -> dict:
+        return _fetch_window_with_retries(
+            get_weigh_ins=get_weigh_ins,
+            window=window,
+            max_attempts=max_attempts,
+            retry_delay_seconds=retry_delay_seconds,
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map returns the results in the order of the windows
+        responses = list(executor.map(fetch_window, windows))
+
+    data = dict(responses[-1])
+    data[DAILY_WEIGHT_SUMMARIES_KEY] = [
+        summary
+        for response in responses
+        for summary in sorted(
+            response.get(DAILY_WEIGHT_SUMMARIES_KEY, []),
+            key=lambda summary: summary["summaryDate"],
+        )
+    ]
+    return data
+
+
+def _fetch_window_with_retries(
+    get_weigh_ins: GetWeighIns,
+    window: tuple[str, str],
+    max_attempts: int,
+    retry_delay_seconds: float,
+) -> dict:
+    startdate, enddate = window
+    for attempt in range(1, max_attempts + 1):
+        try:
+            data = get_weigh_ins(startdate, enddate)
+            if data is not None:
+                return data
+            error = None
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            if is_rate_limited(e):
+                raise
+            error = e
+
+        if attempt < max_attempts:
+            time.sleep(retry_delay_seconds * 2 ** (attempt - 1))
+
+    raise RuntimeError(
+        f"Failed to retrieve data from Garmin for {startdate} to {enddate} "
+        f"after {max_attempts} attempts"
+    ) from error
+
+
+def is_rate_limited(error: BaseException | None) -> bool:
+    """
+    Whether the error, or one of the errors it was raised from, is a rate limit (HTTP 429)
+    of Garmin Connect.
+    """
+    while error is not None:
+        if isinstance(error, GarminConnectTooManyRequestsError):
+            return True
+        if isinstance(error, GarthHTTPError):
+            response = error.error.response
+            if (
+                response is not None
+                and response.status_code == TOO_MANY_REQUESTS_STATUS_CODE
+            ):
+                return True
+        error = error.__cause__
+    return False
@@ -9,8 +9,9 @@ def get_storage_directory_env() -> str:
     return os.getenv("STORAGE_DIRECTORY", "./")
 
 
-def get_storage_directory() -> str:
-    directory_path = get_storage_directory_env()
+def get_storage_directory(directory_path: str | None = None) -> str:
+    if directory_path is None:
+        directory_path = get_storage_directory_env()
     if not os.path.isdir(directory_path):
         raise RuntimeError(
             f"Storage directory {directory_path} does not exist or is not a directory."
@@ -22,12 +23,28 @@ def get_storage_directory() -> str:
     return directory_path
 
 
-def get_full_storage_path(filename: str) -> str:
-    return os.path.join(get_storage_directory(), filename)
+def get_full_storage_path(filename: str, directory_path: str | None = None) -> str:
+    """
+    Returns the path of the file in the given storage directory, defaulting to the one
+    configured with the environment variable STORAGE_DIRECTORY.
+    """
+    return os.path.join(get_storage_directory(directory_path), filename)
+
+
+RAW_DATA_FILENAME = "weight.json"
+SYNC_STATE_FILENAME = "sync_state.json"
+WEIGHT_CACHE_FILENAME = "weight.npy"
+WEIGH_IN_LOG_FILENAME = "weight.jsonl"
 
+RAW_DATA_FILE = get_full_storage_path(RAW_DATA_FILENAME)
+SYNC_STATE_FILE = get_full_storage_path(SYNC_STATE_FILENAME)
+WEIGHT_CACHE_FILE = get_full_storage_path(WEIGHT_CACHE_FILENAME)
+WEIGH_IN_LOG_FILE = get_full_storage_path(WEIGH_IN_LOG_FILENAME)
 
-RAW_DATA_FILE = get_full_storage_path("weight.json")
+WEIGHT_CHANGE_PNG_FILENAME = "weight_change.png"
+WEIGHT_PNG_FILENAME = "weight.png"
+REMAINING_DAYS_WEIGHT_PNG_FILENAME = "remaining_days_weight.png"
 
-WEIGHT_CHANGE_PNG = get_full_storage_path("weight_change.png")
-WEIGHT_PNG = get_full_storage_path("weight.png")
-REMAINING_DAYS_WEIGHT_PNG = get_full_storage_path("remaining_days_weight.png")
+WEIGHT_CHANGE_PNG = get_full_storage_path(WEIGHT_CHANGE_PNG_FILENAME)
+WEIGHT_PNG = get_full_storage_path(WEIGHT_PNG_FILENAME)
+REMAINING_DAYS_WEIGHT_PNG = get_full_storage_path(REMAINING_DAYS_WEIGHT_PNG_FILENAME)
@@ -0,0 +1,313 @@
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO
+
+import numpy as np
+import pandas as pd
+
+from scripts.daily_series import DailyWeightSeries
+from scripts.dataframe_creator import (
+    FIRST_WEIGH_IN,
+    MILLISECONDS_PER_DAY,
+    DailyWeightAggregation,
+    WeightDataFrameCreator,
+    aggregate_daily_weights,
+    create_daily_series,
+)
+
+CSV_SUFFIX = ".csv"
+FIT_SUFFIX = ".fit"
+
+DEFAULT_CSV_CHUNK_SIZE = 100_000
+DEFAULT_MAX_WORKERS = 4
+
+GRAMS_PER_UNIT = {"g": 1.0, "kg": 1000.0, "lb": 453.59237}
+
+# FIT timestamps are seconds since 1989-12-31 00:00 UTC
+FIT_EPOCH_OFFSET_SECONDS = 631065600
+FIT_WEIGHT_SCALE_MESSAGE = 30
+FIT_TIMESTAMP_FIELD = 253
+FIT_WEIGHT_FIELD = 0
+# weight in kg * 100, 0xFFFE is sent while the scale is still calculating
+FIT_WEIGHT_SCALE = 100
+FIT_INVALID_WEIGHTS = (0xFFFE, 0xFFFF)
+
+WeighInArrays = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+_EMPTY_DAYS = np.empty(0, dtype=np.int64)
+_EMPTY_WEIGHTS = np.empty(0, dtype=np.float64)
+
+
+@dataclass(frozen=True)
+class CsvFormat:
+    """
+    The columns of a CSV export with one row per weigh-in: the local date and time of the
+    weigh-in (anything ``pd.to_datetime`` parses) and the weight in ``weight_unit``.
+    """
+
+    date_column: str = "date"
+    weight_column: str = "weight"
+    weight_unit: str = "kg"
+
+    def __post_init__(self):
+        if self.weight_unit not in GRAMS_PER_UNIT:
+            raise ValueError(
+                f"Weight unit must be one of {', '.join(GRAMS_PER_UNIT)}, "
+                f"got {self.weight_unit}"
+            )
+
+
+DEFAULT_CSV_FORMAT = CsvFormat()
+
+
+class WeightExportDataFrameCreator(WeightDataFrameCreator):
+    # pylint: disable=too-few-public-methods
+    """
+    Imports the weigh-ins of CSV exports (see ``CsvFormat``) and FIT files (e.g. Garmin's bulk
+    export, weight_scale messages) instead of the downloaded Garmin data.
+
+    ``path`` is a single export file or a directory, whose ``.csv`` and ``.fit`` files are
+    read in parallel by up to ``max_workers`` processes. Each file is read in bounded memory
+    (CSV files in chunks of ``csv_chunk_size`` rows, FIT files one record at a time) into
+    flat arrays of weigh-ins, which are then aggregated per day like the Garmin weigh-ins,
+    ordered by their time of day.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        csv_format: CsvFormat = DEFAULT_CSV_FORMAT,
+        aggregation: DailyWeightAggregation = FIRST_WEIGH_IN,
+        max_interpolated_gap_days: int | None = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        csv_chunk_size: int = DEFAULT_CSV_CHUNK_SIZE,
+    ):
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        self._path = path
+        self._csv_format = csv_format
+        self._aggregation = aggregation
+        self._max_interpolated_gap_days = max_interpolated_gap_days
+        self._max_workers = max_workers
+        self._csv_chunk_size = csv_chunk_size
+
+    def get_dataframe(self) -> pd.DataFrame:
+        return self.get_daily_series().to_dataframe()
+
+    def get_daily_series(self) -> DailyWeightSeries:
+        files = get_export_files(self._path)
+        arguments = [(file, self._csv_format, self._csv_chunk_size) for file in files]
+        if len(files) > 1 and self._max_workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(self._max_workers, len(files))
+            ) as executor:
+                results = list(executor.map(_read_export_file, *zip(*arguments)))
+        else:
+            results = [
+                _read_export_file(*file_arguments) for file_arguments in arguments
+            ]
+
+        days = np.concatenate([_EMPTY_DAYS] + [result[0] for result in results])
+        weights = np.concatenate([_EMPTY_WEIGHTS] + [result[1] for result in results])
+        times_of_day = np.concatenate([_EMPTY_DAYS] + [result[2] for result in results])
+        # chronological order, so that the first weigh-in of a day is the earliest one
+        order = np.lexsort((times_of_day, days))
+        days, weights = aggregate_daily_weights(
+            days[order],
+            weights[order],
+            times_of_day[order],
+            aggregation=self._aggregation,
+        )
+
+        return create_daily_series(days, weights, self._max_interpolated_gap_days)
+
+
+def get_export_files(path: str) -> list[str]:
+    """
+    Returns the path itself if it is a file, otherwise the CSV and FIT files in the directory,
+    sorted by name.
+    """
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(
+        os.path.join(path, filename)
+        for filename in os.listdir(path)
+        if os.path.splitext(filename)[1].lower() in (CSV_SUFFIX, FIT_SUFFIX)
+    )
+
+
+def read_csv_weigh_ins(
+    csv_file: str,
+    csv_format: CsvFormat = DEFAULT_CSV_FORMAT,
+    chunk_size: int = DEFAULT_CSV_CHUNK_SIZE,
+) -> WeighInArrays:
+    """
+    Read the weigh-ins of a CSV export in chunks of ``chunk_size`` rows. Rows without a date
+    or weight are skipped.
+
+    Returns:
+        WeighInArrays: The day (days since the epoch), the weight in grams and the local
+        time of day in milliseconds of each weigh-in, see ``weight_metrics_to_arrays``.
+    """
+    days, weights, times_of_day = [], [], []
+    with pd.read_csv(
+        csv_file,
+        usecols=[csv_format.date_column, csv_format.weight_column],
+        chunksize=chunk_size,
+    ) as reader:
+        for chunk in reader:
+            chunk = chunk.dropna()
+            timestamps = (
+                pd.to_datetime(chunk[csv_format.date_column])
+                .to_numpy()
+                .astype("datetime64[ms]")
+                .astype(np.int64)
+            )
+            days.append(timestamps // MILLISECONDS_PER_DAY)
+            times_of_day.append(timestamps % MILLISECONDS_PER_DAY)
+            weights.append(
+                chunk[csv_format.weight_column].to_numpy(dtype=np.float64)
+                * GRAMS_PER_UNIT[csv_format.weight_unit]
+            )
+
+    return (
+        np.concatenate([_EMPTY_DAYS, *days]),
+        np.concatenate([_EMPTY_WEIGHTS, *weights]),
+        np.concatenate([_EMPTY_DAYS, *times_of_day]),
+    )
+
+
+def read_fit_weigh_ins(fit_file: str) -> WeighInArrays:
+    """
+    Read the weigh-ins of the weight_scale messages of a FIT file, record by record.
+    All other messages are skipped, and the CRC is not checked.
+
+    FIT timestamps are in UTC and weight_scale messages carry no time zone, so the days and
+    times of day are UTC as well.
+
+    Returns:
+        WeighInArrays: See ``read_csv_weigh_ins``.
+    """
+    timestamps, weights = [], []
+    with open(fit_file, "rb") as f:
+        while header := f.read(1):
+            header_size = header[0]
+            header = header + _read_exactly(f, header_size - 1)
+            if header[8:12] != b".FIT":
+                raise ValueError(f"{fit_file} is not a FIT file")
+            data_size = struct.unpack("<I", header[4:8])[0]
+
+            for timestamp, weight in _iter_weight_scale_records(f, data_size):
+                timestamps.append(timestamp)
+                weights.append(weight)
+            # CRC of the file, chained FIT files follow after it
+            _read_exactly(f, 2)
+
+    unix_timestamps_in_ms = (
+        np.array(timestamps, dtype=np.int64) + FIT_EPOCH_OFFSET_SECONDS
+    ) * 1000
+    return (
+        unix_timestamps_in_ms // MILLISECONDS_PER_DAY,
+        np.array(weights, dtype=np.float64) * (1000 / FIT_WEIGHT_SCALE),
+        unix_timestamps_in_ms % MILLISECONDS_PER_DAY,
+    )
+
+
+def _read_export_file(
+    export_file: str, csv_format: CsvFormat, csv_chunk_size: int
+) -> WeighInArrays:
+    suffix = os.path.splitext(export_file)[1].lower()
+    if suffix == CSV_SUFFIX:
+        return read_csv_weigh_ins(export_file, csv_format, chunk_size=csv_chunk_size)
+    if suffix == FIT_SUFFIX:
+        return read_fit_weigh_ins(export_file)
+    raise ValueError(f"Unknown export file type {export_file}")
+
+
+def _iter_weight_scale_records(f: BinaryIO, data_size: int):
+    # pylint: disable=too-many-locals
+    """
+    Yield the FIT timestamp and the raw weight of each valid weight_scale message in the
+    ``data_size`` bytes of records that follow the file header.
+    """
+    # local message type -> (global message number, byte order, fields (number, size))
+    definitions: dict[int, tuple[int, str, list[tuple[int, int]]]] = {}
+    last_timestamp = None
+
+    remaining = data_size
+    while remaining > 0:
+        record_header = _read_exactly(f, 1)[0]
+        remaining -= 1
+
+        if record_header & 0x80:
+            # compressed timestamp header: a 5 bit offset to the last timestamp
+            local_message_type = (record_header >> 5) & 0x03
+            offset = record_header & 0x1F
+            if last_timestamp is not None:
+                last_timestamp = (
+                    (last_timestamp & ~0x1F)
+                    + offset
+                    + (0x20 if offset < (last_timestamp & 0x1F) else 0)
+                )
+            timestamp = last_timestamp
+        elif record_header & 0x40:
+            definition = _read_exactly(f, 5)
+            byte_order = ">" if definition[1] else "<"
+            global_message_number = struct.unpack(f"{byte_order}H", definition[2:4])[0]
+            field_definitions = _read_exactly(f, 3 * definition[4])
+            fields = [
+                (field_definitions[i], field_definitions[i + 1])
+                for i in range(0, len(field_definitions), 3)
+            ]
+            remaining -= 5 + len(field_definitions)
+            # developer data flag
+            if record_header & 0x20:
+                number_of_developer_fields = _read_exactly(f, 1)[0]
+                developer_fields = _read_exactly(f, 3 * number_of_developer_fields)
+                fields += [
+                    (None, developer_fields[i + 1])
+                    for i in range(0, len(developer_fields), 3)
+                ]
+                remaining -= 1 + len(developer_fields)
+            definitions[record_header & 0x0F] = (
+                global_message_number,
+                byte_order,
+                fields,
+            )
+            continue
+        else:
+            local_message_type = record_header & 0x0F
+            timestamp = None
+
+        global_message_number, byte_order, fields = definitions[local_message_type]
+        values = {}
+        for field_number, size in fields:
+            raw_value = _read_exactly(f, size)
+            remaining -= size
+            if field_number == FIT_TIMESTAMP_FIELD and size == 4:
+                timestamp = last_timestamp = struct.unpack(f"{byte_order}I", raw_value)[
+                    0
+                ]
+            elif (
+                global_message_number == FIT_WEIGHT_SCALE_MESSAGE
+                and field_number == FIT_WEIGHT_FIELD
+                and size == 2
+            ):
+                values[FIT_WEIGHT_FIELD] = struct.unpack(f"{byte_order}H", raw_value)[0]
+
+        weight = values.get(FIT_WEIGHT_FIELD)
+        if (
+            global_message_number == FIT_WEIGHT_SCALE_MESSAGE
+            and timestamp is not None
+            and weight is not None
+            and weight not in FIT_INVALID_WEIGHTS
+        ):
+            yield timestamp, weight
+
+
+def _read_exactly(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Unexpected end of the FIT file")
+    return data
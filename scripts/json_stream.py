@@ -0,0 +1,77 @@
+import json
+import re
+from collections.abc import Iterator
+from typing import TextIO
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_array_items(
+    f: TextIO, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator:
+    """
+    Yield the items of the JSON array stored under ``key`` one at a time.
+
+    The file is read in chunks of ``chunk_size`` characters and only the item currently
+    being decoded is held in memory, so the document is never loaded as a whole. The
+    first occurrence of ``"key": [`` in the document is used, which is sufficient for
+    documents where the key is unique, such as the Garmin weigh-ins response.
+    """
+    decoder = json.JSONDecoder()
+    pattern = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+
+    buffer, position = _seek_array_start(f, pattern, chunk_size)
+    while True:
+        # skip whitespace and separators between the items
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer) and buffer[position] == ",":
+                position += 1
+                continue
+            if position < len(buffer):
+                break
+            buffer, position = _read_more(f, buffer, position, chunk_size)
+
+        if buffer[position] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # the item continues in the next chunk
+            buffer, position = _read_more(f, buffer, position, chunk_size)
+            continue
+
+        position = end
+        yield item
+
+
+def _seek_array_start(
+    f: TextIO, pattern: re.Pattern, chunk_size: int
+) -> tuple[str, int]:
+    buffer = ""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            raise ValueError(f"No array matching {pattern.pattern} found")
+        buffer += chunk
+
+        match = pattern.search(buffer)
+        if match is not None:
+            return buffer, match.end()
+
+        # keep enough characters to match a key split across two chunks
+        buffer = buffer[-len(pattern.pattern) :]
+
+
+def _read_more(
+    f: TextIO, buffer: str, position: int, chunk_size: int
+) -> tuple[str, int]:
+    chunk = f.read(chunk_size)
+    if not chunk:
+        raise ValueError("Unexpected end of the JSON document")
+    # drop the consumed part of the buffer
+    return buffer[position:] + chunk, 0
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+def divide_and_round_half_to_even(
+    numerators: np.ndarray, denominator: int
+) -> np.ndarray:
+    """
+    Integer division rounding to the nearest integer and ties to the even one, which is the
+    rounding rule of ``np.round`` and ``pd.Series.round``, without going through floats.
+    """
+    quotients, remainders = np.divmod(numerators, denominator)
+    round_up = (2 * remainders > denominator) | (
+        (2 * remainders == denominator) & (quotients % 2 == 1)
+    )
+    return quotients + round_up
+
+
+def rolling_means_in_grams(
+    weights: np.ndarray, windows: tuple[int, ...]
+) -> dict[int, np.ndarray]:
+    """
+    Compute the rolling means of integer weights for all windows from a single int64 prefix
+    sum array. Each mean is rounded exactly once to integer grams (half to even).
+
+    Returns:
+        dict[int, np.ndarray]: For each window, an int64 array aligned with ``weights``.
+        The first ``window - 1`` entries have no full window and are set to 0.
+    """
+    prefix_sums = np.zeros(len(weights) + 1, dtype=np.int64)
+    np.cumsum(weights, dtype=np.int64, out=prefix_sums[1:])
+
+    means = {}
+    for window in windows:
+        window_means = np.zeros(len(weights), dtype=np.int64)
+        if len(weights) >= window:
+            window_means[window - 1 :] = divide_and_round_half_to_even(
+                prefix_sums[window:] - prefix_sums[:-window], window
+            )
+        means[window] = window_means
+    return means
+
+
+def add_integer_moving_averages(
+    df: pd.DataFrame, column: str, windows: tuple[int, ...]
+) -> None:
+    """
+    Drop-in replacement for calling ``add_moving_average`` for each window, based on
+    ``rolling_means_in_grams``.
+
+    The same ``{column}_{window}d`` columns are added (float, NaN for the first days without
+    a full window), but the moving averages are already rounded to integer grams. Weekly
+    changes derived from them are the differences of the rounded averages, so they always
+    equal the change of the displayed averages, where rounding the float difference of the
+    pandas path can be off by one gram.
+
+    The DataFrame is modified in-place, and no value is returned.
+    """
+    means = rolling_means_in_grams(df[column].to_numpy(dtype=np.int64), windows)
+    for window, window_means in means.items():
+        moving_average = window_means.astype(np.float64)
+        moving_average[: window - 1] = np.nan
+        df[f"{column}_{window}d"] = moving_average
@@ -0,0 +1,95 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# the median absolute deviation times this estimates the standard deviation of normally
+# distributed weights
+MAD_TO_STANDARD_DEVIATION = 1.4826
+
+
+@dataclass(frozen=True)
+class HampelFilter:
+    """
+    Rejects weigh-ins that are far from the ones around them, like a clothed weigh-in or
+    one of another person assigned to the user.
+
+    Each weigh-in is compared with the median of the ``half_window`` weigh-ins before and
+    after it, and rejected if it is more than ``threshold`` times the local standard
+    deviation away from it. The standard deviation is estimated from the rolling median of
+    the absolute deviations from the rolling medians, and is at least
+    ``min_deviation_in_grams`` so that a run of equal weigh-ins does not reject every small
+    change.
+
+    The rolling medians are pandas' sliding window medians, which keep the window sorted as
+    it moves instead of sorting every window, and run on all users at once.
+    """
+
+    threshold: float = 4.0
+    half_window: int = 7
+    min_deviation_in_grams: float = 150.0
+
+    def __post_init__(self):
+        if self.threshold <= 0 or self.half_window < 1:
+            raise ValueError(
+                "The threshold must be positive and the half window at least 1, got "
+                f"{self.threshold} and {self.half_window}"
+            )
+
+    @classmethod
+    def from_env(cls) -> "HampelFilter | None":
+        """
+        Create the filter from the environment variable WEIGHT_OUTLIER_THRESHOLD (the number
+        of standard deviations, e.g. "4"). None (default) if weigh-ins are not filtered.
+        """
+        threshold = os.getenv("WEIGHT_OUTLIER_THRESHOLD")
+        if threshold is None:
+            return None
+        try:
+            return cls(threshold=float(threshold))
+        except ValueError as e:
+            raise ValueError(
+                "Environment variable WEIGHT_OUTLIER_THRESHOLD must be a positive number, "
+                f"got {threshold}"
+            ) from e
+
+    @property
+    def name(self) -> str:
+        return f"hampel_{self.threshold:g}"
+
+    def find_outliers(self, weights: np.ndarray) -> np.ndarray:
+        """
+        Find the outliers among the weigh-ins of many users, one row per user with the
+        weigh-ins in chronological order, padded with NaN at the end.
+
+        Returns:
+            np.ndarray: A boolean array of the shape of ``weights``, True for the weigh-ins
+            to reject.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        # one column per user, the rolling windows run along the weigh-ins
+        df_weights = pd.DataFrame(weights.T)
+
+        medians = self._rolling_median(df_weights)
+        deviations = (df_weights - medians).abs()
+        standard_deviations = np.maximum(
+            MAD_TO_STANDARD_DEVIATION * self._rolling_median(deviations).to_numpy(),
+            self.min_deviation_in_grams,
+        )
+        # NaN compares as False, so padding is never an outlier
+        return (deviations.to_numpy() > self.threshold * standard_deviations).T
+
+    def _rolling_median(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.rolling(2 * self.half_window + 1, center=True, min_periods=1).median()
+
+
+def report_outliers(days: np.ndarray, weights: np.ndarray) -> None:
+    """
+    Print the rejected weigh-ins with their dates.
+    """
+    if len(days) == 0:
+        return
+    print(f"Rejected {len(days)} outlier weigh-ins:")
+    for day, weight in zip(days.astype("datetime64[D]"), weights):
+        print(f"  {day}: {weight:.0f} g")
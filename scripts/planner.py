@@ -0,0 +1,362 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from scripts.columns import DATE_COLUMN
+from scripts.daily_series import DailyWeightSeries
+from scripts.predictions import (
+    DAYS_PER_WEEK,
+    LOOK_BACK_DAYS,
+    MINIMUM_LOOK_BACK_DAYS,
+    quadratic_spline_interpolation_matrix,
+)
+from scripts.process_weight_data import (
+    get_next_target_weights,
+    get_target_weekly_change_percentage,
+)
+
+# the plan ends after two years if neither the goal weight nor the end date ends it earlier
+MAX_PLAN_WEEKS = 104
+
+WEIGHT_COLUMN = "weight"
+TARGET_WEIGHT_COLUMN = "target_weight_7d"
+
+
+def get_goal_weight() -> int | None:
+    """
+    Returns the goal weight in grams the plan ends at, from the environment variable
+    GOAL_WEIGHT_IN_GRAMS. None (default) if there is no goal weight.
+    """
+    goal_weight = os.getenv("GOAL_WEIGHT_IN_GRAMS")
+    if goal_weight is None:
+        return None
+    if not goal_weight.isdigit():
+        raise ValueError(
+            "Environment variable GOAL_WEIGHT_IN_GRAMS must be a non-negative integer, "
+            f"got {goal_weight}"
+        )
+    return int(goal_weight)
+
+
+def get_plan_end_date() -> pd.Timestamp | None:
+    """
+    Returns the date the plan ends at the latest (the plan includes its whole week), from
+    the environment variable PLAN_END_DATE (YYYY-MM-DD). None (default) if there is no end
+    date.
+    """
+    plan_end_date = os.getenv("PLAN_END_DATE")
+    if plan_end_date is None:
+        return None
+    return pd.Timestamp(plan_end_date)
+
+
+class DailyWeightPlanner:
+    """
+    Plans the daily weights of the user week by week, from the remaining days of this week
+    until the goal weight or the end date, see ``plan_daily_weights``.
+    """
+
+    # pylint: disable=too-few-public-methods
+    def __init__(
+        self,
+        daily_series: DailyWeightSeries,
+        df_weekly: pd.DataFrame,
+        goal_weight: int | None = None,
+        end_date: pd.Timestamp | None = None,
+    ):
+        self._daily_series = daily_series
+        self._df_weekly = df_weekly
+        self._goal_weight = goal_weight
+        self._end_date = end_date
+
+    def calculate(self) -> pd.DataFrame:
+        """
+        Returns the planned weight of every remaining day and the 7d target weight of its
+        week, indexed by date. The plan ends with the week the goal weight is reached in, and
+        is empty if the goal weight is never reached at the weekly change percentage.
+        """
+        target_this_week = self._df_weekly.tail(1)
+        target_this_week_weight = target_this_week["target_weight_7d"].values[0]
+        sunday_this_week = int(
+            target_this_week[DATE_COLUMN]
+            .values[0]
+            .astype("datetime64[D]")
+            .astype(np.int64)
+        )
+        remaining_days_this_week = sunday_this_week - self._daily_series.last_day
+
+        weeks = MAX_PLAN_WEEKS
+        if self._end_date is not None:
+            end_day = int(np.datetime64(self._end_date.date(), "D").astype(np.int64))
+            # the weeks up to the one of the end date, but at least this week
+            weeks = max(get_weeks_between(sunday_this_week, end_day) + 1, 1)
+
+        weekly_change_percentage = get_target_weekly_change_percentage()
+        if self._goal_weight is not None:
+            weeks_to_goal = get_weeks_to_goal_weights(
+                target_weights=np.array([target_this_week_weight]),
+                weekly_change_percentages=weekly_change_percentage,
+                goal_weights=np.array([self._goal_weight]),
+            )[0]
+            if np.isinf(weeks_to_goal):
+                return pd.DataFrame(
+                    {WEIGHT_COLUMN: [], TARGET_WEIGHT_COLUMN: []},
+                    index=pd.DatetimeIndex([], name=DATE_COLUMN),
+                    dtype=int,
+                )
+            # the rounding of the targets to grams can delay the goal by a week, the weeks
+            # after the goal are dropped
+            weeks = min(weeks, int(weeks_to_goal) + 2)
+
+        target_weights = project_weekly_target_weights(
+            target_weights=np.array([target_this_week_weight]),
+            weekly_change_percentages=np.array([weekly_change_percentage]),
+            weeks=weeks,
+            goal_weights=None
+            if self._goal_weight is None
+            else np.array([self._goal_weight]),
+        )
+        daily_weights = plan_daily_weights(
+            recent_weights=self._daily_series.tail(LOOK_BACK_DAYS).weights[np.newaxis],
+            target_weights=target_weights,
+            remaining_days=np.array([remaining_days_this_week]),
+        )
+
+        first_day_this_week = sunday_this_week - DAYS_PER_WEEK + 1
+        df_plan = pd.DataFrame(
+            {
+                WEIGHT_COLUMN: daily_weights[0].ravel(),
+                TARGET_WEIGHT_COLUMN: np.repeat(target_weights[0], DAYS_PER_WEEK),
+            },
+            index=pd.date_range(
+                start=pd.Timestamp(first_day_this_week, unit="D"),
+                periods=weeks * DAYS_PER_WEEK,
+                freq="D",
+                name=DATE_COLUMN,
+            ),
+        )
+        return df_plan.dropna().round().astype(int)
+
+
+def project_weekly_target_weights(
+    target_weights: np.ndarray,
+    weekly_change_percentages: np.ndarray,
+    weeks: int,
+    goal_weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Project the 7d target weight of this week of each user over the next weeks.
+
+    Like ``add_target_weight_change``, the target of a week is the one of the week before
+    changed by the weekly change percentage and rounded to grams every week (see
+    ``get_next_target_weights``), so the change compounds, computed week by week for all
+    users at once. A target beyond the goal weight of the user (in the direction of the
+    change) is set to the goal, and the plan of the user ends with the first week at the
+    goal.
+
+    Args:
+        target_weights: The 7d target weight of this week of each user.
+        weekly_change_percentages: The weekly change percentage of each user, or one for
+            all users.
+        weeks: The number of weeks to project, including this week.
+        goal_weights: The goal weight of each user, NaN for the users without one.
+
+    Returns:
+        np.ndarray: One row of ``weeks`` target weights per user, NaN after the week the
+        user reaches the goal weight.
+    """
+    target_weights = np.asarray(target_weights, dtype=np.float64)[:, np.newaxis]
+    weekly_change_percentages = np.broadcast_to(
+        weekly_change_percentages, target_weights.shape[:1]
+    )[:, np.newaxis]
+
+    projected_target_weights = np.empty((len(target_weights), weeks))
+    projected_target_weights[:, :1] = np.rint(target_weights)
+    for week in range(1, weeks):
+        projected_target_weights[:, week : week + 1] = get_next_target_weights(
+            projected_target_weights[:, week - 1 : week], weekly_change_percentages
+        )
+    if goal_weights is None:
+        return projected_target_weights
+
+    goal_weights = np.asarray(goal_weights, dtype=np.float64)[:, np.newaxis]
+    direction = np.sign(weekly_change_percentages)
+    # a user without a change only reaches a goal it is at already, NaN goals compare as
+    # False
+    at_goal = (projected_target_weights == goal_weights) | (
+        (direction != 0) & (direction * (projected_target_weights - goal_weights) >= 0)
+    )
+    projected_target_weights = np.where(at_goal, goal_weights, projected_target_weights)
+    projected_target_weights[np.cumsum(at_goal, axis=1) > 1] = np.nan
+    return projected_target_weights
+
+
+def get_weeks_to_goal_weights(
+    target_weights: np.ndarray,
+    weekly_change_percentages: np.ndarray,
+    goal_weights: np.ndarray,
+) -> np.ndarray:
+    """
+    Solve in how many weeks each user reaches the goal weight at the weekly change
+    percentage, i.e. the first week whose target in ``project_weekly_target_weights`` is at
+    the goal: the smallest ``week`` with ``target * (1 + percentage) ** week`` at or beyond
+    the goal, in closed form with logarithms (without the weekly rounding of the targets to
+    grams, which can move the goal by a week).
+
+    Returns:
+        np.ndarray: The number of weeks after this week for each user, 0 if this week's
+        target is at or beyond the goal already (at it for users without a change), and inf
+        if the user never reaches it without a change.
+    """
+    target_weights = np.asarray(target_weights, dtype=np.float64)
+    weekly_change_percentages = np.broadcast_to(
+        np.asarray(weekly_change_percentages, dtype=np.float64), target_weights.shape
+    )
+    goal_weights = np.asarray(goal_weights, dtype=np.float64)
+
+    direction = np.sign(weekly_change_percentages)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weeks = np.ceil(
+            np.log(goal_weights / target_weights) / np.log1p(weekly_change_percentages)
+            # a goal that is hit exactly is not a week later due to rounding errors
+            - 1e-9
+        )
+    # like in the projection, a goal at the target or behind it in the direction of the
+    # change is reached right away
+    at_goal = (target_weights == goal_weights) | (
+        (direction != 0) & (direction * (target_weights - goal_weights) >= 0)
+    )
+    weeks = np.where(at_goal, 0, weeks)
+    never = (direction == 0) & (target_weights != goal_weights)
+    return np.where(never & ~np.isnan(goal_weights), np.inf, weeks)
+
+
+def get_required_weekly_change_percentages(
+    target_weights: np.ndarray, goal_weights: np.ndarray, weeks: np.ndarray
+) -> np.ndarray:
+    """
+    Solve which weekly change percentage makes the target of each user reach the goal
+    weight in the given number of weeks after this week, the inverse of
+    ``get_weeks_to_goal_weights``: ``(goal / target) ** (1 / weeks) - 1``.
+
+    Returns:
+        np.ndarray: The weekly change percentage of each user, NaN for less than one week.
+    """
+    target_weights = np.asarray(target_weights, dtype=np.float64)
+    goal_weights = np.asarray(goal_weights, dtype=np.float64)
+    weeks = np.broadcast_to(np.asarray(weeks, dtype=np.float64), target_weights.shape)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weekly_change_percentages = np.expm1(
+            np.log(goal_weights / target_weights) / weeks
+        )
+    return np.where(weeks >= 1, weekly_change_percentages, np.nan)
+
+
+def get_weeks_between(first_days: np.ndarray, last_days: np.ndarray) -> np.ndarray:
+    """
+    The number of weeks (Monday to Sunday) from the ones of the first days (days since the
+    epoch) to the ones of the last days, 0 within the same week.
+    """
+    # weeks since the Monday before the epoch (1970-01-01 was a Thursday)
+    return (np.asarray(last_days) + 3) // DAYS_PER_WEEK - (
+        np.asarray(first_days) + 3
+    ) // DAYS_PER_WEEK
+
+
+def plan_daily_weights(
+    recent_weights: np.ndarray,
+    target_weights: np.ndarray,
+    remaining_days: np.ndarray,
+) -> np.ndarray:
+    """
+    Plan the daily weights of many users week by week, so that the mean of each week meets
+    its 7d target weight.
+
+    This extends ``forecast_remaining_days_weights`` to all weeks of the plan: the sum every
+    week needs is known on its Sunday, the cumulative sums are interpolated with a quadratic
+    spline in between, and the daily weights are their differences. The interpolation is
+    one matrix for every number of remaining days of this week and number of weeks, so the
+    whole plan of all users with the same remaining days is a single matrix product.
+
+    Args:
+        recent_weights: The most recent daily weights, one row per user with today last and
+            at least 6 days.
+        target_weights: One row of 7d target weights per user, starting with this week, see
+            ``project_weekly_target_weights``. NaN after the last week of the user's plan.
+        remaining_days: The number of days left in this week (1 to 7) of each user.
+
+    Returns:
+        np.ndarray: The planned weights as users x weeks x days (Monday to Sunday), NaN for
+        the days of this week that passed and the weeks after the user's plan.
+    """
+    recent_weights = np.asarray(recent_weights, dtype=np.float64)
+    target_weights = np.asarray(target_weights, dtype=np.float64)
+    users, weeks = target_weights.shape
+    remaining_days = np.broadcast_to(remaining_days, (users,))
+
+    # the weeks after a plan hold the last target, so that the spline stays flat there
+    planned_weeks = ~np.isnan(target_weights)
+    last_planned_weeks = np.maximum.accumulate(
+        np.where(planned_weeks, np.arange(weeks), 0), axis=1
+    )
+    held_target_weights = np.take_along_axis(target_weights, last_planned_weeks, axis=1)
+
+    daily_weights = np.full((users, weeks * DAYS_PER_WEEK), np.nan)
+    for remaining in np.unique(remaining_days):
+        group = remaining_days == remaining
+        daily_weights[group, DAYS_PER_WEEK - remaining :] = _plan_daily_weights(
+            recent_weights[group], held_target_weights[group], int(remaining)
+        )
+
+    daily_weights = daily_weights.reshape(users, weeks, DAYS_PER_WEEK)
+    daily_weights[~planned_weeks] = np.nan
+    return daily_weights
+
+
+def _plan_daily_weights(
+    recent_weights: np.ndarray, target_weights: np.ndarray, remaining_days: int
+) -> np.ndarray:
+    passed_days = DAYS_PER_WEEK - remaining_days
+    look_back_days = max(MINIMUM_LOOK_BACK_DAYS, passed_days)
+    last_weights = recent_weights[:, -look_back_days:]
+
+    # the days looked back on that belong to last week are part of the sums as well
+    first_sunday_sums = target_weights[:, 0] * DAYS_PER_WEEK + last_weights[
+        :, : look_back_days - passed_days
+    ].sum(axis=1)
+    sunday_sums = first_sunday_sums[:, np.newaxis] + DAYS_PER_WEEK * np.cumsum(
+        np.column_stack([np.zeros(len(target_weights)), target_weights[:, 1:]]),
+        axis=1,
+    )
+    known_sums = np.column_stack([np.cumsum(last_weights, axis=1), sunday_sums])
+
+    weeks = target_weights.shape[1]
+    sums = (
+        known_sums
+        @ _get_plan_interpolation_matrix(look_back_days, remaining_days, weeks).T
+    )
+    return np.diff(sums, axis=1)
+
+
+@lru_cache
+def _get_plan_interpolation_matrix(
+    look_back_days: int, remaining_days: int, weeks: int
+) -> np.ndarray:
+    """
+    The matrix that maps the known sums (the look back days and the Sundays) to the sums of
+    today and all days of the plan. The rows of the known sums select them exactly, so the
+    weeks meet their targets without rounding errors of the spline.
+    """
+    sundays = look_back_days - 1 + remaining_days + DAYS_PER_WEEK * np.arange(weeks)
+    known_positions = np.concatenate([np.arange(look_back_days), sundays])
+    positions = np.arange(look_back_days - 1, sundays[-1] + 1)
+
+    matrix = quadratic_spline_interpolation_matrix(
+        known_positions.astype(np.float64), positions.astype(np.float64)
+    )
+    known_rows = np.searchsorted(positions, known_positions[look_back_days - 1 :])
+    matrix[known_rows] = np.eye(len(known_positions))[look_back_days - 1 :]
+    return matrix
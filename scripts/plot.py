@@ -1,4 +1,5 @@
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import seaborn as sns
 
@@ -8,17 +9,36 @@ from scripts.columns import (
     WEIGHT_IN_GRAMS_14D_COLUMN,
     WEIGHT_IN_GRAMS_COLUMN,
 )
-from scripts.files import REMAINING_DAYS_WEIGHT_PNG, WEIGHT_CHANGE_PNG, WEIGHT_PNG
+from scripts.daily_series import DailyWeightSeries
+from scripts.files import (
+    REMAINING_DAYS_WEIGHT_PNG,
+    REMAINING_DAYS_WEIGHT_PNG_FILENAME,
+    WEIGHT_CHANGE_PNG,
+    WEIGHT_CHANGE_PNG_FILENAME,
+    WEIGHT_PNG,
+    WEIGHT_PNG_FILENAME,
+    get_full_storage_path,
+)
 
 COLOR_WEIGHT_7D_AVERAGE = "#1f77b4"
 COLOR_WEIGHT_14D_AVERAGE = "#ff7f0e"
 COLOR_RED = "#d62728"
 COLOR_MISC = "#9467bd"
 
+# number of days shown in the plot of the remaining days
+LAST_DAYS = 14
+
 
 def plot_figures(
-    df_daily: pd.DataFrame, df: pd.DataFrame, remaining_days_weight: pd.Series
+    daily_series: DailyWeightSeries,
+    df: pd.DataFrame,
+    remaining_days_weight: pd.Series,
+    storage_directory: str | None = None,
 ) -> None:
+    """
+    Plot the figures into the storage directory of the user, defaulting to the one
+    configured with the environment variable STORAGE_DIRECTORY.
+    """
     # pylint: disable=too-many-locals, too-many-statements
     last_two_rows = df.tail(2)
     df = df.drop(df.tail(1).index)
@@ -26,16 +46,25 @@ def plot_figures(
     plot_weight(
         df=df,
         targets_df=last_two_rows.tail(1),
+        path=get_full_storage_path(WEIGHT_PNG_FILENAME, storage_directory),
     )
     plot_remaining_days_weight(
-        remaining_days_weight, df_daily=df_daily, last_two_rows=last_two_rows
+        remaining_days_weight,
+        daily_series=daily_series,
+        last_two_rows=last_two_rows,
+        path=get_full_storage_path(
+            REMAINING_DAYS_WEIGHT_PNG_FILENAME, storage_directory
+        ),
+    )
+    plot_weekly_change(
+        df, path=get_full_storage_path(WEIGHT_CHANGE_PNG_FILENAME, storage_directory)
     )
-    plot_weekly_change(df)
 
 
 def plot_weight(
     df: pd.DataFrame,
     targets_df: pd.DataFrame,
+    path: str = WEIGHT_PNG,
 ) -> None:
     is_gaining_weight = (df["target_weight_change_14d"] > 0).any()
     va_position_14d = "top" if is_gaining_weight else "bottom"
@@ -134,37 +163,31 @@ def plot_weight(
 
     # save the plot
     fig.tight_layout()
-    fig.savefig(WEIGHT_PNG)
+    fig.savefig(path)
+    plt.close(fig)
 
 
 def plot_remaining_days_weight(
     remaining_days_weight: pd.Series,
-    df_daily: pd.DataFrame,
+    daily_series: DailyWeightSeries,
     last_two_rows: pd.DataFrame,
+    path: str = REMAINING_DAYS_WEIGHT_PNG,
 ) -> None:
     # pylint: disable=too-many-locals
-    df_raw_data_14_days = (
-        df_daily[df_daily[WEIGHT_IN_GRAMS_COLUMN] != 0][
-            [DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN]
-        ]
-        .tail(14)
-        .copy()
+    last_days = daily_series.tail(LAST_DAYS)
+    df_raw_data_14_days = _create_last_days_df(
+        last_days, last_days.weights, WEIGHT_IN_GRAMS_COLUMN
     )
 
-    df_daily_14_days = (
-        df_daily[df_daily[WEIGHT_IN_GRAMS_7D_COLUMN] != 0][
-            [DATE_COLUMN, WEIGHT_IN_GRAMS_7D_COLUMN]
-        ]
-        .tail(14)
-        .copy()
+    # only the days of the last days' windows are needed for their moving averages
+    last_days_7d = daily_series.tail(LAST_DAYS + 7 - 1)
+    df_daily_14_days = _create_last_days_df(
+        last_days_7d, last_days_7d.moving_average(7), WEIGHT_IN_GRAMS_7D_COLUMN
     )
 
-    df_daily_14d_14_days = (
-        df_daily[df_daily[WEIGHT_IN_GRAMS_14D_COLUMN] != 0][
-            [DATE_COLUMN, WEIGHT_IN_GRAMS_14D_COLUMN]
-        ]
-        .tail(14)
-        .copy()
+    last_days_14d = daily_series.tail(LAST_DAYS + 14 - 1)
+    df_daily_14d_14_days = _create_last_days_df(
+        last_days_14d, last_days_14d.moving_average(14), WEIGHT_IN_GRAMS_14D_COLUMN
     )
 
     fig, ax = plt.subplots(figsize=(12, 6))
@@ -302,10 +325,23 @@ def plot_remaining_days_weight(
     ax.legend()
 
     fig.tight_layout()
-    fig.savefig(REMAINING_DAYS_WEIGHT_PNG)
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def _create_last_days_df(
+    daily_series: DailyWeightSeries, values: np.ndarray, column: str
+) -> pd.DataFrame:
+    """
+    The dates and integer values of the last days with a value, for plotting.
+    """
+    df = pd.DataFrame(
+        {DATE_COLUMN: daily_series.dates.astype("datetime64[ns]"), column: values}
+    )
+    return df.dropna().astype({column: int}).tail(LAST_DAYS)
 
 
-def plot_weekly_change(df: pd.DataFrame) -> None:
+def plot_weekly_change(df: pd.DataFrame, path: str = WEIGHT_CHANGE_PNG) -> None:
     # pylint: disable=too-many-locals, too-many-statements
 
     fig, ax = plt.subplots(figsize=(12, 6))
@@ -368,4 +404,5 @@ def plot_weekly_change(df: pd.DataFrame) -> None:
 
     # save the plot
     fig.tight_layout()
-    fig.savefig(WEIGHT_CHANGE_PNG)
+    fig.savefig(path)
+    plt.close(fig)
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from scripts.columns import DATE_COLUMN
+from scripts.engine import SUNDAY, ProcessingEngine
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+DAY_COLUMN = "day"
+WEEK_COLUMN = "week"
+
+
+class PolarsEngine(ProcessingEngine):
+    """
+    Runs the transformations as lazy Polars queries, which are optimized as a whole and
+    executed on all cores. Polars is an optional dependency, install it with
+    ``pip install polars``.
+
+    The weights are integers, so the rolling sums are exact and the results are identical
+    to the ones of the pandas engine.
+    """
+
+    def __init__(self):
+        if pl is None:
+            raise ImportError("The polars engine requires polars, install it first")
+
+    def add_moving_averages(
+        self, df: pd.DataFrame, column: str, windows: tuple[int, ...]
+    ) -> pd.DataFrame:
+        moving_averages = (
+            pl.LazyFrame({column: df[column].to_numpy()})
+            .select(
+                pl.col(column)
+                .rolling_mean(window_size=window)
+                .alias(f"{column}_{window}d")
+                for window in windows
+            )
+            .collect()
+        )
+        return df.assign(
+            **{
+                name: moving_averages[name].to_numpy().astype(np.float64)
+                for name in moving_averages.columns
+            }
+        )
+
+    def create_weekly_table(
+        self, df: pd.DataFrame, column: str, windows: tuple[int, ...]
+    ) -> pd.DataFrame:
+        averages = [f"{column}_{window}d" for window in windows]
+        weekly = (
+            pl.LazyFrame(
+                {
+                    DAY_COLUMN: df.index.to_numpy()
+                    .astype("datetime64[D]")
+                    .astype(np.int64),
+                    **{
+                        average: df[average].to_numpy(np.float64)
+                        for average in averages
+                    },
+                }
+            )
+            # weeks since the Monday before the epoch (1970-01-01 was a Thursday)
+            .with_columns(((pl.col(DAY_COLUMN) + 3) // 7).alias(WEEK_COLUMN))
+            .group_by(WEEK_COLUMN, maintain_order=True)
+            .last()
+            # only completed weeks, the last day of which is a Sunday
+            .filter((pl.col(DAY_COLUMN) + 3) % 7 == SUNDAY)
+            .select(
+                pl.col(DAY_COLUMN),
+                *(
+                    expression
+                    for average in averages
+                    for expression in (
+                        pl.col(average).alias(f"{average}_weekly"),
+                        pl.when(pl.col(WEEK_COLUMN).diff() == 1)
+                        .then(pl.col(average).diff())
+                        .alias(f"{average}_weekly_change"),
+                    )
+                ),
+            )
+            .collect()
+        )
+
+        index = pd.DatetimeIndex(
+            weekly[DAY_COLUMN]
+            .to_numpy()
+            .astype("datetime64[D]")
+            .astype("datetime64[ns]"),
+            name=DATE_COLUMN,
+        )
+        return pd.DataFrame(
+            {
+                name: weekly[name].to_numpy().astype(np.float64)
+                for name in weekly.columns
+                if name != DAY_COLUMN
+            },
+            index=index,
+        )
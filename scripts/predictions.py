@@ -1,17 +1,23 @@
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
 
-from scripts.columns import (
-    DATE_COLUMN,
-    WEIGHT_IN_GRAMS_7D_COLUMN,
-    WEIGHT_IN_GRAMS_COLUMN,
-)
+from scripts.columns import DATE_COLUMN
+from scripts.daily_series import DailyWeightSeries
+
+DAYS_PER_WEEK = 7
+# the forecast uses the weights of the passed days of this week, but at least of two days
+MINIMUM_LOOK_BACK_DAYS = 2
+LOOK_BACK_DAYS = DAYS_PER_WEEK - 1
+# forecasts within this of a full gram are float noise of the interpolation
+WHOLE_GRAM_TOLERANCE = 1e-6
 
 
 class DailyWeightForecaster:
     # pylint: disable=too-few-public-methods
-    def __init__(self, df_daily: pd.DataFrame, df_weekly: pd.DataFrame):
-        self._df_daily = df_daily
+    def __init__(self, daily_series: DailyWeightSeries, df_weekly: pd.DataFrame):
+        self._daily_series = daily_series
         self._df_weekly = df_weekly
 
     def calculate(self) -> pd.Series:
@@ -21,44 +27,23 @@ class DailyWeightForecaster:
         remaining_days_this_week = self._get_remaining_days_this_week(
             target_this_week=target_this_week
         )
-        passed_days_this_week = 7 - remaining_days_this_week
+        passed_days_this_week = DAYS_PER_WEEK - remaining_days_this_week
 
-        raw_data_weight_first_days = self._df_daily[WEIGHT_IN_GRAMS_COLUMN].tail(
+        raw_data_weight_first_days = self._daily_series.tail(
             passed_days_this_week
+        ).weights
+
+        remaining_days_weight = pd.Series(
+            forecast_remaining_days_weights(
+                recent_weights=self._daily_series.tail(LOOK_BACK_DAYS).weights[
+                    np.newaxis
+                ],
+                target_weights=np.array([target_this_week_weight]),
+                remaining_days=np.array([remaining_days_this_week]),
+            )[0, :remaining_days_this_week],
+            name="weight",
         )
 
-        number_of_days_to_look_back = max(2, passed_days_this_week)
-
-        last_7d_weights = (
-            self._df_daily[WEIGHT_IN_GRAMS_COLUMN]
-            .tail(number_of_days_to_look_back)
-            .values.tolist()
-        )
-        # how many days to look back
-        number_of_last_weeks_days = max(
-            0, number_of_days_to_look_back - passed_days_this_week
-        )
-        raw_weight_last_days = last_7d_weights[:number_of_last_weeks_days]
-        target_weight_sum_with_last_days = target_this_week_weight * 7 + sum(
-            raw_weight_last_days
-        )
-
-        # interpolate using pandas on the sums
-        interpolate_df = pd.DataFrame()
-        interpolate_df["weight"] = (
-            np.cumsum(last_7d_weights).tolist()
-            + (remaining_days_this_week - 1) * [np.nan]
-            + [float(target_weight_sum_with_last_days)]
-        )
-        remaining_days_weight = (
-            interpolate_df["weight"]
-            .interpolate(method="quadratic")
-            .diff()
-            .tail(remaining_days_this_week)
-        )
-
-        remaining_days_weight = remaining_days_weight.reset_index(drop=True)
-
         self._add_date_to_remaining_days_weight(
             remaining_days_weight=remaining_days_weight,
         )
@@ -69,14 +54,16 @@ class DailyWeightForecaster:
             raw_data_weight_first_days=raw_data_weight_first_days,
         )
 
-        return remaining_days_weight.astype(int)
+        return truncate_to_grams(remaining_days_weight)
 
     def _get_remaining_days_this_week(self, target_this_week: pd.DataFrame) -> int:
-        assert self._df_daily is not None
+        assert self._daily_series is not None
+
+        target_this_week_day = pd.Timestamp(target_this_week[DATE_COLUMN].values[0])
+        return (target_this_week_day - self._get_most_recent_reading_date()).days
 
-        target_this_week_day = target_this_week[DATE_COLUMN].values[0]
-        most_recent_reading_date = self._df_daily[DATE_COLUMN].max()
-        return (target_this_week_day - most_recent_reading_date).days
+    def _get_most_recent_reading_date(self) -> pd.Timestamp:
+        return pd.Timestamp(self._daily_series.last_day, unit="D")
 
     def _add_date_to_remaining_days_weight(
         self, remaining_days_weight: pd.Series
@@ -86,31 +73,23 @@ class DailyWeightForecaster:
         """
         remaining_days_this_week = len(remaining_days_weight)
 
-        df_7d_last = (
-            self._df_daily[self._df_daily[WEIGHT_IN_GRAMS_7D_COLUMN] != 0][
-                [DATE_COLUMN, WEIGHT_IN_GRAMS_7D_COLUMN]
-            ]
-            .tail(1)
-            .copy()
+        remaining_days_weight.index = (
+            self._get_most_recent_reading_date()
+            + pd.to_timedelta(np.arange(1, remaining_days_this_week + 1), unit="D")
         )
 
-        remaining_days_weight.index = df_7d_last[DATE_COLUMN].values[
-            0
-        ] + pd.to_timedelta(np.arange(1, remaining_days_this_week + 1), unit="D")
-
     def _check_correctness(
         self,
         target_this_week_weight: float,
         remaining_days_weight: pd.Series,
-        raw_data_weight_first_days: pd.Series,
+        raw_data_weight_first_days: np.ndarray,
     ):
         """
         Check correctness of the calculation by comparing the average
         of the targeted weights with the target weight for this week.
         """
         targeted_weights_this_week: list[float] = (
-            raw_data_weight_first_days.values.tolist()
-            + remaining_days_weight.values.tolist()
+            raw_data_weight_first_days.tolist() + remaining_days_weight.values.tolist()
         )
         average_targeted_weight_this_week = (
             np.mean(targeted_weights_this_week).round().astype(int)
@@ -123,3 +102,139 @@ class DailyWeightForecaster:
                 average_targeted_weight_this_week,
                 target_this_week_weight,
             )
+
+
+def truncate_to_grams(
+    weights: np.ndarray | pd.Series,
+) -> np.ndarray | pd.Series:
+    """
+    Truncate the forecasted weights to full grams. A weight that is a full gram up to float
+    noise, e.g. 78915.99999999997, is rounded to it first instead of being truncated to the
+    gram below.
+    """
+    return np.floor(weights + WHOLE_GRAM_TOLERANCE).astype(int)
+
+
+def forecast_remaining_days_weights(
+    recent_weights: np.ndarray,
+    target_weights: np.ndarray,
+    remaining_days: np.ndarray,
+) -> np.ndarray:
+    """
+    Forecast the daily weights for the remaining days of this week, for many users at once.
+
+    For each user, the cumulative sums of the most recent weights are interpolated up to the
+    sum the week needs to average the 7d target weight, and the daily weights are the
+    differences of the interpolated sums. The interpolation is the quadratic spline of
+    ``pd.Series.interpolate(method="quadratic")``. The spline is linear in the sums, so it
+    is precomputed as a matrix for every number of remaining days and applied to all users
+    with the same number of remaining days in a single matrix product.
+
+    Args:
+        recent_weights: The most recent daily weights, one row per user with today last and
+            at least 6 days.
+        target_weights: The 7d target weight of this week of each user.
+        remaining_days: The number of days left in this week (1 to 7) of each user.
+
+    Returns:
+        np.ndarray: One row of 7 weights per user, NaN after the user's remaining days.
+    """
+    recent_weights = np.asarray(recent_weights, dtype=np.float64)
+    target_weights = np.asarray(target_weights, dtype=np.float64)
+    remaining_days = np.broadcast_to(remaining_days, target_weights.shape)
+
+    remaining_days_weights = np.full((len(target_weights), DAYS_PER_WEEK), np.nan)
+    for remaining in np.unique(remaining_days):
+        users = remaining_days == remaining
+        remaining_days_weights[users, :remaining] = _forecast_remaining_days_weights(
+            recent_weights[users], target_weights[users], int(remaining)
+        )
+    return remaining_days_weights
+
+
+def _forecast_remaining_days_weights(
+    recent_weights: np.ndarray, target_weights: np.ndarray, remaining_days: int
+) -> np.ndarray:
+    passed_days = DAYS_PER_WEEK - remaining_days
+    look_back_days = max(MINIMUM_LOOK_BACK_DAYS, passed_days)
+    last_weights = recent_weights[:, -look_back_days:]
+
+    # the days looked back on that belong to last week are part of the sums as well
+    target_weight_sums = target_weights * DAYS_PER_WEEK + last_weights[
+        :, : look_back_days - passed_days
+    ].sum(axis=1)
+    known_sums = np.column_stack([np.cumsum(last_weights, axis=1), target_weight_sums])
+
+    interpolated_sums = (
+        known_sums @ _get_interpolation_matrix(look_back_days, remaining_days).T
+    )
+    sums = np.column_stack([known_sums[:, -2], interpolated_sums, known_sums[:, -1]])
+    return np.diff(sums, axis=1)
+
+
+@lru_cache
+def _get_interpolation_matrix(look_back_days: int, remaining_days: int) -> np.ndarray:
+    """
+    The matrix that maps the known sums (the look back days and the end of the week) to the
+    interpolated sums of the remaining days but the last one.
+    """
+    known_positions = np.append(
+        np.arange(look_back_days), look_back_days + remaining_days - 1
+    )
+    missing_positions = np.arange(look_back_days, look_back_days + remaining_days - 1)
+    return quadratic_spline_interpolation_matrix(
+        known_positions.astype(np.float64), missing_positions.astype(np.float64)
+    )
+
+
+def quadratic_spline_interpolation_matrix(
+    x: np.ndarray, x_new: np.ndarray
+) -> np.ndarray:
+    """
+    Returns the matrix ``M`` so that ``M @ y`` are the values at ``x_new`` of the quadratic
+    spline interpolating the points ``(x, y)``, for any ``y``.
+
+    The spline is the one of ``scipy.interpolate.make_interp_spline(x, y, k=2)``, which
+    ``pd.Series.interpolate(method="quadratic")`` uses: a B-spline with its inner knots
+    halfway between the points. At least three points are required.
+    """
+    degree = 2
+    midpoints = (x[1:] + x[:-1]) / 2
+    knots = np.concatenate(
+        [np.repeat(x[0], degree + 1), midpoints[1:-1], np.repeat(x[-1], degree + 1)]
+    )
+    collocation_matrix = _bspline_basis(knots, x, degree)
+    # M = B @ C^-1, solved as C^T @ M^T = B^T instead of inverting C
+    return np.linalg.solve(
+        collocation_matrix.T, _bspline_basis(knots, x_new, degree).T
+    ).T
+
+
+def _bspline_basis(knots: np.ndarray, x: np.ndarray, degree: int) -> np.ndarray:
+    """
+    Evaluate all B-spline basis functions of the degree at x with the Cox-de Boor
+    recursion. Returns one row per x and one column per basis function.
+    """
+    x = x[:, np.newaxis]
+    basis = ((knots[:-1] <= x) & (x < knots[1:])).astype(np.float64)
+    # the end of the last knot interval belongs to it
+    last_interval = np.flatnonzero(knots[:-1] < knots[1:])[-1]
+    basis[x[:, 0] == knots[-1], last_interval] = 1.0
+
+    for d in range(1, degree + 1):
+        left_denominators = knots[d:-1] - knots[: -d - 1]
+        right_denominators = knots[d + 1 :] - knots[1:-d]
+        left = np.divide(
+            x - knots[: -d - 1],
+            left_denominators,
+            out=np.zeros((len(x), len(left_denominators))),
+            where=left_denominators > 0,
+        )
+        right = np.divide(
+            knots[d + 1 :] - x,
+            right_denominators,
+            out=np.zeros((len(x), len(right_denominators))),
+            where=right_denominators > 0,
+        )
+        basis = left * basis[:, :-1] + right * basis[:, 1:]
+    return basis
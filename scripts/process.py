@@ -1,29 +1,123 @@
+import os
+from datetime import date, timedelta
+
+import numpy as np
 import pandas as pd
 
-from scripts.columns import (
-    DATE_COLUMN,
-    WEIGHT_IN_GRAMS_7D_COLUMN,
-    WEIGHT_IN_GRAMS_14D_COLUMN,
-    WEIGHT_IN_GRAMS_COLUMN,
+from scripts.accounts import get_account_key
+from scripts.columns import DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN
+from scripts.daily_series import DailyWeightSeries
+from scripts.dataframe_cache import CachedWeightDataFrameCreator
+from scripts.dataframe_creator import (
+    DailyWeightAggregation,
+    GarminWeightDataFrameCreator,
+    WeightDataFrameCreator,
+)
+from scripts.files import (
+    RAW_DATA_FILENAME,
+    WEIGH_IN_LOG_FILENAME,
+    WEIGHT_CACHE_FILENAME,
+    get_full_storage_path,
+)
+from scripts.importers import WeightExportDataFrameCreator
+from scripts.planner import (
+    DailyWeightPlanner,
+    get_goal_weight,
+    get_plan_end_date,
+    get_required_weekly_change_percentages,
+    get_weeks_between,
+    get_weeks_to_goal_weights,
 )
-from scripts.dataframe_creator import GarminWeightDataFrameCreator
 from scripts.plot import plot_figures
-from scripts.predictions import DailyWeightForecaster
+from scripts.predictions import (
+    DAYS_PER_WEEK,
+    LOOK_BACK_DAYS,
+    DailyWeightForecaster,
+    forecast_remaining_days_weights,
+    truncate_to_grams,
+)
 from scripts.process_weight_data import (
+    BACKEND_PANDAS,
+    MOVING_AVERAGE_WINDOWS,
     add_target_weight_change,
     filter_df_to_weekly_changes,
+    get_target_weekly_change_percentage,
+    get_weekly_change_percentages_grid,
     process_weight_data,
+    sweep_target_weights,
 )
 from scripts.send import send
-
+from scripts.sparse_series import get_max_interpolated_gap_days
+from scripts.trend import (
+    BASIS_MOVING_AVERAGE,
+    BASIS_TREND,
+    add_weekly_trend,
+    get_weekly_change_basis,
+)
+from scripts.weigh_in_log import (
+    RAW_DATA_FORMAT_LOG,
+    GarminWeightLogDataFrameCreator,
+    get_raw_data_format,
+)
+from scripts.weight_store import (
+    SqliteWeightDataFrameCreator,
+    get_history_weeks,
+    get_weight_database_file,
+)
 
 MINIMUM_FULL_WEEK_DAYS = 21  # 3 weeks of data
 
+COPY_ON_WRITE_OPTION = "mode.copy_on_write"
 
-def process_weekly_data(df: pd.DataFrame) -> pd.DataFrame:
-    df_weekly = filter_df_to_weekly_changes(df)
 
-    df_weekly = pd.concat(
+def process_weekly_data(
+    df: pd.DataFrame,
+    backend: str = BACKEND_PANDAS,
+    basis: str = BASIS_MOVING_AVERAGE,
+    measured: np.ndarray | None = None,
+) -> pd.DataFrame:
+    """
+    Create the weekly overview with the targets from the daily DataFrame. With the trend
+    as basis, the weekly trend weights are added and both targets are based on them instead
+    of on the moving averages. The trend only follows the days marked as ``measured``, see
+    ``add_weekly_trend``.
+    """
+    df_weekly, basis_column = _create_weekly_changes(
+        df, backend=backend, basis=basis, measured=measured
+    )
+    df_weekly = add_next_week(df_weekly)
+    df_weekly = add_target_weight_change(
+        df_weekly, window=14, basis_column=basis_column
+    )
+    df_weekly = add_target_weight_change(df_weekly, window=7, basis_column=basis_column)
+
+    df_weekly = df_weekly.fillna(0).astype("int")
+    df_weekly = df_weekly.reset_index()
+    df_weekly[DATE_COLUMN] = pd.to_datetime(df_weekly[DATE_COLUMN])
+    return df_weekly
+
+
+def _create_weekly_changes(
+    df: pd.DataFrame, backend: str, basis: str, measured: np.ndarray | None = None
+) -> tuple[pd.DataFrame, str | None]:
+    """
+    Returns the weekly changes, and the weekly column to base the targets on (None for the
+    moving average of each target's window).
+    """
+    df_weekly = filter_df_to_weekly_changes(df, backend=backend)
+    if basis != BASIS_TREND:
+        return df_weekly, None
+    return (
+        add_weekly_trend(df_weekly, df, measured=measured),
+        f"{WEIGHT_IN_GRAMS_COLUMN}_trend_weekly",
+    )
+
+
+def add_next_week(df_weekly: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append an empty row for the week after the last completed one, the current week.
+    """
+    return pd.concat(
         [
             df_weekly,
             pd.DataFrame(
@@ -37,68 +131,352 @@ def process_weekly_data(df: pd.DataFrame) -> pd.DataFrame:
         ]
     )
 
-    df_weekly = add_target_weight_change(df_weekly, window=14)
-    df_weekly = add_target_weight_change(df_weekly, window=7)
 
-    df_weekly = df_weekly.fillna(0).astype("int")
-    df_weekly = df_weekly.reset_index()
-    df_weekly[DATE_COLUMN] = pd.to_datetime(df_weekly[DATE_COLUMN])
-    return df_weekly
+def get_weight_dataframe_creator(
+    storage_directory: str | None = None, user_id: str | None = None
+) -> WeightDataFrameCreator:
+    """
+    Returns the creator for the weights of the user: the SQLite store if WEIGHT_DATABASE_FILE
+    is set (the user is identified by ``user_id``, which is required with a storage directory,
+    or by GARMIN_EMAIL), the downloaded raw data in the storage directory of the user
+    otherwise (by default the one configured with STORAGE_DIRECTORY). History before a gap
+    longer than MAX_INTERPOLATED_GAP_DAYS is left out, and the weigh-ins of each day are
+    aggregated as configured with WEIGHT_AGGREGATION and WEIGHT_TIME_OF_DAY_WINDOW (the
+    database stores one weight per day already). The database is only queried up to today,
+    and from the start of the last WEIGHT_HISTORY_WEEKS weeks on if that is set, see
+    ``get_history_start_date``.
 
+    If WEIGHT_IMPORT_PATH is set, the weigh-ins are imported from the CSV or FIT export file
+    (or directory of export files) at that path instead. It names the files of a single user,
+    so it only applies without a storage directory.
+    """
+    max_interpolated_gap_days = get_max_interpolated_gap_days()
+    aggregation = DailyWeightAggregation.from_env()
 
-def process_daily_data(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.fillna(0).astype("int")
-    df = df[
-        [WEIGHT_IN_GRAMS_COLUMN, WEIGHT_IN_GRAMS_7D_COLUMN, WEIGHT_IN_GRAMS_14D_COLUMN]
-    ]
-    df = df.reset_index()
-    df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN])
-    return df
+    weight_import_path = os.getenv("WEIGHT_IMPORT_PATH")
+    if weight_import_path is not None and storage_directory is None:
+        return WeightExportDataFrameCreator(
+            weight_import_path,
+            aggregation=aggregation,
+            max_interpolated_gap_days=max_interpolated_gap_days,
+        )
 
+    weight_database_file = get_weight_database_file()
+    if weight_database_file is not None and user_id is None:
+        if storage_directory is not None:
+            # GARMIN_EMAIL names the single account, not the one of the storage directory
+            raise RuntimeError(
+                f"No user id for the storage directory {storage_directory}, which is "
+                "required if WEIGHT_DATABASE_FILE is set"
+            )
+        email = os.getenv("GARMIN_EMAIL")
+        if email is not None:
+            user_id = get_account_key(email)
+    if weight_database_file is not None and user_id is not None:
+        today = date.today()
+        history_weeks = get_history_weeks()
+        return SqliteWeightDataFrameCreator(
+            database_file=weight_database_file,
+            user_id=user_id,
+            start_date=None
+            if history_weeks is None
+            else get_history_start_date(history_weeks, today),
+            end_date=today.isoformat(),
+            max_interpolated_gap_days=max_interpolated_gap_days,
+        )
 
-def process(send_plots: bool = False) -> None:
-    df_weight_data = process_weight_data(
-        weight_dataframe_creator=GarminWeightDataFrameCreator()
+    cache_file = get_weight_cache_file(
+        max_interpolated_gap_days, aggregation, storage_directory=storage_directory
+    )
+    if get_raw_data_format() == RAW_DATA_FORMAT_LOG:
+        log_file = get_full_storage_path(WEIGH_IN_LOG_FILENAME, storage_directory)
+        return CachedWeightDataFrameCreator(
+            GarminWeightLogDataFrameCreator(
+                log_file=log_file,
+                max_interpolated_gap_days=max_interpolated_gap_days,
+                aggregation=aggregation,
+            ),
+            source_file=log_file,
+            cache_file=cache_file,
+        )
+    raw_data_file = get_full_storage_path(RAW_DATA_FILENAME, storage_directory)
+    return CachedWeightDataFrameCreator(
+        GarminWeightDataFrameCreator(
+            streaming=True,
+            max_interpolated_gap_days=max_interpolated_gap_days,
+            aggregation=aggregation,
+            raw_data_file=raw_data_file,
+        ),
+        source_file=raw_data_file,
+        cache_file=cache_file,
     )
-    df_daily_data = process_daily_data(df_weight_data.copy())
+
+
+def get_history_start_date(history_weeks: int, today: date) -> str:
+    """
+    Returns the first day the weekly changes of this week and the ``history_weeks`` weeks
+    before it need: the days of the longest moving average on the Sunday before the first
+    of these weeks.
+    """
+    sunday_this_week = today + timedelta(days=DAYS_PER_WEEK - 1 - today.weekday())
+    sunday_before_first_week = sunday_this_week - timedelta(weeks=history_weeks + 1)
+    return (
+        sunday_before_first_week - timedelta(days=max(MOVING_AVERAGE_WINDOWS) - 1)
+    ).isoformat()
+
+
+def get_weight_cache_file(
+    max_interpolated_gap_days: int | None,
+    aggregation: DailyWeightAggregation,
+    storage_directory: str | None = None,
+) -> str:
+    """
+    The cached weights depend on the maximum gap and the aggregation, so every combination
+    other than the default one gets its own cache file.
+    """
+    suffixes = []
+    if max_interpolated_gap_days is not None:
+        suffixes.append(f"max_gap_{max_interpolated_gap_days}d")
+    if not aggregation.is_default:
+        suffixes.append(aggregation.name)
+    if not suffixes:
+        return get_full_storage_path(WEIGHT_CACHE_FILENAME, storage_directory)
+    return get_full_storage_path(f"weight_{'_'.join(suffixes)}.npy", storage_directory)
+
+
+def process_daily_series(
+    daily_series: DailyWeightSeries,
+    backend: str = BACKEND_PANDAS,
+    basis: str = BASIS_MOVING_AVERAGE,
+) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Process the daily weights into the weekly overview and the weights for the remaining
+    days of this week.
+
+    The stages share their frames instead of copying them defensively: with copy-on-write,
+    a stage that changes a frame it received only changes its own copy, never the input.
+    Copy-on-write is only enabled while processing, to not change pandas for the callers.
+
+    Returns:
+        tuple[pd.DataFrame, pd.Series]: The weekly overview with the targets, and the
+        weights for the remaining days of this week indexed by date.
+    """
+    with pd.option_context(COPY_ON_WRITE_OPTION, True):
+        df_weight_data = process_weight_data(
+            weight_dataframe_creator=daily_series, backend=backend
+        )
+        df_weekly_data = process_weekly_data(
+            df_weight_data,
+            backend=backend,
+            basis=basis,
+            measured=daily_series.measured,
+        )
+
+        daily_weight_forecaster = DailyWeightForecaster(
+            daily_series=daily_series, df_weekly=df_weekly_data
+        )
+        return df_weekly_data, daily_weight_forecaster.calculate()
+
+
+def sweep_weekly_change_percentages(
+    daily_series: DailyWeightSeries,
+    weekly_change_percentages: np.ndarray,
+    backend: str = BACKEND_PANDAS,
+    basis: str = BASIS_MOVING_AVERAGE,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Evaluate many weekly change percentages at once, to compare the targets they lead to.
+    The daily data is processed once, and the targets of all rates are broadcast over the
+    weekly table, see ``sweep_target_weights``. Like ``process_daily_series``, the stages
+    share their frames with copy-on-write.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The 7d target weight of every week and the
+        weights for the remaining days of this week, one row per weekly change percentage.
+    """
+    with pd.option_context(COPY_ON_WRITE_OPTION, True):
+        df_weight_data = process_weight_data(
+            weight_dataframe_creator=daily_series, backend=backend
+        )
+        df_weekly_data, basis_column = _create_weekly_changes(
+            df_weight_data,
+            backend=backend,
+            basis=basis,
+            measured=daily_series.measured,
+        )
+        df_weekly_data = add_next_week(df_weekly_data)
+    target_weights = sweep_target_weights(
+        df_weekly_data,
+        window=7,
+        weekly_change_percentages=weekly_change_percentages,
+        basis_column=basis_column,
+    )
+
+    sunday_this_week = pd.Timestamp(df_weekly_data.index[-1])
+    last_date = pd.Timestamp(daily_series.last_day, unit="D")
+    remaining_days_this_week = (sunday_this_week - last_date).days
+    remaining_days_weights = forecast_remaining_days_weights(
+        recent_weights=np.broadcast_to(
+            daily_series.tail(LOOK_BACK_DAYS).weights,
+            (len(weekly_change_percentages), LOOK_BACK_DAYS),
+        ),
+        target_weights=target_weights[:, -1],
+        remaining_days=remaining_days_this_week,
+    )[:, :remaining_days_this_week]
+
+    index = pd.Index(weekly_change_percentages, name="weekly_change_percentage")
+    return (
+        pd.DataFrame(target_weights, index=index, columns=df_weekly_data.index),
+        pd.DataFrame(
+            # truncated like the weights of DailyWeightForecaster
+            truncate_to_grams(remaining_days_weights),
+            index=index,
+            columns=pd.date_range(
+                last_date + pd.DateOffset(days=1),
+                periods=remaining_days_this_week,
+                freq="D",
+                name=DATE_COLUMN,
+            ),
+        ),
+    )
+
+
+def get_plan_text(
+    daily_series: DailyWeightSeries,
+    df_weekly: pd.DataFrame,
+    goal_weight: int | None,
+    end_date: pd.Timestamp | None,
+) -> str:
+    """
+    The target weight of every week of the plan, see ``DailyWeightPlanner``. Empty if the
+    goal weight is never reached at the targeted rate.
+    """
+    df_plan = DailyWeightPlanner(
+        daily_series=daily_series,
+        df_weekly=df_weekly,
+        goal_weight=goal_weight,
+        end_date=end_date,
+    ).calculate()
+    if df_plan.empty:
+        return ""
+    # the target of every week of the plan, on its Sunday
+    weekly_plan_text = (
+        df_plan.loc[df_plan.index.dayofweek == 6, "target_weight_7d"]
+        .to_string()
+        .replace("\n", "<br>")
+    )
+    return f"""<br><br>
+weekly target weights until the goal:<br>
+{weekly_plan_text}
+"""
+
+
+def get_goal_text(
+    df_weekly: pd.DataFrame, goal_weight: int, end_date: pd.Timestamp | None
+) -> str:
+    """
+    When the goal weight is reached at the targeted rate, and which rate reaches it by the
+    end date if there is one.
+    """
+    sunday_this_week = df_weekly[DATE_COLUMN].iloc[-1]
+    target_this_week_weight = df_weekly["target_weight_7d"].iloc[-1]
+
+    weeks = get_weeks_to_goal_weights(
+        target_weights=np.array([target_this_week_weight]),
+        weekly_change_percentages=get_target_weekly_change_percentage(),
+        goal_weights=np.array([goal_weight]),
+    )[0]
+    if np.isinf(weeks):
+        text = "<br><br>goal weight is not reached at this rate<br>"
+    else:
+        goal_date = sunday_this_week + pd.DateOffset(days=DAYS_PER_WEEK * int(weeks))
+        text = f"<br><br>goal weight reached in the week until: {goal_date.date()}<br>"
+
+    if end_date is None:
+        return text
+    weeks_to_end_date = get_weeks_between(_to_day(sunday_this_week), _to_day(end_date))
+    # no rate reaches the goal by an end date in this week or before it
+    if weeks_to_end_date >= 1:
+        required_weekly_change_percentage = get_required_weekly_change_percentages(
+            target_weights=np.array([target_this_week_weight]),
+            goal_weights=np.array([goal_weight]),
+            weeks=weeks_to_end_date,
+        )[0]
+        text += (
+            f"weekly change to reach it by {end_date.date()}: "
+            f"{required_weekly_change_percentage:.2%}<br>"
+        )
+    return text
+
+
+def _to_day(timestamp: pd.Timestamp) -> int:
+    return int(np.datetime64(timestamp.date(), "D").astype(np.int64))
+
+
+def process_user(
+    storage_directory: str | None = None, user_id: str | None = None
+) -> str | None:
+    """
+    Process the weights of a user and plot the figures into the storage directory of the
+    user, see ``get_weight_dataframe_creator``.
+
+    Returns:
+        str | None: The text to send with the figures, None if there is not enough data.
+    """
+    daily_series = get_weight_dataframe_creator(
+        storage_directory=storage_directory, user_id=user_id
+    ).get_daily_series()
 
     # There need to be at least three full (Monday to Sunday) weeks of data
-    completed_days_this_week = df_daily_data[DATE_COLUMN].dt.isocalendar().day.iloc[-1]
+    completed_days_this_week = pd.Timestamp(
+        daily_series.last_day, unit="D"
+    ).isoweekday()
     minimum_required_days = MINIMUM_FULL_WEEK_DAYS + completed_days_this_week
-    if len(df_daily_data) < minimum_required_days:
+    if len(daily_series) < minimum_required_days:
         print(
-            f"Not enough data to process. Required: {minimum_required_days}, Available: {len(df_daily_data)}"
+            f"Not enough data to process. Required: {minimum_required_days}, Available: {len(daily_series)}"
         )
-        return
-
-    df_weekly_data = process_weekly_data(df_weight_data.copy())
-
-    weight_today = df_daily_data[WEIGHT_IN_GRAMS_COLUMN].iloc[-1]
+        return None
 
-    daily_weight_forecaster = DailyWeightForecaster(
-        df_daily=df_daily_data.copy(), df_weekly=df_weekly_data.copy()
+    df_weekly_data, remaining_days_weight = process_daily_series(
+        daily_series,
+        backend=os.getenv("PROCESSING_BACKEND", BACKEND_PANDAS),
+        basis=get_weekly_change_basis(),
     )
-    remaining_days_weight = daily_weight_forecaster.calculate()
 
+    weight_today = daily_series.weights[-1]
     target_weight_this_week = df_weekly_data["target_weight_7d"].iloc[-1]
 
     plot_figures(
-        df_daily=df_daily_data.copy(),
-        df=df_weekly_data.copy(),
-        remaining_days_weight=remaining_days_weight.copy(),
+        daily_series=daily_series,
+        df=df_weekly_data,
+        remaining_days_weight=remaining_days_weight,
+        storage_directory=storage_directory,
     )
 
-    if send_plots:
-        text = f"""
+    remaining_days_weight_text = remaining_days_weight.to_string().replace("\n", "<br>")
+    text = f"""
 weight today: {weight_today}
 <br><br>
 remaining days weight:<br>
-{remaining_days_weight.to_string().replace("\n", "<br>")}
+{remaining_days_weight_text}
 <br><br>
 target weight this week: {target_weight_this_week}
 
 """
 
+    goal_weight = get_goal_weight()
+    plan_end_date = get_plan_end_date()
+    if goal_weight is not None or plan_end_date is not None:
+        text += get_plan_text(daily_series, df_weekly_data, goal_weight, plan_end_date)
+    if goal_weight is not None:
+        text += get_goal_text(df_weekly_data, goal_weight, plan_end_date)
+    return text
+
+
+def process(send_plots: bool = False) -> None:
+    text = process_user()
+    if text is not None and send_plots:
         send(text=text)
 
 
@@ -107,7 +485,15 @@ if __name__ == "__main__":
 
     arguments = sys.argv[1:]
 
-    if "--send" in arguments:
+    if "--sweep" in arguments:
+        _, df_sweep = sweep_weekly_change_percentages(
+            get_weight_dataframe_creator().get_daily_series(),
+            get_weekly_change_percentages_grid(),
+            backend=os.getenv("PROCESSING_BACKEND", BACKEND_PANDAS),
+            basis=get_weekly_change_basis(),
+        )
+        print(df_sweep.to_string())
+    elif "--send" in arguments:
         process(send_plots=True)
     else:
         process(send_plots=False)
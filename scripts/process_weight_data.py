@@ -1,78 +1,160 @@
 import os
 
+import numpy as np
 import pandas as pd
 
-from scripts.columns import (
-    WEIGHT_IN_GRAMS_7D_COLUMN,
-    WEIGHT_IN_GRAMS_14D_COLUMN,
-    WEIGHT_IN_GRAMS_COLUMN,
-)
+from scripts.columns import DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN
 from scripts.dataframe_creator import WeightDataFrameCreator
+from scripts.engine import SUNDAY, ProcessingEngine
+from scripts.kernels import add_integer_moving_averages
+from scripts.polars_engine import PolarsEngine
+
+BACKEND_PANDAS = "pandas"
+BACKEND_NUMPY = "numpy"
+BACKEND_POLARS = "polars"
+
+MOVING_AVERAGE_WINDOWS = (7, 14)
 
 
 def process_weight_data(
     weight_dataframe_creator: WeightDataFrameCreator,
+    backend: str = BACKEND_PANDAS,
 ) -> pd.DataFrame:
     """
-    Processes daily weight data and returns a DataFrame of interpolated weights with moving averages.
+    Processes daily weight data and returns a DataFrame of the daily weights with moving averages.
 
     Steps:
-    1. Extracts and rounds daily weight data.
-    2. Resamples daily dates and interpolates missing weights.
-    3. Adds 7-day and 14-day moving averages and their weekly changes.
-    4. Removes the original weight columns, retaining only entries with non-null 14-day weekly changes.
+    1. Gets the daily DataFrame from the creator, which already has one row per day with the
+       missing days interpolated and the weights rounded to grams.
+    2. Adds 7-day and 14-day moving averages with the engine of the backend.
+
+    The weekly values and changes of the moving averages are not part of the daily DataFrame,
+    use ``create_weekly_table`` (or ``filter_df_to_weekly_changes``) to get them.
 
     Args:
-        weight_dataframe_creator: To get a dataframe with daily weight measurements.
+        weight_dataframe_creator: To get a dataframe with daily weight measurements, e.g. a
+            DailyWeightSeries that was loaded already.
+        backend: The engine that computes the moving averages, see
+            ``get_processing_engine``.
 
     Returns:
-        pd.DataFrame: A DataFrame indexed by date with integer weight changes and averages for analysis.
+        pd.DataFrame: A DataFrame indexed by date with the daily weights and their moving averages.
+    """
+    return get_processing_engine(backend).add_moving_averages(
+        weight_dataframe_creator.get_dataframe(),
+        column=WEIGHT_IN_GRAMS_COLUMN,
+        windows=MOVING_AVERAGE_WINDOWS,
+    )
+
+
+class PandasEngine(ProcessingEngine):
+    """
+    Computes the moving averages with pandas' rolling windows.
     """
-    df = weight_dataframe_creator.get_dataframe()
 
-    add_moving_average_and_change(df=df, column=WEIGHT_IN_GRAMS_COLUMN, window=7)
-    add_moving_average_and_change(df=df, column=WEIGHT_IN_GRAMS_COLUMN, window=14)
+    def add_moving_averages(
+        self, df: pd.DataFrame, column: str, windows: tuple[int, ...]
+    ) -> pd.DataFrame:
+        # a shallow copy, the added columns do not show up in the input
+        df = df.copy(deep=False)
+        for window in windows:
+            add_moving_average(df=df, column=column, window=window)
+        return df
 
-    return df
+    def create_weekly_table(
+        self, df: pd.DataFrame, column: str, windows: tuple[int, ...]
+    ) -> pd.DataFrame:
+        return create_weekly_table(df, column=column, windows=windows)
 
 
-def add_moving_average_and_change(df: pd.DataFrame, column: str, window: int) -> None:
+class NumpyEngine(PandasEngine):
     """
-    Add a rolling mean and compute weekly changes in the rolling mean for the specified column.
+    Computes the moving averages with the integer prefix sum kernel, see
+    ``add_integer_moving_averages``.
+    """
+
+    def add_moving_averages(
+        self, df: pd.DataFrame, column: str, windows: tuple[int, ...]
+    ) -> pd.DataFrame:
+        df = df.copy(deep=False)
+        add_integer_moving_averages(df=df, column=column, windows=windows)
+        return df
 
-    Parameters
-    ----------
-    df : pd.DataFrame
-        The DataFrame containing time-series data, indexed by date.
-    column : str
-        The column name in the DataFrame on which to compute the moving average.
-    window : int
-        The size of the rolling window (in days) used for computing the moving average.
 
-    Notes
-    -----
-    This function adds the following columns to the input DataFrame:
-    - ``{column}_{window}d``: Rolling mean over the specified window.
-    - ``{column}_{window}d_weekly``: Weekly resampled value of the rolling mean (using the last observed).
-    - ``{column}_{window}d_weekly_change``: Difference in the weekly rolling mean over a 7-week period.
+def get_processing_engine(backend: str = BACKEND_PANDAS) -> ProcessingEngine:
+    """
+    Returns the engine for the backend: "pandas", "numpy" (the moving averages are rounded
+    to integer grams, see ``add_integer_moving_averages``) or "polars" (lazy and
+    multithreaded, requires polars).
+    """
+    if backend == BACKEND_PANDAS:
+        return PandasEngine()
+    if backend == BACKEND_NUMPY:
+        return NumpyEngine()
+    if backend == BACKEND_POLARS:
+        return PolarsEngine()
+    raise ValueError(f"Unknown backend {backend}")
+
+
+def add_moving_average(df: pd.DataFrame, column: str, window: int) -> None:
+    """
+    Add the rolling mean over ``window`` days of the column as ``{column}_{window}d``.
 
     The DataFrame is modified in-place, and no value is returned.
     """
     df[f"{column}_{window}d"] = df[column].rolling(window=window).mean()
-    df[f"{column}_{window}d_weekly"] = df[f"{column}_{window}d"].resample("W").last()
-    df[f"{column}_{window}d_weekly_change"] = df[f"{column}_{window}d_weekly"].diff(
-        periods=7
+
+
+def create_weekly_table(
+    df: pd.DataFrame,
+    column: str = WEIGHT_IN_GRAMS_COLUMN,
+    windows: tuple[int, ...] = MOVING_AVERAGE_WINDOWS,
+) -> pd.DataFrame:
+    """
+    Create a table with one row per completed week (Monday to Sunday) from the daily moving
+    averages, indexed by the date of the Sunday.
+
+    The days are binned into weeks in a single vectorized pass and the value of the last day
+    of each week is taken. The last week is only included if it is complete, i.e. its Sunday
+    is part of the daily data.
+
+    The table contains for each window:
+    - ``{column}_{window}d_weekly``: The moving average on the Sunday.
+    - ``{column}_{window}d_weekly_change``: The difference to the previous week, NaN if the
+      previous week is missing.
+    """
+    days = df.index.to_numpy().astype("datetime64[D]").astype(np.int64)
+    # weeks since the Monday before the epoch (1970-01-01 was a Thursday)
+    weeks = (days + 3) // 7
+
+    last_day_of_week = np.ones(len(days), dtype=bool)
+    last_day_of_week[:-1] = weeks[1:] != weeks[:-1]
+    week_ends = np.flatnonzero(last_day_of_week & ((days + 3) % 7 == SUNDAY))
+
+    week_numbers = weeks[week_ends]
+    has_previous_week = np.zeros(len(week_ends), dtype=bool)
+    has_previous_week[1:] = np.diff(week_numbers) == 1
+
+    weekly_data = {}
+    for window in windows:
+        weekly = df[f"{column}_{window}d"].to_numpy(dtype=np.float64)[week_ends]
+        weekly_change = np.full(len(weekly), np.nan)
+        weekly_change[1:] = weekly[1:] - weekly[:-1]
+        weekly_change[~has_previous_week] = np.nan
+
+        weekly_data[f"{column}_{window}d_weekly"] = weekly
+        weekly_data[f"{column}_{window}d_weekly_change"] = weekly_change
+
+    return pd.DataFrame(
+        weekly_data, index=pd.DatetimeIndex(df.index[week_ends], name=DATE_COLUMN)
     )
 
 
-def filter_df_to_weekly_changes(df: pd.DataFrame) -> pd.DataFrame:
-    # remove weight in grams columns
-    df = df.drop(
-        columns=[
-            WEIGHT_IN_GRAMS_COLUMN,
-            WEIGHT_IN_GRAMS_7D_COLUMN,
-            WEIGHT_IN_GRAMS_14D_COLUMN,
-        ]
+def filter_df_to_weekly_changes(
+    df: pd.DataFrame, backend: str = BACKEND_PANDAS
+) -> pd.DataFrame:
+    df = get_processing_engine(backend).create_weekly_table(
+        df, column=WEIGHT_IN_GRAMS_COLUMN, windows=MOVING_AVERAGE_WINDOWS
     )
 
     # only show the rows where the weekly change is not null
@@ -81,26 +163,102 @@ def filter_df_to_weekly_changes(df: pd.DataFrame) -> pd.DataFrame:
     return df.round().astype(int)
 
 
-def add_target_weight_change(df: pd.DataFrame, window: int) -> pd.DataFrame:
-    column = f"weight_in_grams_{window}d_weekly"
-    target_weight_change_column = f"target_weight_change_{window}d"
-    target_weight_column = f"target_weight_{window}d"
+def get_target_weekly_change_percentage() -> float:
+    """
+    Returns the targeted weekly weight change relative to the weight, positive for bulking
+    and negative for cutting, from the environment variable TARGET_WEEKLY_CHANGE_PERCENTAGE.
+    """
+    return float(os.getenv("TARGET_WEEKLY_CHANGE_PERCENTAGE", "0.0"))
+
+
+def get_weekly_change_percentages_grid(
+    start: float = -0.01, stop: float = 0.005, step: float = 0.0005
+) -> np.ndarray:
+    """
+    Returns the weekly change percentages from start to stop (both included) in steps, by
+    default -1.0% to +0.5% in 0.05% steps, for ``sweep_target_weights``.
+    """
+    return np.linspace(start, stop, round((stop - start) / step) + 1)
 
-    weekly_change_percentage = float(
-        os.getenv("TARGET_WEEKLY_CHANGE_PERCENTAGE", "0.0")
+
+def sweep_target_weights(
+    df: pd.DataFrame,
+    window: int,
+    weekly_change_percentages: np.ndarray,
+    basis_column: str | None = None,
+) -> np.ndarray:
+    """
+    The target weights of ``add_target_weight_change`` for many weekly change percentages
+    at once, broadcast over the weekly DataFrame instead of processing it once per rate.
+
+    Returns:
+        np.ndarray: One row of target weights per weekly change percentage and one column
+        per week, the row of a rate equals the ``target_weight_{window}d`` column.
+    """
+    weekly = df[basis_column or f"weight_in_grams_{window}d_weekly"].to_numpy(
+        dtype=np.float64
     )
-    df_without_last_row = df.iloc[:-1]
-    df[target_weight_change_column] = (
-        (df_without_last_row[column] * weekly_change_percentage).round().astype(int)
+    weekly_change_percentages = np.asarray(weekly_change_percentages, dtype=np.float64)
+
+    # the last week has no change yet, the first week is its own target
+    target_weights = np.empty((len(weekly_change_percentages), len(weekly)))
+    target_weights[:, 0] = weekly[0]
+    target_weights[:, 1:] = get_next_target_weights(
+        weekly[:-1], weekly_change_percentages[:, np.newaxis]
     )
+    return target_weights.astype(np.int64)
 
-    first_value = df[column].iloc[0]
-    df[target_weight_column] = (
-        (df_without_last_row[column] + df[target_weight_change_column])
-        .shift(1)
-        .fillna(value=first_value)
+
+def get_next_target_weights(
+    weights: np.ndarray | pd.Series, weekly_change_percentages: np.ndarray | float
+) -> np.ndarray:
+    """
+    The target weights of the weeks after the weekly weights: the target weight change (the
+    weight times the weekly change percentage) is rounded to grams, and so is the weight
+    changed by it, like the ``target_weight_{window}d`` column.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    return np.rint(weights + np.rint(weights * weekly_change_percentages))
+
+
+def add_target_weight_change(
+    df: pd.DataFrame, window: int, basis_column: str | None = None
+) -> pd.DataFrame:
+    """
+    Returns a copy of the weekly DataFrame with the target weight change and the resulting
+    target weight of each week for the window. The input is not modified.
+
+    The targets are based on the weekly moving average of the window, or on the weekly
+    values of ``basis_column`` (e.g. the trend weight) if it is given.
+    """
+    column = basis_column or f"weight_in_grams_{window}d_weekly"
+    target_weight_change_column = f"target_weight_change_{window}d"
+    target_weight_column = f"target_weight_{window}d"
+
+    weekly_change_percentage = get_target_weekly_change_percentage()
+    df_without_last_row = df.iloc[:-1]
+    # the last week has no change yet
+    target_weight_change = (
+        (df_without_last_row[column] * weekly_change_percentage)
         .round()
         .astype(int)
+        .reindex(df.index)
     )
 
-    return df
+    first_value = df[column].iloc[0]
+    return df.assign(
+        **{
+            target_weight_change_column: target_weight_change,
+            target_weight_column: pd.Series(
+                get_next_target_weights(
+                    df_without_last_row[column], weekly_change_percentage
+                ),
+                index=df_without_last_row.index,
+            )
+            .reindex(df.index)
+            .shift(1)
+            .fillna(value=first_value)
+            .round()
+            .astype(int),
+        }
+    )
@@ -3,7 +3,12 @@ import os
 
 import requests
 
-from scripts.files import REMAINING_DAYS_WEIGHT_PNG, WEIGHT_CHANGE_PNG, WEIGHT_PNG
+from scripts.files import (
+    REMAINING_DAYS_WEIGHT_PNG_FILENAME,
+    WEIGHT_CHANGE_PNG_FILENAME,
+    WEIGHT_PNG_FILENAME,
+    get_full_storage_path,
+)
 
 
 def get_file_content_as_base64(path):
@@ -11,7 +16,7 @@ def get_file_content_as_base64(path):
         return base64.b64encode(file.read()).decode("utf-8")
 
 
-def send(text: str = "") -> None:
+def send(text: str = "", storage_directory: str | None = None) -> None:
     """
     Send weight analysis data to a webhook endpoint.
     This function encodes three weight-related plots as base64 strings and sends them
@@ -19,12 +24,18 @@ def send(text: str = "") -> None:
 
     Args:
         text (str, optional): Additional text information about weight to include in the payload.
+        storage_directory (str, optional): The directory of the plots, defaults to the one
+            configured with the environment variable STORAGE_DIRECTORY.
     """
 
-    weight_plot_base64 = get_file_content_as_base64(WEIGHT_PNG)
-    weight_change_plot_base64 = get_file_content_as_base64(WEIGHT_CHANGE_PNG)
+    weight_plot_base64 = get_file_content_as_base64(
+        get_full_storage_path(WEIGHT_PNG_FILENAME, storage_directory)
+    )
+    weight_change_plot_base64 = get_file_content_as_base64(
+        get_full_storage_path(WEIGHT_CHANGE_PNG_FILENAME, storage_directory)
+    )
     remaining_days_weight_plot_base64 = get_file_content_as_base64(
-        REMAINING_DAYS_WEIGHT_PNG
+        get_full_storage_path(REMAINING_DAYS_WEIGHT_PNG_FILENAME, storage_directory)
     )
 
     response = requests.post(
@@ -0,0 +1,149 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.daily_series import DailyWeightSeries
+
+
+def get_max_interpolated_gap_days() -> int | None:
+    """
+    Returns the longest run of days without weigh-ins that is still interpolated, from the
+    environment variable MAX_INTERPOLATED_GAP_DAYS. None (default) interpolates every gap.
+    """
+    max_interpolated_gap_days = os.getenv("MAX_INTERPOLATED_GAP_DAYS")
+    if max_interpolated_gap_days is None:
+        return None
+    if not max_interpolated_gap_days.isdigit():
+        raise ValueError(
+            "Environment variable MAX_INTERPOLATED_GAP_DAYS must be a non-negative "
+            f"integer, got {max_interpolated_gap_days}"
+        )
+    return int(max_interpolated_gap_days)
+
+
+class SparseWeightSeries:
+    """
+    The weigh-ins of a user, one per measured day, without materializing the missing days.
+
+    Days are stored as days since the epoch next to the weights in grams, and the number of
+    missing days after each weigh-in is kept as gap metadata. Missing days are only
+    interpolated (linearly, rounded to integer grams) when a window of daily weights is
+    requested with ``to_daily_arrays`` or ``to_dataframe``, and only for that window, which
+    gives the same weights as interpolating the full history.
+    """
+
+    def __init__(self, days: np.ndarray, weights: np.ndarray):
+        days = np.asarray(days, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.int64)
+        if len(days) != len(weights):
+            raise ValueError("days and weights must have the same length")
+        if np.any(np.diff(days) < 0):
+            order = np.argsort(days, kind="stable")
+            days, weights = days[order], weights[order]
+        if np.any(np.diff(days) == 0):
+            raise ValueError("days must not contain duplicates")
+
+        self.days = days
+        self.weights = weights
+        # missing days between each weigh-in and the next one
+        self.gap_lengths = np.diff(days) - 1
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def first_day(self) -> int | None:
+        return int(self.days[0]) if len(self.days) else None
+
+    @property
+    def last_day(self) -> int | None:
+        return int(self.days[-1]) if len(self.days) else None
+
+    def get_gaps(self, min_days: int = 1) -> list[tuple[int, int]]:
+        """
+        Returns the first missing day and the number of missing days of every gap of at
+        least ``min_days`` days, in chronological order.
+        """
+        gap_positions = np.flatnonzero(self.gap_lengths >= min_days)
+        return [
+            (int(self.days[position]) + 1, int(self.gap_lengths[position]))
+            for position in gap_positions
+        ]
+
+    def split(self, max_interpolated_gap_days: int) -> list["SparseWeightSeries"]:
+        """
+        Split the series at every gap longer than ``max_interpolated_gap_days``, so that each
+        part only contains gaps that may be interpolated.
+        """
+        split_positions = (
+            np.flatnonzero(self.gap_lengths > max_interpolated_gap_days) + 1
+        )
+        return [
+            SparseWeightSeries(days, weights)
+            for days, weights in zip(
+                np.split(self.days, split_positions),
+                np.split(self.weights, split_positions),
+            )
+        ]
+
+    def get_last_segment(self, max_interpolated_gap_days: int) -> "SparseWeightSeries":
+        """
+        Returns the weigh-ins after the last gap longer than ``max_interpolated_gap_days``.
+        """
+        long_gaps = np.flatnonzero(self.gap_lengths > max_interpolated_gap_days)
+        if len(long_gaps) == 0:
+            return self
+        start = long_gaps[-1] + 1
+        return SparseWeightSeries(self.days[start:], self.weights[start:])
+
+    def to_daily_arrays(
+        self, start_day: int | None = None, end_day: int | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns every day between ``start_day`` and ``end_day`` (both included, default: the
+        first and the last weigh-in) and its weight, interpolating the missing days. Only the
+        weigh-ins within the window and the closest ones around it are used.
+        """
+        if len(self.days) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        start_day = (
+            self.first_day if start_day is None else max(start_day, self.first_day)
+        )
+        end_day = self.last_day if end_day is None else min(end_day, self.last_day)
+        if start_day > end_day:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        # the weigh-ins in the window and the ones right before and after it
+        start = max(np.searchsorted(self.days, start_day, side="right") - 1, 0)
+        end = np.searchsorted(self.days, end_day, side="left") + 1
+
+        days = np.arange(start_day, end_day + 1, dtype=np.int64)
+        weights = np.interp(days, self.days[start:end], self.weights[start:end])
+        # np.rint rounds half to even, like pd.Series.round
+        return days, np.rint(weights).astype(np.int64)
+
+    def to_daily_series(
+        self, start_day: int | None = None, end_day: int | None = None
+    ) -> DailyWeightSeries:
+        """
+        Returns the DailyWeightSeries of the window, see ``to_daily_arrays``, with the days
+        that have a weigh-in marked as measured.
+        """
+        days, weights = self.to_daily_arrays(start_day=start_day, end_day=end_day)
+        measured = np.zeros(len(days), dtype=bool)
+        if len(days):
+            measured_days = self.days[(self.days >= days[0]) & (self.days <= days[-1])]
+            measured[measured_days - days[0]] = True
+        return DailyWeightSeries(
+            start_day=days[0] if len(days) else 0, weights=weights, measured=measured
+        )
+
+    def to_dataframe(
+        self, start_day: int | None = None, end_day: int | None = None
+    ) -> pd.DataFrame:
+        """
+        Returns the daily DataFrame of the window, see ``to_daily_arrays``.
+        """
+        return self.to_daily_series(start_day=start_day, end_day=end_day).to_dataframe()
@@ -0,0 +1,133 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.columns import WEIGHT_IN_GRAMS_COLUMN
+
+BASIS_MOVING_AVERAGE = "moving_average"
+BASIS_TREND = "trend"
+BASES = (BASIS_MOVING_AVERAGE, BASIS_TREND)
+
+# the day to day changes of the true weight (100 g) and the scatter of the measured weights
+# around it (400 g), as variances in squared grams
+DEFAULT_PROCESS_VARIANCE = 100.0**2
+DEFAULT_MEASUREMENT_VARIANCE = 400.0**2
+
+
+def get_weekly_change_basis() -> str:
+    """
+    Returns what the weekly changes and targets are based on, from the environment variable
+    WEEKLY_CHANGE_BASIS: the 7d and 14d moving averages ("moving_average", default) or the
+    trend weight ("trend"), see ``KalmanTrendEstimator``.
+    """
+    basis = os.getenv("WEEKLY_CHANGE_BASIS", BASIS_MOVING_AVERAGE)
+    if basis not in BASES:
+        raise ValueError(
+            f"Environment variable WEEKLY_CHANGE_BASIS must be one of {', '.join(BASES)}, "
+            f"got {basis}"
+        )
+    return basis
+
+
+class KalmanTrendEstimator:
+    """
+    Estimates the trend weight of many users at once with a local-level Kalman filter, one
+    day at a time.
+
+    The true weight of a user is assumed to change from day to day by a random amount with
+    the process variance, and every weigh-in scatters around it with the measurement
+    variance. Each day updates the estimate of every user in constant time, moving it
+    towards the measured weight by a gain that is the larger the less certain the estimate
+    is. On days without a weigh-in (NaN) the estimate stays and only gets less certain, so
+    missing days need no interpolation. With a weigh-in every day, the gain settles and the
+    filter is an exponentially weighted moving average, which lags less than the 7d and 14d
+    means and only keeps two numbers per user instead of a window of weights.
+    """
+
+    def __init__(
+        self,
+        users: int = 1,
+        process_variance: float = DEFAULT_PROCESS_VARIANCE,
+        measurement_variance: float = DEFAULT_MEASUREMENT_VARIANCE,
+    ):
+        self.process_variance = process_variance
+        self.measurement_variance = measurement_variance
+        # NaN until the first weigh-in of the user
+        self.levels = np.full(users, np.nan)
+        self.variances = np.full(users, np.nan)
+
+    def update(self, weights: np.ndarray) -> np.ndarray:
+        """
+        Add the weights of the next day, one per user and NaN for the users without a
+        weigh-in.
+
+        Returns:
+            np.ndarray: The trend weight of every user after the day.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        measured = ~np.isnan(weights)
+        first_measured = measured & np.isnan(self.levels)
+
+        predicted_variances = self.variances + self.process_variance
+        gains = predicted_variances / (predicted_variances + self.measurement_variance)
+
+        self.levels = np.where(
+            measured, self.levels + gains * (weights - self.levels), self.levels
+        )
+        self.variances = np.where(
+            measured, (1 - gains) * predicted_variances, predicted_variances
+        )
+
+        # the first weigh-in is the estimate
+        self.levels[first_measured] = weights[first_measured]
+        self.variances[first_measured] = self.measurement_variance
+        return self.levels.copy()
+
+    def estimate(self, weights: np.ndarray) -> np.ndarray:
+        """
+        Add the weights of many days, one row per user and one column per day.
+
+        Returns:
+            np.ndarray: The trend weight of every user after every day, NaN before the
+            first weigh-in of the user.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        trends = np.empty_like(weights)
+        for day in range(weights.shape[1]):
+            trends[:, day] = self.update(weights[:, day])
+        return trends
+
+
+def add_weekly_trend(
+    df_weekly: pd.DataFrame,
+    df: pd.DataFrame,
+    column: str = WEIGHT_IN_GRAMS_COLUMN,
+    estimator: KalmanTrendEstimator | None = None,
+    measured: np.ndarray | None = None,
+) -> pd.DataFrame:
+    """
+    Returns a copy of the weekly DataFrame with the trend weight of the daily DataFrame on
+    each Sunday as ``{column}_trend_weekly`` and its change to the Sunday before as
+    ``{column}_trend_weekly_change``, rounded to grams like the weekly moving averages.
+
+    ``measured`` marks the days of the daily DataFrame with a weigh-in (see
+    ``DailyWeightSeries.measured``). The interpolated days are passed to the filter as
+    missing, so only the weigh-ins update the trend. Without it, every day counts as
+    measured.
+    """
+    if estimator is None:
+        estimator = KalmanTrendEstimator()
+    weights = df[column].to_numpy(dtype=np.float64)
+    if measured is not None:
+        weights = np.where(measured, weights, np.nan)
+    trend = pd.Series(estimator.estimate(weights[np.newaxis])[0], index=df.index)
+
+    return df_weekly.assign(
+        **{
+            f"{column}_trend_weekly": trend.reindex(df_weekly.index).round(),
+            f"{column}_trend_weekly_change": trend.diff(periods=7)
+            .reindex(df_weekly.index)
+            .round(),
+        }
+    )
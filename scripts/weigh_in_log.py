@@ -0,0 +1,309 @@
+import json
+import os
+from collections.abc import Iterable, Iterator
+from datetime import date
+from itertools import chain, islice
+
+import numpy as np
+import pandas as pd
+
+from scripts.daily_series import DailyWeightSeries
+from scripts.dataframe_creator import (
+    EPOCH_ORDINAL,
+    FIRST_WEIGH_IN,
+    DailyWeightAggregation,
+    WeightDataFrameCreator,
+    create_daily_series,
+    daily_weights_to_arrays,
+)
+from scripts.files import WEIGH_IN_LOG_FILE
+
+RAW_DATA_FORMAT_JSON = "json"
+RAW_DATA_FORMAT_LOG = "jsonl"
+
+# compact once the uncompacted tail holds more records than this share of the compacted ones
+DEFAULT_COMPACTION_RATIO = 0.25
+DEFAULT_MINIMUM_TAIL_RECORDS = 1000
+
+HEADER_KEY = "compactedRecords"
+REPLACE_FROM_KEY = "replaceFrom"
+COMMIT_KEY = "committedRecords"
+
+
+def get_raw_data_format() -> str:
+    """
+    Returns the format of the downloaded weigh-ins from the environment variable
+    RAW_DATA_FORMAT: "json" (default) rewrites weight.json on every download, "jsonl"
+    appends to the weigh-in log weight.jsonl.
+    """
+    raw_data_format = os.getenv("RAW_DATA_FORMAT", RAW_DATA_FORMAT_JSON)
+    if raw_data_format not in (RAW_DATA_FORMAT_JSON, RAW_DATA_FORMAT_LOG):
+        raise ValueError(
+            f"Environment variable RAW_DATA_FORMAT must be {RAW_DATA_FORMAT_JSON} or "
+            f"{RAW_DATA_FORMAT_LOG}, got {raw_data_format}"
+        )
+    return raw_data_format
+
+
+def append_weigh_ins(
+    log_file: str, summaries: Iterable[dict], window_start: str
+) -> None:
+    """
+    Append the Garmin daily summaries of a fetched window to the weigh-in log.
+
+    The log is a JSON Lines file. Each append starts with a marker record, which replaces
+    all earlier records from ``window_start`` on, followed by one record per daily summary
+    and a commit record with their number. An append without its commit record was
+    interrupted by a crash and is ignored when the log is read, so it never replaces the
+    earlier records with only a part of the window. A line left incomplete by such a crash
+    is removed first.
+    """
+    _truncate_incomplete_line(log_file)
+
+    lines = [json.dumps({REPLACE_FROM_KEY: window_start})]
+    lines.extend(json.dumps(summary) for summary in summaries)
+    lines.append(json.dumps({COMMIT_KEY: len(lines) - 1}))
+
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def needs_compaction(
+    log_file: str,
+    compaction_ratio: float = DEFAULT_COMPACTION_RATIO,
+    minimum_tail_records: int = DEFAULT_MINIMUM_TAIL_RECORDS,
+) -> bool:
+    compacted_records, tail_records = _count_records(log_file)
+    return tail_records >= max(
+        minimum_tail_records, compaction_ratio * (compacted_records or 0)
+    )
+
+
+def compact(log_file: str) -> None:
+    """
+    Rewrite the weigh-in log with one record per day, sorted by date and preceded by a
+    header with the number of records. The new log replaces the old one atomically.
+    """
+    summaries = _replay_summaries(log_file)
+
+    temporary_file = f"{log_file}.tmp"
+    with open(temporary_file, "w", encoding="utf-8") as f:
+        f.write(json.dumps({HEADER_KEY: len(summaries)}) + "\n")
+        for summary_date in sorted(summaries):
+            f.write(json.dumps(summaries[summary_date]) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_file, log_file)
+
+
+class GarminWeightLogDataFrameCreator(WeightDataFrameCreator):
+    # pylint: disable=too-few-public-methods
+    """
+    Loads the daily weights from the weigh-in log, like GarminWeightDataFrameCreator does
+    from weight.json.
+
+    The compacted part of the log is sorted and free of duplicates, so it is read into arrays
+    directly. Only the uncompacted tail is replayed (applying the replace markers of its
+    committed appends, the last record of a day wins) and merged into those arrays.
+
+    With ``max_interpolated_gap_days``, only the weigh-ins after the last gap longer than that
+    many days are used, see ``create_daily_dataframe``. With ``aggregation``, all weigh-ins
+    of each day are combined instead of taking the first one. If the aggregation has an
+    outlier filter, the whole log is replayed and filtered at once instead, since the filter
+    compares each weigh-in with the ones around it, which may be in the other part.
+    """
+
+    def __init__(
+        self,
+        log_file: str = WEIGH_IN_LOG_FILE,
+        max_interpolated_gap_days: int | None = None,
+        aggregation: DailyWeightAggregation = FIRST_WEIGH_IN,
+    ):
+        self._log_file = log_file
+        self._max_interpolated_gap_days = max_interpolated_gap_days
+        self._aggregation = aggregation
+
+    def get_dataframe(self) -> pd.DataFrame:
+        return self.get_daily_series().to_dataframe()
+
+    def get_daily_series(self) -> DailyWeightSeries:
+        if self._aggregation.outlier_filter is not None:
+            days, weights = self._read_replayed_arrays()
+        else:
+            days, weights = self._read_merged_arrays()
+
+        return create_daily_series(
+            days=days,
+            weights=weights,
+            max_interpolated_gap_days=self._max_interpolated_gap_days,
+        )
+
+    def _read_replayed_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        summaries = read_summaries(self._log_file)
+        return daily_weights_to_arrays(
+            summaries, capacity=len(summaries), aggregation=self._aggregation
+        )
+
+    def _read_merged_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        with open(self._log_file, "r", encoding="utf-8") as f:
+            compacted_records, lines = _read_header(_iter_complete_lines(f))
+            compacted = (
+                islice(lines, compacted_records)
+                if compacted_records is not None
+                else []
+            )
+            days, weights = daily_weights_to_arrays(
+                compacted,
+                capacity=compacted_records or 0,
+                aggregation=self._aggregation,
+            )
+
+            replace_from_day, tail = _replay_tail(lines)
+
+        if replace_from_day is not None:
+            keep = days < replace_from_day
+            days, weights = days[keep], weights[keep]
+
+        if tail:
+            tail_days, tail_weights = daily_weights_to_arrays(
+                tail.values(), capacity=len(tail), aggregation=self._aggregation
+            )
+            # the tail overrides the compacted part, also for days without a weigh-in left
+            # after the aggregation
+            keep = ~np.isin(days, np.fromiter(tail.keys(), dtype=np.int64))
+            days = np.concatenate([days[keep], tail_days])
+            weights = np.concatenate([weights[keep], tail_weights])
+            order = np.argsort(days, kind="stable")
+            days, weights = days[order], weights[order]
+
+        return days, weights
+
+
+def read_summaries(log_file: str) -> list[dict]:
+    """
+    Returns the daily summaries the weigh-in log holds after replaying it, sorted by date.
+    """
+    summaries = _replay_summaries(log_file)
+    return [summaries[summary_date] for summary_date in sorted(summaries)]
+
+
+def _replay_summaries(log_file: str) -> dict[str, dict]:
+    summaries: dict[str, dict] = {}
+    with open(log_file, "r", encoding="utf-8") as f:
+        _, records = _read_header(_iter_complete_lines(f))
+        for replace_from, appended in _iter_committed_appends(records):
+            if replace_from is not None:
+                summaries = {d: s for d, s in summaries.items() if d < replace_from}
+            for summary in appended:
+                summaries[summary["summaryDate"]] = summary
+    return summaries
+
+
+def _replay_tail(records: Iterable[dict]) -> tuple[int | None, dict[int, dict]]:
+    """
+    Returns the earliest replace day of the tail's appends (None if there are none) and the
+    daily summary the tail holds for each day after replaying them.
+    """
+    replace_from_day = None
+    tail: dict[int, dict] = {}
+    for replace_from, summaries in _iter_committed_appends(records):
+        if replace_from is not None:
+            day = _to_day(replace_from)
+            replace_from_day = (
+                day if replace_from_day is None else min(replace_from_day, day)
+            )
+            tail = {d: s for d, s in tail.items() if d < day}
+        for summary in summaries:
+            tail[_to_day(summary["summaryDate"])] = summary
+    return replace_from_day, tail
+
+
+def _iter_committed_appends(
+    records: Iterable[dict],
+) -> Iterator[tuple[str | None, list[dict]]]:
+    """
+    Group the records after the header into the replace date and the daily summaries of each
+    append, skipping the appends without a matching commit record. The compacted records
+    before the first append are yielded without a replace date.
+    """
+    replace_from = None
+    summaries: list[dict] = []
+    is_open = False
+    for record in records:
+        if REPLACE_FROM_KEY in record:
+            if not is_open and summaries:
+                yield None, summaries
+            # an append that is still open here was interrupted and is dropped
+            replace_from, summaries, is_open = record[REPLACE_FROM_KEY], [], True
+        elif COMMIT_KEY in record:
+            if is_open and record[COMMIT_KEY] == len(summaries):
+                yield replace_from, summaries
+            replace_from, summaries, is_open = None, [], False
+        else:
+            summaries.append(record)
+    if not is_open and summaries:
+        yield None, summaries
+
+
+def _count_records(log_file: str) -> tuple[int | None, int]:
+    """
+    Returns the number of compacted records (None if the log was never compacted) and the
+    number of records in the uncompacted tail.
+    """
+    with open(log_file, "r", encoding="utf-8") as f:
+        compacted_records, _ = _read_header(_iter_complete_lines([f.readline()]))
+        records = sum(1 for line in f if line.endswith("\n"))
+    return compacted_records, records - (compacted_records or 0)
+
+
+def _iter_complete_lines(lines: Iterable[str]) -> Iterator[dict]:
+    for line in lines:
+        # a line without a newline was left incomplete by an interrupted append
+        if not line.endswith("\n"):
+            return
+        if line.strip():
+            yield json.loads(line)
+
+
+def _read_header(lines: Iterator[dict]) -> tuple[int | None, Iterator[dict]]:
+    """
+    Consume the header of a compacted log. Returns the number of compacted records (None if
+    the log was never compacted) and the records after the header.
+    """
+    first_record = next(lines, None)
+    if first_record is None:
+        return None, lines
+    if HEADER_KEY not in first_record:
+        return None, chain([first_record], lines)
+    return first_record[HEADER_KEY], lines
+
+
+def _truncate_incomplete_line(log_file: str, block_size: int = 4096) -> None:
+    if not os.path.isfile(log_file):
+        return
+
+    with open(log_file, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+
+        # search backwards for the end of the last complete line
+        position = end
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            position = start
+        f.truncate(0)
+
+
+def _to_day(isoformat_date: str) -> int:
+    return date.fromisoformat(isoformat_date).toordinal() - EPOCH_ORDINAL
@@ -0,0 +1,229 @@
+import os
+import sqlite3
+from collections.abc import Iterable
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from scripts.daily_series import DailyWeightSeries
+from scripts.dataframe_creator import (
+    EPOCH_ORDINAL,
+    WeightDataFrameCreator,
+    daily_weights_to_arrays,
+)
+from scripts.sparse_series import SparseWeightSeries
+
+SQLITE_BUSY_TIMEOUT_SECONDS = 30.0
+
+
+def get_weight_database_file() -> str | None:
+    """
+    Returns the path of the SQLite weigh-in store from the environment variable
+    WEIGHT_DATABASE_FILE, or None if the store is not used.
+    """
+    return os.getenv("WEIGHT_DATABASE_FILE")
+
+
+def get_history_weeks() -> int | None:
+    """
+    Returns the number of weeks before this one whose weekly changes are processed from the
+    SQLite store, from the environment variable WEIGHT_HISTORY_WEEKS. None (default) loads
+    the full history.
+    """
+    history_weeks = os.getenv("WEIGHT_HISTORY_WEEKS")
+    if history_weeks is None:
+        return None
+    if not history_weeks.isdigit() or int(history_weeks) < 1:
+        raise ValueError(
+            "Environment variable WEIGHT_HISTORY_WEEKS must be a positive integer, got "
+            f"{history_weeks}"
+        )
+    return int(history_weeks)
+
+
+class WeightStore:
+    """
+    SQLite store holding the daily weights of all users, one row per user and day.
+
+    The database runs in WAL mode, so the pipeline can read while a downloader writes.
+    Days are stored as days since the epoch and weights as integer grams.
+    """
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS weigh_ins (
+                    user_id TEXT NOT NULL,
+                    day INTEGER NOT NULL,
+                    weight_in_grams INTEGER NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS weigh_ins_user_id_day "
+                "ON weigh_ins (user_id, day)"
+            )
+
+    def __enter__(self) -> "WeightStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def upsert_daily_weight_summaries(
+        self, user_id: str, summaries: Iterable[dict], window_start: str | None = None
+    ) -> None:
+        """
+        Insert or update the daily weights of the Garmin daily summaries in one transaction.
+
+        If ``window_start`` is given, all stored weights of the user from that date on are
+        replaced, so that weigh-ins deleted in Garmin Connect are removed as well.
+        """
+        summaries = list(summaries)
+        days, weights = daily_weights_to_arrays(summaries, capacity=len(summaries))
+
+        with self._connection:
+            if window_start is not None:
+                self._connection.execute(
+                    "DELETE FROM weigh_ins WHERE user_id = ? AND day >= ?",
+                    (user_id, _to_day(window_start)),
+                )
+            self._connection.executemany(
+                """
+                INSERT INTO weigh_ins (user_id, day, weight_in_grams) VALUES (?, ?, ?)
+                ON CONFLICT (user_id, day) DO UPDATE SET
+                    weight_in_grams = excluded.weight_in_grams
+                """,
+                zip([user_id] * len(days), days.tolist(), weights.tolist()),
+            )
+
+    def get_daily_weights(
+        self,
+        user_id: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the days (days since the epoch) and weights in grams of the user between
+        the (inclusive) start and end date, sorted by day.
+        """
+        start_day = -(2**62) if start_date is None else _to_day(start_date)
+        end_day = 2**62 if end_date is None else _to_day(end_date)
+
+        rows = self._connection.execute(
+            """
+            SELECT day, weight_in_grams FROM weigh_ins
+            WHERE user_id = ? AND day BETWEEN ? AND ?
+            ORDER BY day
+            """,
+            (user_id, start_day, end_day),
+        ).fetchall()
+
+        data = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        return data[:, 0], data[:, 1]
+
+    def get_last_day_before(self, user_id: str, before_date: str) -> int | None:
+        row = self._connection.execute(
+            "SELECT MAX(day) FROM weigh_ins WHERE user_id = ? AND day < ?",
+            (user_id, _to_day(before_date)),
+        ).fetchone()
+        return row[0]
+
+    def get_first_day_after(self, user_id: str, after_date: str) -> int | None:
+        row = self._connection.execute(
+            "SELECT MIN(day) FROM weigh_ins WHERE user_id = ? AND day > ?",
+            (user_id, _to_day(after_date)),
+        ).fetchone()
+        return row[0]
+
+    def has_user(self, user_id: str) -> bool:
+        row = self._connection.execute(
+            "SELECT 1 FROM weigh_ins WHERE user_id = ? LIMIT 1", (user_id,)
+        ).fetchone()
+        return row is not None
+
+    def get_user_ids(self) -> list[str]:
+        rows = self._connection.execute(
+            "SELECT DISTINCT user_id FROM weigh_ins ORDER BY user_id"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+
+class SqliteWeightDataFrameCreator(WeightDataFrameCreator):
+    # pylint: disable=too-few-public-methods
+    """
+    Loads the daily weights of a single user from the WeightStore in ``database_file``, which
+    is opened for each read and closed again afterwards.
+
+    Only the window between ``start_date`` and ``end_date`` is queried. The last weigh-in
+    before the window and the first one after it are included in the query, so that the
+    first and the last days of the window are interpolated like in the full history, but
+    only the days of the window are created.
+
+    With ``max_interpolated_gap_days``, only the weigh-ins after the last gap longer than that
+    many days are used, see ``create_daily_dataframe``.
+    """
+
+    def __init__(
+        self,
+        database_file: str,
+        user_id: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        max_interpolated_gap_days: int | None = None,
+    ):
+        # pylint: disable=too-many-arguments
+        self._database_file = database_file
+        self._user_id = user_id
+        self._start_date = start_date
+        self._end_date = end_date
+        self._max_interpolated_gap_days = max_interpolated_gap_days
+
+    def get_dataframe(self) -> pd.DataFrame:
+        return self.get_daily_series().to_dataframe()
+
+    def get_daily_series(self) -> DailyWeightSeries:
+        with WeightStore(self._database_file) as weight_store:
+            query_start_date = self._start_date
+            if self._start_date is not None:
+                last_day_before = weight_store.get_last_day_before(
+                    self._user_id, self._start_date
+                )
+                if last_day_before is not None:
+                    query_start_date = _to_date(last_day_before)
+
+            query_end_date = self._end_date
+            if self._end_date is not None:
+                first_day_after = weight_store.get_first_day_after(
+                    self._user_id, self._end_date
+                )
+                if first_day_after is not None:
+                    query_end_date = _to_date(first_day_after)
+
+            days, weights = weight_store.get_daily_weights(
+                self._user_id, start_date=query_start_date, end_date=query_end_date
+            )
+        series = SparseWeightSeries(days=days, weights=weights)
+        if self._max_interpolated_gap_days is not None:
+            series = series.get_last_segment(self._max_interpolated_gap_days)
+
+        return series.to_daily_series(
+            start_day=None if self._start_date is None else _to_day(self._start_date),
+            end_day=None if self._end_date is None else _to_day(self._end_date),
+        )
+
+
+def _to_day(isoformat_date: str) -> int:
+    return date.fromisoformat(isoformat_date).toordinal() - EPOCH_ORDINAL
+
+
+def _to_date(day: int) -> str:
+    return date.fromordinal(day + EPOCH_ORDINAL).isoformat()
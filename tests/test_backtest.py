@@ -0,0 +1,65 @@
+import contextlib
+import io
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from scripts.backtest import backtest
+from scripts.daily_series import DailyWeightSeries
+from scripts.predictions import DAYS_PER_WEEK
+from scripts.process import process_daily_series
+
+# a Monday
+FIRST_DAY = int(np.datetime64("2023-01-02", "D").astype(np.int64))
+
+
+class TestBacktest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.daily_series = DailyWeightSeries(
+            start_day=FIRST_DAY,
+            weights=80000 + np.cumsum(rng.integers(-300, 300, size=10 * DAYS_PER_WEEK)),
+        )
+
+    def test_matches_replaying_the_forecaster(self):
+        df_backtest = backtest(self.daily_series)
+
+        # the 14d change of the second week is the first one in the weekly table
+        assert len(df_backtest) == 8
+        for sunday, row in df_backtest.tail(2).iterrows():
+            sunday_day = int(sunday.to_datetime64().astype("datetime64[D]").astype(int))
+            week_weights = self.daily_series.weights[
+                sunday_day - FIRST_DAY - DAYS_PER_WEEK + 1 : sunday_day - FIRST_DAY + 1
+            ]
+            forecast_errors = []
+            for remaining_days in range(DAYS_PER_WEEK, 0, -1):
+                history = DailyWeightSeries(
+                    start_day=FIRST_DAY,
+                    weights=self.daily_series.weights[
+                        : sunday_day - FIRST_DAY - remaining_days + 1
+                    ],
+                )
+                with contextlib.redirect_stdout(io.StringIO()):
+                    df_weekly, remaining_days_weight = process_daily_series(history)
+
+                assert df_weekly["target_weight_7d"].iloc[-1] == row.target_weight_7d
+                forecast_errors.extend(
+                    remaining_days_weight.to_numpy()
+                    - week_weights[DAYS_PER_WEEK - remaining_days :]
+                )
+
+            assert row.weight_7d == week_weights.mean()
+            # the forecaster truncates its weights to grams
+            assert (
+                abs(row.forecast_mean_absolute_error - np.abs(forecast_errors).mean())
+                <= 1
+            )
+            assert row.correctness_mismatches == 0
+
+    def test_copy_on_write_is_only_enabled_while_processing(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            process_daily_series(self.daily_series)
+        backtest(self.daily_series)
+
+        assert not pd.get_option("mode.copy_on_write")
@@ -0,0 +1,188 @@
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+from scripts.accounts import get_account_key
+from scripts.batch import (
+    BatchUser,
+    UserResult,
+    get_batch_users,
+    print_report,
+    process_users,
+)
+from scripts.files import (
+    RAW_DATA_FILENAME,
+    REMAINING_DAYS_WEIGHT_PNG_FILENAME,
+    WEIGHT_CHANGE_PNG_FILENAME,
+    WEIGHT_PNG_FILENAME,
+)
+from scripts.process import get_weight_dataframe_creator
+from scripts.weight_store import WeightStore
+
+
+def _summaries(days: int) -> list[dict]:
+    first_day = date(2023, 1, 2)
+    return [
+        {
+            "summaryDate": (first_day + timedelta(days=day)).isoformat(),
+            "allWeightMetrics": [{"weight": 80000 - 50 * day + 300 * (day % 3)}],
+        }
+        for day in range(days)
+    ]
+
+
+def _write_raw_data(storage_directory: str, days: int) -> None:
+    with open(
+        os.path.join(storage_directory, RAW_DATA_FILENAME), "w", encoding="utf-8"
+    ) as f:
+        json.dump({"dailyWeightSummaries": _summaries(days)}, f)
+
+
+def _exit_for_dying_user(storage_directory: str, user_id: str | None) -> str:
+    del user_id
+    if os.path.basename(storage_directory) == "dies":
+        os._exit(1)
+    return "text"
+
+
+class TestProcessUsers(unittest.TestCase):
+    def test_process_users(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage_directories = [
+                os.path.join(temp_dir, user) for user in ("a", "b", "c", "d")
+            ]
+            for storage_directory in storage_directories:
+                os.mkdir(storage_directory)
+            _write_raw_data(storage_directories[0], days=60)
+            _write_raw_data(storage_directories[1], days=45)
+            _write_raw_data(storage_directories[2], days=10)
+            # no raw data for the last user
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = process_users(
+                    [BatchUser(directory) for directory in storage_directories],
+                    max_workers=2,
+                )
+
+            assert [result.storage_directory for result in results] == (
+                storage_directories
+            )
+            assert [result.success for result in results] == [True, True, False, False]
+            assert results[2].error == "not enough data"
+            assert results[3].error.startswith("FileNotFoundError")
+            for storage_directory in storage_directories[:2]:
+                for filename in (
+                    WEIGHT_PNG_FILENAME,
+                    WEIGHT_CHANGE_PNG_FILENAME,
+                    REMAINING_DAYS_WEIGHT_PNG_FILENAME,
+                ):
+                    assert os.path.isfile(os.path.join(storage_directory, filename))
+
+    @unittest.skipUnless(
+        multiprocessing.get_start_method() == "fork",
+        "the patched processing is only inherited by forked workers",
+    )
+    def test_dying_worker_fails_its_users(self):
+        users = [BatchUser("dies"), BatchUser("b"), BatchUser("c")]
+
+        with mock.patch("scripts.batch.process_user", _exit_for_dying_user):
+            results = process_users(users, max_workers=2)
+
+        assert [result.storage_directory for result in results] == ["dies", "b", "c"]
+        assert not results[0].success
+        assert results[0].error.startswith("BrokenProcessPool")
+        assert results[0].seconds is None
+        for result in results[1:]:
+            assert result.success or result.error.startswith("BrokenProcessPool")
+            assert (result.seconds is None) == (not result.success)
+
+
+class TestPrintReport(unittest.TestCase):
+    def test_unfinished_users_have_no_processing_time(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            print_report(
+                [
+                    UserResult("a", success=True, seconds=1.5),
+                    UserResult(
+                        "b", success=False, seconds=None, error="BrokenProcessPool"
+                    ),
+                ]
+            )
+
+        assert output.getvalue().splitlines() == [
+            "a: ok in 1.50s",
+            "b: failed (BrokenProcessPool)",
+            "1 of 2 users processed successfully, 1.50s processing time in total",
+        ]
+
+
+class TestProcessUsersFromWeightStore(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+
+        self.storage_directories = [
+            os.path.join(directory.name, user) for user in ("a", "b")
+        ]
+        for storage_directory in self.storage_directories:
+            os.mkdir(storage_directory)
+
+        accounts_file = os.path.join(directory.name, "accounts.json")
+        with open(accounts_file, "w", encoding="utf-8") as f:
+            json.dump(
+                [
+                    {
+                        "email": f"{user}@example.com",
+                        "password": "password",
+                        "storage_directory": storage_directory,
+                    }
+                    for user, storage_directory in zip(
+                        ("a", "b"), self.storage_directories
+                    )
+                ],
+                f,
+            )
+
+        database_file = os.path.join(directory.name, "weight.sqlite")
+        with WeightStore(database_file) as weight_store:
+            weight_store.upsert_daily_weight_summaries(
+                user_id=get_account_key("a@example.com"), summaries=_summaries(60)
+            )
+            weight_store.upsert_daily_weight_summaries(
+                user_id=get_account_key("b@example.com"), summaries=_summaries(10)
+            )
+
+        patcher = mock.patch.dict(
+            os.environ,
+            {
+                "GARMIN_ACCOUNTS_FILE": accounts_file,
+                "WEIGHT_DATABASE_FILE": database_file,
+                # the single account must not be used for the users of the batch
+                "GARMIN_EMAIL": "a@example.com",
+            },
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_users_are_processed_with_their_own_weights(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = process_users(get_batch_users([]), max_workers=2)
+
+        assert [result.storage_directory for result in results] == (
+            self.storage_directories
+        )
+        assert [result.success for result in results] == [True, False]
+        assert results[1].error == "not enough data"
+
+    def test_storage_directories_require_user_ids(self):
+        with self.assertRaises(RuntimeError):
+            get_batch_users(self.storage_directories)
+        with self.assertRaises(RuntimeError):
+            get_weight_dataframe_creator(storage_directory=self.storage_directories[0])
@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from scripts.columns import WEIGHT_IN_GRAMS_COLUMN
+from scripts.daily_series import DailyWeightSeries
+from scripts.dataframe_creator import create_daily_dataframe
+from scripts.process_weight_data import process_weight_data
+
+FIRST_DAY = int(np.datetime64("2023-01-01", "D").astype(np.int64))
+
+
+class TestDailyWeightSeries(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.weights = 80000 + np.cumsum(rng.integers(-300, 300, size=40))
+        self.series = DailyWeightSeries(start_day=FIRST_DAY, weights=self.weights)
+
+    def test_dataframe_round_trip(self):
+        df = create_daily_dataframe(
+            days=FIRST_DAY + np.arange(len(self.weights)), weights=self.weights
+        )
+
+        assert self.series.weights.dtype == np.int32
+        assert self.series.nbytes == 4 * len(self.weights)
+        assert_frame_equal(self.series.to_dataframe(), df)
+
+        series = DailyWeightSeries.from_dataframe(df)
+        assert series.start_day == FIRST_DAY
+        assert series.last_day == FIRST_DAY + 39
+        assert np.array_equal(series.weights, self.weights)
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.series.dataframe = None  # pylint: disable=assigning-non-slot
+
+    def test_weights_are_read_only(self):
+        with self.assertRaises(ValueError):
+            self.series.weights[0] = 0
+        # the array of the caller stays writable
+        self.weights[0] = 0
+
+    def test_moving_average_matches_pandas(self):
+        expected = (
+            pd.Series(self.weights).rolling(window=7).mean().to_numpy(dtype=np.float64)
+        )
+
+        assert np.array_equal(self.series.moving_average(7), expected, equal_nan=True)
+
+    def test_tail(self):
+        tail = self.series.tail(5)
+
+        assert tail.start_day == FIRST_DAY + 35
+        assert tail.weights.tolist() == self.weights[-5:].tolist()
+        assert len(self.series.tail(0)) == 0
+        assert len(self.series.tail(100)) == 40
+
+    def test_tail_keeps_measured_days(self):
+        measured = np.arange(40) % 3 == 0
+        series = DailyWeightSeries(
+            start_day=FIRST_DAY, weights=self.weights, measured=measured
+        )
+
+        assert series.tail(5).measured.tolist() == measured[-5:].tolist()
+        assert self.series.tail(5).measured is None
+
+    def test_process_weight_data_consumes_series(self):
+        df = process_weight_data(weight_dataframe_creator=self.series)
+
+        assert df.index[0] == pd.Timestamp("2023-01-01")
+        assert df[WEIGHT_IN_GRAMS_COLUMN].tolist() == self.weights.tolist()
+        assert df["weight_in_grams_7d"].iloc[-1] == self.weights[-7:].mean()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from scripts.columns import WEIGHT_IN_GRAMS_COLUMN
+from scripts.dataframe_cache import CachedWeightDataFrameCreator
+from scripts.dataframe_creator import (
+    WeightDataFrameCreator,
+    create_daily_dataframe,
+    create_daily_series,
+)
+
+FIRST_DAY = int(np.datetime64("2023-01-01", "D").astype(np.int64))
+
+
+class CountingWeightDataFrameCreator(WeightDataFrameCreator):
+    # pylint: disable=too-few-public-methods
+    def __init__(self, weights: list[int]):
+        self.weights = weights
+        self.calls = 0
+
+    def get_dataframe(self) -> pd.DataFrame:
+        self.calls += 1
+        return create_daily_dataframe(
+            days=FIRST_DAY + np.arange(len(self.weights)),
+            weights=np.array(self.weights),
+        )
+
+
+class SparseWeightDataFrameCreator(WeightDataFrameCreator):
+    # pylint: disable=too-few-public-methods
+    def get_dataframe(self) -> pd.DataFrame:
+        return self.get_daily_series().to_dataframe()
+
+    def get_daily_series(self):
+        return create_daily_series(
+            days=FIRST_DAY + np.array([0, 3, 4]),
+            weights=np.array([70000, 70300, 70400]),
+        )
+
+
+class TestCachedWeightDataFrameCreator(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.source_file = os.path.join(directory.name, "weight.json")
+        self.cache_file = os.path.join(directory.name, "weight.npy")
+        with open(self.source_file, "w", encoding="utf-8") as f:
+            f.write("{}")
+
+    def _creator(self, weight_dataframe_creator) -> CachedWeightDataFrameCreator:
+        return CachedWeightDataFrameCreator(
+            weight_dataframe_creator,
+            source_file=self.source_file,
+            cache_file=self.cache_file,
+        )
+
+    def test_cached_dataframe_equals_original(self):
+        counting_creator = CountingWeightDataFrameCreator([70000, 70100, 69900])
+        expected_df = counting_creator.get_dataframe()
+
+        first_df = self._creator(counting_creator).get_dataframe()
+        second_df = self._creator(counting_creator).get_dataframe()
+
+        assert counting_creator.calls == 2
+        assert os.path.isfile(self.cache_file)
+        assert_frame_equal(first_df, expected_df)
+        assert_frame_equal(second_df, expected_df)
+
+    def test_cache_is_invalidated_when_source_changes(self):
+        self._creator(CountingWeightDataFrameCreator([70000, 70100])).get_dataframe()
+
+        with open(self.source_file, "w", encoding="utf-8") as f:
+            f.write('{"dailyWeightSummaries": []}')
+        counting_creator = CountingWeightDataFrameCreator([71000, 71100, 71200])
+        df = self._creator(counting_creator).get_dataframe()
+
+        assert counting_creator.calls == 1
+        assert df[WEIGHT_IN_GRAMS_COLUMN].tolist() == [71000, 71100, 71200]
+
+    def test_corrupt_cache_is_rebuilt(self):
+        with open(self.cache_file, "wb") as f:
+            f.write(b"not a cache")
+        counting_creator = CountingWeightDataFrameCreator([70000])
+
+        df = self._creator(counting_creator).get_dataframe()
+
+        assert counting_creator.calls == 1
+        assert df[WEIGHT_IN_GRAMS_COLUMN].tolist() == [70000]
+
+    def test_cache_keeps_measured_days(self):
+        self._creator(SparseWeightDataFrameCreator()).get_daily_series()
+
+        counting_creator = CountingWeightDataFrameCreator([70000])
+        series = self._creator(counting_creator).get_daily_series()
+
+        assert counting_creator.calls == 0
+        assert series.weights.tolist() == [70000, 70100, 70200, 70300, 70400]
+        assert series.measured.tolist() == [True, False, False, True, True]
@@ -0,0 +1,147 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import UTC, datetime, time
+
+from scripts.dataframe_creator import (
+    AGGREGATION_MEAN,
+    AGGREGATION_MEDIAN,
+    AGGREGATION_MIN,
+    DailyWeightAggregation,
+    GarminWeightDataFrameCreator,
+    daily_weights_to_arrays,
+    weight_metrics_to_arrays,
+)
+from scripts.outliers import HampelFilter
+
+
+def _metric(local_time: str, weight: float) -> dict:
+    # Garmin's "date" is the local time of the weigh-in in milliseconds since the epoch
+    timestamp = datetime.fromisoformat(local_time).replace(tzinfo=UTC)
+    return {"date": int(timestamp.timestamp() * 1000), "weight": weight}
+
+
+SUMMARIES = [
+    {
+        "summaryDate": "2023-01-01",
+        "allWeightMetrics": [
+            _metric("2023-01-01T20:00", 70900),
+            _metric("2023-01-01T07:00", 70000),
+            _metric("2023-01-01T12:00", 70301),
+        ],
+    },
+    {
+        "summaryDate": "2023-01-02",
+        "allWeightMetrics": [
+            _metric("2023-01-02T06:30", 70200),
+            _metric("2023-01-02T21:00", 70600),
+        ],
+    },
+    {
+        "summaryDate": "2023-01-03",
+        "allWeightMetrics": [_metric("2023-01-03T19:00", 70500.5)],
+    },
+]
+
+
+class TestDailyWeightAggregation(unittest.TestCase):
+    def _weights(self, aggregation: DailyWeightAggregation) -> list[int]:
+        days, weights = daily_weights_to_arrays(
+            SUMMARIES, capacity=1, aggregation=aggregation
+        )
+        assert days.tolist() == sorted(days.tolist())
+        return weights.tolist()
+
+    def test_weight_metrics_to_arrays(self):
+        days, weights, times_of_day = weight_metrics_to_arrays(SUMMARIES, capacity=1)
+
+        assert days.tolist() == [19358, 19358, 19358, 19359, 19359, 19360]
+        assert weights.tolist() == [70900, 70000, 70301, 70200, 70600, 70500.5]
+        assert times_of_day[1] == 7 * 60 * 60 * 1000
+
+    def test_first_weigh_in_by_default(self):
+        assert self._weights(DailyWeightAggregation()) == [70900, 70200, 70500]
+
+    def test_aggregations(self):
+        assert self._weights(DailyWeightAggregation(AGGREGATION_MIN)) == [
+            70000,
+            70200,
+            70500,
+        ]
+        assert self._weights(DailyWeightAggregation(AGGREGATION_MEDIAN)) == [
+            70301,
+            70400,
+            70500,
+        ]
+        assert self._weights(DailyWeightAggregation(AGGREGATION_MEAN)) == [
+            70400,
+            70400,
+            70500,
+        ]
+
+    def test_time_of_day_window(self):
+        days, weights = daily_weights_to_arrays(
+            SUMMARIES,
+            capacity=1,
+            aggregation=DailyWeightAggregation(
+                AGGREGATION_MEAN, time_of_day_window=(time(5), time(13))
+            ),
+        )
+
+        assert days.tolist() == [19358, 19359]
+        assert weights.tolist() == [70150, 70200]
+
+    def test_time_of_day_window_around_midnight(self):
+        assert self._weights(
+            DailyWeightAggregation(
+                AGGREGATION_MIN, time_of_day_window=(time(19, 30), time(6, 45))
+            )
+        ) == [70900, 70200]
+
+    def test_outlier_filter(self):
+        summaries = SUMMARIES + [
+            {
+                "summaryDate": "2023-01-04",
+                "allWeightMetrics": [
+                    _metric("2023-01-04T07:00", 70300),
+                    # clothed
+                    _metric("2023-01-04T18:00", 72800),
+                ],
+            },
+        ]
+        aggregation = DailyWeightAggregation(
+            AGGREGATION_MEAN, outlier_filter=HampelFilter()
+        )
+
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            days, weights = daily_weights_to_arrays(
+                summaries, capacity=1, aggregation=aggregation
+            )
+
+        assert days.tolist() == [19358, 19359, 19360, 19361]
+        assert weights.tolist() == [70400, 70400, 70500, 70300]
+        assert "2023-01-04: 72800 g" in output.getvalue()
+        assert not aggregation.is_default
+        assert aggregation.name == "mean_hampel_4"
+
+    def test_unknown_aggregation(self):
+        with self.assertRaises(ValueError):
+            DailyWeightAggregation("last")
+
+
+class TestGarminWeightDataFrameCreator(unittest.TestCase):
+    def test_daily_series_marks_measured_days(self):
+        with tempfile.TemporaryDirectory() as directory:
+            raw_data_file = os.path.join(directory, "weight.json")
+            with open(raw_data_file, "w", encoding="utf-8") as f:
+                json.dump({"dailyWeightSummaries": [SUMMARIES[0], SUMMARIES[2]]}, f)
+
+            series = GarminWeightDataFrameCreator(
+                streaming=True, raw_data_file=raw_data_file
+            ).get_daily_series()
+
+        assert series.weights.tolist() == [70900, 70700, 70500]
+        assert series.measured.tolist() == [True, False, True]
@@ -0,0 +1,211 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from garth.exc import GarthHTTPError
+from requests import HTTPError, Response
+
+from scripts.accounts import get_account_key
+from scripts.download import (
+    get_sync_start_date,
+    get_token_store_directory,
+    login,
+    merge_weigh_ins,
+    sync_weigh_ins,
+)
+from scripts.weight_store import WeightStore
+
+
+def _summary(summary_date: str, weight: int) -> dict:
+    return {"summaryDate": summary_date, "allWeightMetrics": [{"weight": weight}]}
+
+
+def _garth_http_error(status_code: int) -> GarthHTTPError:
+    response = Response()
+    response.status_code = status_code
+    return GarthHTTPError(msg="Error in request", error=HTTPError(response=response))
+
+
+class TestLogin(unittest.TestCase):
+    def setUp(self):
+        self.garth_home = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.garth_home.cleanup)
+        patcher = patch.dict(os.environ, {"GARTH_HOME": self.garth_home.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_token_store_is_keyed_per_account(self):
+        assert get_account_key("User@Example.com") == get_account_key(
+            "user@example.com"
+        )
+        assert get_token_store_directory("a@example.com") != get_token_store_directory(
+            "b@example.com"
+        )
+        assert "example" not in get_token_store_directory("a@example.com")
+
+    @patch("scripts.download.garminconnect.Garmin")
+    def test_login_with_credentials_without_token_store(self, mock_garmin):
+        login(email="user@example.com", password="password")
+
+        mock_garmin.return_value.login.assert_called_once_with()
+        mock_garmin.return_value.garth.dump.assert_called_once_with(
+            get_token_store_directory("user@example.com")
+        )
+        assert mock_garmin.call_count == 1
+
+    @patch("scripts.download.garminconnect.Garmin")
+    def test_login_resumes_from_token_store(self, mock_garmin):
+        token_store_directory = get_token_store_directory("user@example.com")
+        os.makedirs(token_store_directory)
+
+        login(email="user@example.com", password="password")
+
+        mock_garmin.return_value.login.assert_called_once_with(
+            tokenstore=token_store_directory
+        )
+        mock_garmin.return_value.garth.dump.assert_called_once_with(
+            token_store_directory
+        )
+
+    @patch("scripts.download.garminconnect.Garmin")
+    def test_login_falls_back_to_credentials_on_auth_failure(self, mock_garmin):
+        token_store_directory = get_token_store_directory("user@example.com")
+        os.makedirs(token_store_directory)
+        mock_garmin.return_value.login.side_effect = [_garth_http_error(401), True]
+
+        login(email="user@example.com", password="password")
+
+        assert mock_garmin.return_value.login.call_count == 2
+        mock_garmin.return_value.login.assert_called_with()
+
+    @patch("scripts.download.garminconnect.Garmin")
+    def test_login_does_not_fall_back_on_rate_limit(self, mock_garmin):
+        token_store_directory = get_token_store_directory("user@example.com")
+        os.makedirs(token_store_directory)
+        mock_garmin.return_value.login.side_effect = _garth_http_error(429)
+
+        with self.assertRaises(GarthHTTPError):
+            login(email="user@example.com", password="password")
+
+        assert mock_garmin.return_value.login.call_count == 1
+
+
+class TestGetSyncStartDate(unittest.TestCase):
+    def test_first_sync_uses_start_date(self):
+        startdate = get_sync_start_date(
+            startdate="2023-01-01", last_synced=None, overlap_days=7
+        )
+        assert startdate == "2023-01-01"
+
+    def test_subsequent_sync_uses_overlap(self):
+        startdate = get_sync_start_date(
+            startdate="2023-01-01", last_synced="2023-03-10", overlap_days=7
+        )
+        assert startdate == "2023-03-03"
+
+    def test_overlap_never_before_start_date(self):
+        startdate = get_sync_start_date(
+            startdate="2023-01-01", last_synced="2023-01-03", overlap_days=7
+        )
+        assert startdate == "2023-01-01"
+
+
+class TestMergeWeighIns(unittest.TestCase):
+    def test_merge_without_stored_data(self):
+        fetched = {"dailyWeightSummaries": [_summary("2023-01-02", 71)]}
+
+        merged = merge_weigh_ins(
+            stored=None, fetched=fetched, window_start="2023-01-01"
+        )
+
+        assert merged["dailyWeightSummaries"] == [_summary("2023-01-02", 71)]
+
+    def test_merge_replaces_window(self):
+        stored = {
+            "dailyWeightSummaries": [
+                _summary("2023-01-01", 70),
+                _summary("2023-01-02", 71),
+                _summary("2023-01-03", 72),
+            ]
+        }
+        # the weigh-in on 2023-01-02 was deleted and the one on 2023-01-03 edited
+        fetched = {
+            "dailyWeightSummaries": [
+                _summary("2023-01-04", 74),
+                _summary("2023-01-03", 73),
+            ]
+        }
+
+        merged = merge_weigh_ins(
+            stored=stored, fetched=fetched, window_start="2023-01-02"
+        )
+
+        assert merged["dailyWeightSummaries"] == [
+            _summary("2023-01-01", 70),
+            _summary("2023-01-03", 73),
+            _summary("2023-01-04", 74),
+        ]
+
+
+class TestSyncWeighInsIntoStore(unittest.TestCase):
+    def setUp(self):
+        self.storage_directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.storage_directory.cleanup)
+        self.weight_database_file = os.path.join(
+            self.storage_directory.name, "weights.sqlite"
+        )
+        self.today = date.today().isoformat()
+        patcher = patch.dict(
+            os.environ,
+            {
+                "GARMIN_START_DATE": "2023-01-01",
+                "WEIGHT_DATABASE_FILE": self.weight_database_file,
+            },
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _sync(self, fetched: list[dict]) -> None:
+        with patch(
+            "scripts.download.fetch_weigh_ins_in_chunks",
+            return_value={"dailyWeightSummaries": fetched},
+        ):
+            sync_weigh_ins(
+                garmin=MagicMock(),
+                email="user@example.com",
+                storage_directory=self.storage_directory.name,
+            )
+
+    def _stored_weights(self) -> list[int]:
+        with WeightStore(self.weight_database_file) as weight_store:
+            _, weights = weight_store.get_daily_weights(
+                get_account_key("user@example.com")
+            )
+        return weights.tolist()
+
+    def test_first_sync_into_store_backfills_history(self):
+        with patch("scripts.download.get_weight_database_file", return_value=None):
+            self._sync([_summary("2023-01-01", 70000), _summary("2023-01-02", 71000)])
+
+        # only today is fetched, but the store gets the days of the earlier sync as well
+        self._sync([_summary(self.today, 72000)])
+
+        assert self._stored_weights() == [70000, 71000, 72000]
+
+    @patch.dict(os.environ, {"RAW_DATA_FORMAT": "jsonl"})
+    def test_first_sync_into_store_backfills_history_of_log(self):
+        with patch("scripts.download.get_weight_database_file", return_value=None):
+            self._sync([_summary("2023-01-01", 70000), _summary("2023-01-02", 71000)])
+
+        self._sync([_summary(self.today, 72000)])
+
+        assert self._stored_weights() == [70000, 71000, 72000]
+
+    def test_later_syncs_replace_the_window(self):
+        self._sync([_summary("2023-01-01", 70000), _summary(self.today, 71000)])
+
+        self._sync([_summary(self.today, 72000)])
+
+        assert self._stored_weights() == [70000, 72000]
@@ -0,0 +1,148 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from garth.exc import GarthHTTPError
+from requests import HTTPError, Response
+
+from scripts.accounts import get_account_key
+from scripts.download_accounts import Account, _sync_account, download_accounts
+
+
+def _garth_http_error(status_code: int) -> GarthHTTPError:
+    response = Response()
+    response.status_code = status_code
+    return GarthHTTPError(msg="Error in request", error=HTTPError(response=response))
+
+
+def _account(number: int, is_cn: bool = False) -> Account:
+    return Account(
+        email=f"user{number}@example.com",
+        password="password",
+        storage_directory=f"/storage/{number}",
+        is_cn=is_cn,
+    )
+
+
+class TestDownloadAccounts(unittest.IsolatedAsyncioTestCase):
+    @patch("scripts.download_accounts._sync_account")
+    async def test_failures_are_reported_per_account(self, mock_sync_account):
+        def sync_account(account: Account, full_sync: bool) -> None:
+            # pylint: disable=unused-argument
+            if account.email == "user1@example.com":
+                raise RuntimeError("Failed to retrieve data from Garmin")
+
+        mock_sync_account.side_effect = sync_account
+
+        results = await download_accounts([_account(0), _account(1), _account(2)])
+
+        assert [result.success for result in results] == [True, False, True]
+        assert results[1].account_key == get_account_key("user1@example.com")
+        assert "Failed to retrieve data from Garmin" in results[1].error
+        assert results[1].attempts == 1
+        assert all(result.latency_seconds >= 0 for result in results)
+
+    @patch("scripts.download_accounts._sync_account")
+    async def test_rate_limited_downloads_are_retried(self, mock_sync_account):
+        # the chunked fetcher wraps the rate limit error of a window
+        window_error = RuntimeError("window failed")
+        window_error.__cause__ = _garth_http_error(429)
+        mock_sync_account.side_effect = [_garth_http_error(429), window_error, None]
+
+        results = await download_accounts([_account(0)], initial_backoff_seconds=0)
+
+        assert results[0].success
+        assert results[0].attempts == 3
+
+    @patch("scripts.download_accounts._sync_account")
+    async def test_other_http_errors_are_not_retried(self, mock_sync_account):
+        mock_sync_account.side_effect = _garth_http_error(500)
+
+        results = await download_accounts([_account(0)], initial_backoff_seconds=0)
+
+        assert not results[0].success
+        assert results[0].attempts == 1
+
+    @patch("scripts.download_accounts._sync_account")
+    async def test_concurrency_is_limited_per_host(self, mock_sync_account):
+        lock = threading.Lock()
+        running = {"garmin.com": 0, "garmin.cn": 0}
+        max_running = {"garmin.com": 0, "garmin.cn": 0, "total": 0}
+
+        def sync_account(account: Account, full_sync: bool) -> None:
+            # pylint: disable=unused-argument
+            with lock:
+                running[account.host] += 1
+                max_running[account.host] = max(
+                    max_running[account.host], running[account.host]
+                )
+                max_running["total"] = max(max_running["total"], sum(running.values()))
+            time.sleep(0.02)
+            with lock:
+                running[account.host] -= 1
+
+        mock_sync_account.side_effect = sync_account
+        accounts = [_account(number, is_cn=number % 2 == 0) for number in range(12)]
+
+        results = await download_accounts(
+            accounts, max_concurrency=3, max_concurrency_per_host=2
+        )
+
+        assert all(result.success for result in results)
+        assert max_running["garmin.com"] <= 2
+        assert max_running["garmin.cn"] <= 2
+        assert max_running["total"] <= 3
+
+    @patch("scripts.download_accounts._sync_account")
+    async def test_saturated_host_does_not_block_other_hosts(self, mock_sync_account):
+        started_hosts = []
+
+        def sync_account(account: Account, full_sync: bool) -> None:
+            # pylint: disable=unused-argument
+            started_hosts.append(account.host)
+            time.sleep(0.02)
+
+        mock_sync_account.side_effect = sync_account
+        # the accounts of garmin.com come first and wait for their host
+        accounts = [_account(number) for number in range(4)] + [_account(4, is_cn=True)]
+
+        results = await download_accounts(
+            accounts, max_concurrency=2, max_concurrency_per_host=1
+        )
+
+        assert all(result.success for result in results)
+        # the account of garmin.cn uses the free global slot right away
+        assert started_hosts.index("garmin.cn") == 1
+
+    @patch("scripts.download_accounts._sync_account")
+    async def test_concurrency_is_not_limited_by_the_default_executor(
+        self, mock_sync_account
+    ):
+        # more accounts than the default executor of the loop has threads at most
+        accounts = [_account(number) for number in range(40)]
+        barrier = threading.Barrier(len(accounts), timeout=5)
+
+        def sync_account(account: Account, full_sync: bool) -> None:
+            # pylint: disable=unused-argument
+            barrier.wait()
+
+        mock_sync_account.side_effect = sync_account
+
+        results = await download_accounts(
+            accounts, max_concurrency=40, max_concurrency_per_host=40
+        )
+
+        assert all(result.success for result in results)
+
+
+class TestSyncAccount(unittest.TestCase):
+    @patch("scripts.download_accounts.sync_weigh_ins")
+    @patch("scripts.download_accounts.login")
+    def test_date_windows_are_fetched_one_after_another(
+        self, mock_login, mock_sync_weigh_ins
+    ):
+        _sync_account(_account(0), full_sync=False)
+
+        mock_login.assert_called_once()
+        assert mock_sync_weigh_ins.call_args.kwargs["fetch_max_workers"] == 1
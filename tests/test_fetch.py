@@ -0,0 +1,127 @@
+import threading
+import unittest
+from datetime import date, timedelta
+
+from garth.exc import GarthHTTPError
+from requests import HTTPError, Response
+
+from scripts.fetch import fetch_weigh_ins_in_chunks, split_date_range
+
+
+class FakeWeighInsEndpoint:
+    # pylint: disable=too-few-public-methods
+    """
+    Local stand-in for the Garmin weigh-ins endpoint: serves one weigh-in per day from
+    the inclusive range, newest first, and fails the first request for selected windows.
+    """
+
+    def __init__(self, failing_startdates: set[str] | None = None):
+        self.failing_startdates = set(failing_startdates or [])
+        self.requests: list[tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def get_weigh_ins(self, startdate: str, enddate: str) -> dict | None:
+        with self._lock:
+            self.requests.append((startdate, enddate))
+            if startdate in self.failing_startdates:
+                self.failing_startdates.remove(startdate)
+                raise ConnectionError("simulated failure")
+
+        start = date.fromisoformat(startdate)
+        days = (date.fromisoformat(enddate) - start).days + 1
+        summaries = [
+            {
+                "summaryDate": (start + timedelta(days=day)).isoformat(),
+                "allWeightMetrics": [{"weight": 70000 + day}],
+            }
+            for day in range(days)
+        ]
+        return {"dailyWeightSummaries": summaries[::-1], "totalAverage": {}}
+
+
+class TestSplitDateRange(unittest.TestCase):
+    def test_split_date_range(self):
+        windows = split_date_range("2023-01-01", "2023-01-10", chunk_days=4)
+        assert windows == [
+            ("2023-01-01", "2023-01-04"),
+            ("2023-01-05", "2023-01-08"),
+            ("2023-01-09", "2023-01-10"),
+        ]
+
+    def test_split_date_range_single_day(self):
+        windows = split_date_range("2023-01-01", "2023-01-01", chunk_days=90)
+        assert windows == [("2023-01-01", "2023-01-01")]
+
+
+class TestFetchWeighInsInChunks(unittest.TestCase):
+    def test_summaries_are_stitched_in_order(self):
+        endpoint = FakeWeighInsEndpoint()
+
+        data = fetch_weigh_ins_in_chunks(
+            get_weigh_ins=endpoint.get_weigh_ins,
+            startdate="2023-01-01",
+            enddate="2023-12-31",
+            chunk_days=30,
+        )
+
+        summary_dates = [s["summaryDate"] for s in data["dailyWeightSummaries"]]
+        assert len(endpoint.requests) == 13
+        assert len(summary_dates) == 365
+        assert summary_dates == sorted(summary_dates)
+        assert summary_dates[0] == "2023-01-01"
+        assert summary_dates[-1] == "2023-12-31"
+
+    def test_failed_windows_are_retried_individually(self):
+        endpoint = FakeWeighInsEndpoint(failing_startdates={"2023-01-31"})
+
+        data = fetch_weigh_ins_in_chunks(
+            get_weigh_ins=endpoint.get_weigh_ins,
+            startdate="2023-01-01",
+            enddate="2023-03-31",
+            chunk_days=30,
+            retry_delay_seconds=0,
+        )
+
+        assert len(data["dailyWeightSummaries"]) == 90
+        assert sorted(endpoint.requests) == [
+            ("2023-01-01", "2023-01-30"),
+            ("2023-01-31", "2023-03-01"),
+            ("2023-01-31", "2023-03-01"),
+            ("2023-03-02", "2023-03-31"),
+        ]
+
+    def test_raises_after_last_attempt(self):
+        def get_weigh_ins(startdate: str, enddate: str) -> dict | None:
+            # pylint: disable=unused-argument
+            return None
+
+        with self.assertRaises(RuntimeError):
+            fetch_weigh_ins_in_chunks(
+                get_weigh_ins=get_weigh_ins,
+                startdate="2023-01-01",
+                enddate="2023-01-10",
+                max_attempts=2,
+                retry_delay_seconds=0,
+            )
+
+    def test_rate_limited_window_is_not_retried(self):
+        response = Response()
+        response.status_code = 429
+        rate_limit_error = GarthHTTPError(
+            msg="Error in request", error=HTTPError(response=response)
+        )
+        requests = []
+
+        def get_weigh_ins(startdate: str, enddate: str) -> dict | None:
+            requests.append((startdate, enddate))
+            raise rate_limit_error
+
+        with self.assertRaises(GarthHTTPError):
+            fetch_weigh_ins_in_chunks(
+                get_weigh_ins=get_weigh_ins,
+                startdate="2023-01-01",
+                enddate="2023-01-10",
+                retry_delay_seconds=0,
+            )
+        # the caller backs off instead
+        assert len(requests) == 1
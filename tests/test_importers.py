@@ -0,0 +1,108 @@
+import os
+import struct
+import tempfile
+import unittest
+from datetime import UTC, datetime
+
+from pandas.testing import assert_frame_equal
+
+from scripts.columns import WEIGHT_IN_GRAMS_COLUMN
+from scripts.dataframe_creator import AGGREGATION_MIN, DailyWeightAggregation
+from scripts.importers import (
+    FIT_EPOCH_OFFSET_SECONDS,
+    CsvFormat,
+    WeightExportDataFrameCreator,
+    read_fit_weigh_ins,
+)
+
+
+def _fit_timestamp(utc_time: str) -> int:
+    timestamp = datetime.fromisoformat(utc_time).replace(tzinfo=UTC).timestamp()
+    return int(timestamp) - FIT_EPOCH_OFFSET_SECONDS
+
+
+def _write_fit_file(fit_file: str, weigh_ins: list[tuple[str, float]]) -> None:
+    # file_id message (not a weigh-in), then the weight_scale definition and messages
+    records = b"\x40" + struct.pack("<BBHB", 0, 0, 0, 1) + bytes([0, 1, 0])
+    records += b"\x00" + bytes([4])
+    records += b"\x41" + struct.pack("<BBHB", 0, 0, 30, 2)
+    records += bytes([253, 4, 0x86, 0, 2, 0x84])
+    for utc_time, weight_in_kg in weigh_ins:
+        records += b"\x01" + struct.pack(
+            "<IH", _fit_timestamp(utc_time), round(weight_in_kg * 100)
+        )
+    # a weigh-in while the scale was still calculating
+    records += b"\x01" + struct.pack("<IH", _fit_timestamp("2023-01-03T07:00"), 0xFFFE)
+
+    header = struct.pack("<BBHI4s", 12, 0x20, 2132, len(records), b".FIT")
+    with open(fit_file, "wb") as f:
+        f.write(header + records + b"\x00\x00")
+
+
+class TestWeightExportDataFrameCreator(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        self.csv_file = os.path.join(self.directory, "scale.csv")
+        with open(self.csv_file, "w", encoding="utf-8") as f:
+            f.write("Date,Weight (lb),Fat\n")
+            f.write("2023-01-01 20:00,155.0,20\n")
+            f.write("2023-01-01 07:00,154.0,20\n")
+            f.write("2023-01-02 07:30,,20\n")
+            f.write("2023-01-04 07:00,156.0,20\n")
+        self.csv_format = CsvFormat(
+            date_column="Date", weight_column="Weight (lb)", weight_unit="lb"
+        )
+
+        self.fit_file = os.path.join(self.directory, "weight.fit")
+        _write_fit_file(
+            self.fit_file, [("2023-01-02T06:00", 70.1), ("2023-01-05T06:00", 70.25)]
+        )
+
+    def test_csv_export(self):
+        df = WeightExportDataFrameCreator(
+            self.csv_file, csv_format=self.csv_format, csv_chunk_size=2
+        ).get_dataframe()
+
+        # the earliest weigh-in of 2023-01-01 is the first one
+        assert df[WEIGHT_IN_GRAMS_COLUMN].tolist() == [69853, 70155, 70458, 70760]
+
+    def test_fit_export(self):
+        days, weights, times_of_day = read_fit_weigh_ins(self.fit_file)
+
+        assert days.tolist() == [19359, 19362]
+        assert weights.tolist() == [70100, 70250]
+        assert times_of_day.tolist() == [6 * 60 * 60 * 1000] * 2
+
+    def test_directory_is_imported_in_parallel(self):
+        creator = WeightExportDataFrameCreator(
+            self.directory,
+            csv_format=self.csv_format,
+            aggregation=DailyWeightAggregation(AGGREGATION_MIN),
+        )
+        sequential_creator = WeightExportDataFrameCreator(
+            self.directory,
+            csv_format=self.csv_format,
+            aggregation=DailyWeightAggregation(AGGREGATION_MIN),
+            max_workers=1,
+        )
+
+        df = creator.get_dataframe()
+
+        assert df[WEIGHT_IN_GRAMS_COLUMN].tolist() == [
+            69853,
+            70100,
+            70430,
+            70760,
+            70250,
+        ]
+        assert_frame_equal(df, sequential_creator.get_dataframe())
+
+    def test_not_a_fit_file(self):
+        with open(self.fit_file, "wb") as f:
+            f.write(b"\x0c" + b"\x00" * 11)
+
+        with self.assertRaises(ValueError):
+            read_fit_weigh_ins(self.fit_file)
@@ -0,0 +1,42 @@
+import io
+import json
+import unittest
+
+from scripts.json_stream import iter_array_items
+
+
+class TestIterArrayItems(unittest.TestCase):
+    def setUp(self):
+        self.data = {
+            "dailyWeightSummaries": [
+                {
+                    "summaryDate": f"2023-01-{day:02d}",
+                    "allWeightMetrics": [{"weight": day}],
+                }
+                for day in range(1, 31)
+            ],
+            "totalAverage": {"weight": 15},
+        }
+
+    def test_items_are_decoded_across_chunks(self):
+        for indent in (None, 2):
+            for chunk_size in (1, 7, 64, 1024 * 1024):
+                f = io.StringIO(json.dumps(self.data, indent=indent))
+                items = list(
+                    iter_array_items(f, "dailyWeightSummaries", chunk_size=chunk_size)
+                )
+                assert items == self.data["dailyWeightSummaries"]
+
+    def test_empty_array(self):
+        f = io.StringIO('{"dailyWeightSummaries": [ ], "totalAverage": null}')
+        assert not list(iter_array_items(f, "dailyWeightSummaries", chunk_size=4))
+
+    def test_missing_key(self):
+        f = io.StringIO('{"totalAverage": null}')
+        with self.assertRaises(ValueError):
+            list(iter_array_items(f, "dailyWeightSummaries"))
+
+    def test_truncated_document(self):
+        f = io.StringIO(json.dumps(self.data)[:200])
+        with self.assertRaises(ValueError):
+            list(iter_array_items(f, "dailyWeightSummaries", chunk_size=16))
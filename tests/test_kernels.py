@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from scripts.columns import WEIGHT_IN_GRAMS_COLUMN
+from scripts.kernels import (
+    add_integer_moving_averages,
+    divide_and_round_half_to_even,
+    rolling_means_in_grams,
+)
+from scripts.process_weight_data import add_moving_average, create_weekly_table
+
+
+class TestDivideAndRoundHalfToEven(unittest.TestCase):
+    def test_matches_numpy_rounding(self):
+        numerators = np.arange(-100, 100, dtype=np.int64)
+        for denominator in (2, 7, 14):
+            expected = np.round(numerators / denominator).astype(np.int64)
+            result = divide_and_round_half_to_even(numerators, denominator)
+            np.testing.assert_array_equal(result, expected)
+
+
+class TestRollingMeansInGrams(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(seed=7)
+        self.df = pd.DataFrame(
+            {
+                WEIGHT_IN_GRAMS_COLUMN: 80000
+                + np.cumsum(rng.integers(-400, 400, size=3650))
+            },
+            index=pd.date_range(
+                start="2015-01-01", periods=3650, freq="D", name="date"
+            ),
+        )
+
+    def test_matches_rounded_pandas_rolling_mean(self):
+        weights = self.df[WEIGHT_IN_GRAMS_COLUMN].to_numpy()
+        means = rolling_means_in_grams(weights, windows=(7, 14))
+
+        for window in (7, 14):
+            expected = (
+                self.df[WEIGHT_IN_GRAMS_COLUMN]
+                .rolling(window)
+                .mean()
+                .round()
+                .to_numpy()
+            )
+            np.testing.assert_array_equal(
+                means[window][window - 1 :], expected[window - 1 :]
+            )
+            assert not means[window][: window - 1].any()
+
+    def test_short_series(self):
+        means = rolling_means_in_grams(np.array([1, 2, 3]), windows=(7,))
+        np.testing.assert_array_equal(means[7], [0, 0, 0])
+
+    def test_drop_in_for_pandas_path(self):
+        df_pandas = self.df.copy()
+        for window in (7, 14):
+            add_moving_average(df_pandas, WEIGHT_IN_GRAMS_COLUMN, window=window)
+
+        df_numpy = self.df.copy()
+        add_integer_moving_averages(df_numpy, WEIGHT_IN_GRAMS_COLUMN, windows=(7, 14))
+
+        assert list(df_numpy.columns) == list(df_pandas.columns)
+        for window in (7, 14):
+            column = f"{WEIGHT_IN_GRAMS_COLUMN}_{window}d"
+            pd.testing.assert_series_equal(df_numpy[column], df_pandas[column].round())
+
+        weekly_pandas = create_weekly_table(df_pandas)
+        weekly_numpy = create_weekly_table(df_numpy)
+        for window in (7, 14):
+            column = f"{WEIGHT_IN_GRAMS_COLUMN}_{window}d_weekly"
+            pd.testing.assert_series_equal(
+                weekly_numpy[column], weekly_pandas[column].round()
+            )
+            change_difference = (
+                weekly_numpy[f"{column}_change"]
+                - weekly_pandas[f"{column}_change"].round()
+            )
+            assert change_difference.abs().max() <= 1
@@ -0,0 +1,54 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from scripts.outliers import HampelFilter
+
+
+class TestHampelFilter(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.weights = 80000 + rng.normal(0, 200, size=(3, 60)).round()
+
+    def test_rejects_spikes(self):
+        self.weights[0, 10] += 1500
+        self.weights[1, 0] -= 2000
+        self.weights[2, 59] += 3000
+
+        outliers = HampelFilter().find_outliers(self.weights)
+
+        assert outliers.shape == self.weights.shape
+        assert np.argwhere(outliers).tolist() == [[0, 10], [1, 0], [2, 59]]
+
+    def test_keeps_steady_changes(self):
+        weights = 80000 - 100.0 * np.arange(60)
+
+        assert not HampelFilter().find_outliers(weights[np.newaxis]).any()
+
+    def test_padding_and_users_are_independent(self):
+        self.weights[0, 10] += 1500
+        weights = self.weights.copy()
+        weights[1, 40:] = np.nan
+
+        outliers = HampelFilter().find_outliers(weights)
+
+        assert not outliers[1, 40:].any()
+        np.testing.assert_array_equal(
+            outliers[0], HampelFilter().find_outliers(weights[:1])[0]
+        )
+        np.testing.assert_array_equal(
+            outliers[1, :40], HampelFilter().find_outliers(weights[1:2, :40])[0]
+        )
+
+    def test_from_env(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            assert HampelFilter.from_env() is None
+        with mock.patch.dict(os.environ, {"WEIGHT_OUTLIER_THRESHOLD": "2.5"}):
+            assert HampelFilter.from_env() == HampelFilter(threshold=2.5)
+        with (
+            mock.patch.dict(os.environ, {"WEIGHT_OUTLIER_THRESHOLD": "-1"}),
+            self.assertRaises(ValueError),
+        ):
+            HampelFilter.from_env()
@@ -0,0 +1,215 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from scripts.daily_series import DailyWeightSeries
+from scripts.planner import (
+    DailyWeightPlanner,
+    get_required_weekly_change_percentages,
+    get_weeks_between,
+    get_weeks_to_goal_weights,
+    plan_daily_weights,
+    project_weekly_target_weights,
+)
+from scripts.predictions import DAYS_PER_WEEK
+from scripts.process_weight_data import add_target_weight_change
+
+# a Sunday
+FIRST_DAY = int(np.datetime64("2023-01-01", "D").astype(np.int64))
+
+
+class TestProjectWeeklyTargetWeights(unittest.TestCase):
+    def test_compounds_change(self):
+        target_weights = project_weekly_target_weights(
+            target_weights=np.array([80000, 60000]),
+            weekly_change_percentages=np.array([-0.01, 0.004]),
+            weeks=3,
+        )
+
+        np.testing.assert_array_equal(
+            target_weights, [[80000, 79200, 78408], [60000, 60240, 60481]]
+        )
+
+    @mock.patch.dict(os.environ, {"TARGET_WEEKLY_CHANGE_PERCENTAGE": "-0.0037"})
+    def test_matches_target_weight_change(self):
+        target_weights = project_weekly_target_weights(
+            target_weights=np.array([93457]),
+            weekly_change_percentages=np.array([-0.0037]),
+            weeks=104,
+        )
+
+        # a user whose weekly weights are exactly at the targets every week
+        df_weekly = add_target_weight_change(
+            pd.DataFrame({"weight_in_grams_7d_weekly": target_weights[0]}), window=7
+        )
+
+        np.testing.assert_array_equal(target_weights[0], df_weekly["target_weight_7d"])
+
+    def test_ends_at_goal_weight(self):
+        target_weights = project_weekly_target_weights(
+            target_weights=np.array([80000, 80000, 80000, 80000]),
+            weekly_change_percentages=np.array([-0.01, 0.01, 0.0, 0.0]),
+            weeks=4,
+            goal_weights=np.array([79000, np.nan, 70000, 80000]),
+        )
+
+        np.testing.assert_array_equal(
+            target_weights,
+            [
+                [80000, 79200, 79000, np.nan],
+                [80000, 80800, 81608, 82424],
+                [80000, 80000, 80000, 80000],
+                [80000, np.nan, np.nan, np.nan],
+            ],
+        )
+
+
+class TestGoalSolver(unittest.TestCase):
+    def test_weeks_to_goal_weights(self):
+        weeks = get_weeks_to_goal_weights(
+            target_weights=np.array([80000, 80000, 80000, 80000, 80000, 80000, 80000]),
+            weekly_change_percentages=np.array(
+                [-0.01, 0.005, 0.0, 0.01, -0.01, -0.01, 0.0]
+            ),
+            goal_weights=np.array([79000, 82000, 75000, 75000, 80000, np.nan, 80000]),
+        )
+
+        np.testing.assert_array_equal(weeks, [2, 5, np.inf, 0, 0, np.nan, 0])
+
+    def test_weeks_match_projected_target_weights(self):
+        rng = np.random.default_rng(0)
+        target_weights = rng.integers(60000, 100000, size=1000)
+        weekly_change_percentages = rng.uniform(-0.01, 0.01, size=1000)
+        goal_weights = target_weights * rng.uniform(0.8, 1.2, size=1000)
+
+        weeks = get_weeks_to_goal_weights(
+            target_weights, weekly_change_percentages, goal_weights
+        )
+        projected_target_weights = project_weekly_target_weights(
+            target_weights, weekly_change_percentages, 200, goal_weights
+        )
+
+        reached = np.isfinite(weeks) & (weeks < 199)
+        # the projected targets are rounded to grams every week, which can reach a goal
+        # one week earlier or later
+        last_weeks = (~np.isnan(projected_target_weights)).sum(axis=1) - 1
+        assert np.all(np.abs(last_weeks[reached] - weeks[reached]) <= 1)
+        assert np.mean(last_weeks[reached] == weeks[reached]) > 0.99
+
+    def test_required_weekly_change_percentages(self):
+        target_weights = np.array([80000, 80000, 80000])
+        goal_weights = np.array([75000, 84000, 75000])
+        weeks = np.array([10, 20, 0])
+
+        weekly_change_percentages = get_required_weekly_change_percentages(
+            target_weights, goal_weights, weeks
+        )
+
+        assert np.isnan(weekly_change_percentages[2])
+        np.testing.assert_allclose(
+            target_weights[:2] * (1 + weekly_change_percentages[:2]) ** weeks[:2],
+            goal_weights[:2],
+        )
+        np.testing.assert_array_equal(
+            get_weeks_to_goal_weights(
+                target_weights[:2], weekly_change_percentages[:2], goal_weights[:2]
+            ),
+            weeks[:2],
+        )
+
+    def test_weeks_between(self):
+        sunday = int(np.datetime64("2023-01-29", "D").astype(np.int64))
+
+        assert get_weeks_between(sunday, sunday - 6) == 0
+        assert get_weeks_between(sunday, sunday + 1) == 1
+        assert get_weeks_between(sunday, sunday + 14) == 2
+
+
+class TestPlanDailyWeights(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.recent_weights = 80000 + np.cumsum(
+            rng.integers(-300, 300, size=(14, 10)), axis=1
+        )
+        self.target_weights = project_weekly_target_weights(
+            target_weights=rng.integers(79000, 81000, size=14),
+            weekly_change_percentages=-0.005,
+            weeks=8,
+            goal_weights=np.full(14, 78000),
+        )
+        self.remaining_days = np.arange(14) % DAYS_PER_WEEK + 1
+
+    def test_weeks_meet_target_weights(self):
+        daily_weights = plan_daily_weights(
+            self.recent_weights, self.target_weights, self.remaining_days
+        )
+
+        assert daily_weights.shape == (14, 8, DAYS_PER_WEEK)
+        for user, remaining in enumerate(self.remaining_days):
+            passed = DAYS_PER_WEEK - remaining
+            assert np.isnan(daily_weights[user, 0, :passed]).all()
+            daily_weights[user, 0, :passed] = self.recent_weights[user, -passed:][
+                :passed
+            ]
+        np.testing.assert_allclose(
+            daily_weights.mean(axis=2), self.target_weights, rtol=1e-9
+        )
+
+    def test_single_users(self):
+        daily_weights = plan_daily_weights(
+            self.recent_weights, self.target_weights, self.remaining_days
+        )
+
+        for user in range(len(self.recent_weights)):
+            np.testing.assert_allclose(
+                daily_weights[user],
+                plan_daily_weights(
+                    self.recent_weights[user : user + 1],
+                    self.target_weights[user : user + 1],
+                    self.remaining_days[user : user + 1],
+                )[0],
+                rtol=1e-12,
+            )
+
+
+class TestDailyWeightPlanner(unittest.TestCase):
+    @mock.patch.dict(os.environ, {"TARGET_WEEKLY_CHANGE_PERCENTAGE": "-0.01"})
+    def test_plan_until_goal_weight(self):
+        # up to Wednesday, 2023-01-25
+        daily_series = DailyWeightSeries(
+            start_day=FIRST_DAY, weights=np.linspace(82000, 80000, 25).round()
+        )
+        df_weekly = pd.DataFrame(
+            {"date": [pd.Timestamp("2023-01-29")], "target_weight_7d": [80000]}
+        )
+
+        df_plan = DailyWeightPlanner(
+            daily_series=daily_series, df_weekly=df_weekly, goal_weight=78000
+        ).calculate()
+
+        assert df_plan.index[0] == pd.Timestamp("2023-01-26")
+        assert df_plan.index[-1] == pd.Timestamp("2023-02-19")
+        np.testing.assert_array_equal(
+            df_plan["target_weight_7d"].resample("W").last(),
+            [80000, 79200, 78408, 78000],
+        )
+
+    def test_plan_until_end_date(self):
+        daily_series = DailyWeightSeries(
+            start_day=FIRST_DAY, weights=np.full(25, 80000)
+        )
+        df_weekly = pd.DataFrame(
+            {"date": [pd.Timestamp("2023-01-29")], "target_weight_7d": [80000]}
+        )
+
+        df_plan = DailyWeightPlanner(
+            daily_series=daily_series,
+            df_weekly=df_weekly,
+            end_date=pd.Timestamp("2023-02-08"),
+        ).calculate()
+
+        assert df_plan.index[-1] == pd.Timestamp("2023-02-12")
+        assert (df_plan["weight"] == 80000).all()
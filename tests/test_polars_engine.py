@@ -0,0 +1,66 @@
+import importlib.util
+import unittest
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from scripts.columns import DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN
+from scripts.process_weight_data import (
+    BACKEND_PANDAS,
+    BACKEND_POLARS,
+    filter_df_to_weekly_changes,
+    get_processing_engine,
+    process_weight_data,
+)
+
+
+class DataFrameCreator:
+    # pylint: disable=too-few-public-methods
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+
+    def get_dataframe(self) -> pd.DataFrame:
+        return self.df
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec("polars") is not None, "polars is not installed"
+)
+class TestPolarsEngine(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # starts on a Wednesday and ends on a Sunday
+        self.df = pd.DataFrame(
+            {WEIGHT_IN_GRAMS_COLUMN: 80000 + np.cumsum(rng.integers(-300, 301, 502))},
+            index=pd.date_range("2023-01-04", periods=502, freq="D", name=DATE_COLUMN),
+        )
+
+    def test_daily_output_matches_pandas(self):
+        pandas_df = process_weight_data(
+            DataFrameCreator(self.df), backend=BACKEND_PANDAS
+        )
+        polars_df = process_weight_data(
+            DataFrameCreator(self.df), backend=BACKEND_POLARS
+        )
+
+        assert list(self.df.columns) == [WEIGHT_IN_GRAMS_COLUMN]
+        assert_frame_equal(polars_df, pandas_df)
+
+    def test_weekly_output_matches_pandas(self):
+        df = process_weight_data(DataFrameCreator(self.df))
+
+        windows = (7, 14)
+        pandas_table = get_processing_engine(BACKEND_PANDAS).create_weekly_table(
+            df, WEIGHT_IN_GRAMS_COLUMN, windows
+        )
+        polars_table = get_processing_engine(BACKEND_POLARS).create_weekly_table(
+            df, WEIGHT_IN_GRAMS_COLUMN, windows
+        )
+
+        assert pandas_table.index[-1] == pd.Timestamp("2024-05-19")
+        assert_frame_equal(polars_table, pandas_table)
+        assert_frame_equal(
+            filter_df_to_weekly_changes(df, backend=BACKEND_POLARS),
+            filter_df_to_weekly_changes(df, backend=BACKEND_PANDAS),
+        )
@@ -0,0 +1,128 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from scripts.predictions import (
+    DAYS_PER_WEEK,
+    forecast_remaining_days_weights,
+    quadratic_spline_interpolation_matrix,
+    truncate_to_grams,
+)
+
+
+def forecast_with_pandas(
+    recent_weights: np.ndarray, target_weight: int, remaining_days: int
+) -> np.ndarray:
+    """
+    The forecast of one user as DailyWeightForecaster computed it before, with pandas.
+    """
+    passed_days = DAYS_PER_WEEK - remaining_days
+    look_back_days = max(2, passed_days)
+    last_weights = recent_weights[-look_back_days:].tolist()
+    target_weight_sum = target_weight * DAYS_PER_WEEK + sum(
+        last_weights[: look_back_days - passed_days]
+    )
+    sums = pd.Series(
+        np.cumsum(last_weights).tolist()
+        + (remaining_days - 1) * [np.nan]
+        + [target_weight_sum],
+        dtype=np.float64,
+    )
+    return sums.interpolate(method="quadratic").diff().tail(remaining_days).to_numpy()
+
+
+class TestForecastRemainingDaysWeights(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.recent_weights = 80000 + np.cumsum(
+            rng.integers(-300, 300, size=(20, 10)), axis=1
+        )
+        self.target_weights = rng.integers(79000, 81000, size=20)
+
+    def test_matches_pandas_quadratic_interpolation(self):
+        for remaining_days in range(1, DAYS_PER_WEEK + 1):
+            forecast = forecast_remaining_days_weights(
+                self.recent_weights, self.target_weights, remaining_days
+            )
+
+            assert forecast.shape == (20, DAYS_PER_WEEK)
+            assert np.isnan(forecast[:, remaining_days:]).all()
+            for user, recent_weights in enumerate(self.recent_weights):
+                np.testing.assert_allclose(
+                    forecast[user, :remaining_days],
+                    forecast_with_pandas(
+                        recent_weights, self.target_weights[user], remaining_days
+                    ),
+                    rtol=0,
+                    atol=1e-6,
+                )
+
+    def test_integer_forecasts_match_pandas_quadratic_interpolation(self):
+        rng = np.random.default_rng(1)
+        recent_weights = 80000 + np.cumsum(
+            rng.integers(-300, 300, size=(500, 10)), axis=1
+        )
+        target_weights = rng.integers(79000, 81000, size=500)
+
+        for remaining_days in range(1, DAYS_PER_WEEK + 1):
+            forecast = truncate_to_grams(
+                forecast_remaining_days_weights(
+                    recent_weights, target_weights, remaining_days
+                )[:, :remaining_days]
+            )
+            for user, user_recent_weights in enumerate(recent_weights):
+                np.testing.assert_array_equal(
+                    forecast[user],
+                    truncate_to_grams(
+                        forecast_with_pandas(
+                            user_recent_weights, target_weights[user], remaining_days
+                        )
+                    ),
+                )
+
+    def test_remaining_days_per_user(self):
+        remaining_days = np.arange(20) % DAYS_PER_WEEK + 1
+
+        forecast = forecast_remaining_days_weights(
+            self.recent_weights, self.target_weights, remaining_days
+        )
+
+        for user, remaining in enumerate(remaining_days):
+            np.testing.assert_allclose(
+                forecast[user],
+                forecast_remaining_days_weights(
+                    self.recent_weights[user : user + 1],
+                    self.target_weights[user : user + 1],
+                    remaining,
+                )[0],
+                rtol=1e-12,
+            )
+
+    def test_week_averages_target_weight(self):
+        # all days of the week remain, so their mean is the target
+        forecast = forecast_remaining_days_weights(
+            self.recent_weights, self.target_weights, DAYS_PER_WEEK
+        )
+
+        np.testing.assert_allclose(forecast.mean(axis=1), self.target_weights)
+
+
+class TestTruncateToGrams(unittest.TestCase):
+    def test_float_noise_is_not_truncated_to_the_gram_below(self):
+        np.testing.assert_array_equal(
+            truncate_to_grams(np.array([78915.99999999997, 78916.0, 78916.9])),
+            [78916, 78916, 78916],
+        )
+
+
+class TestQuadraticSplineInterpolationMatrix(unittest.TestCase):
+    def test_reproduces_quadratic_polynomials(self):
+        x = np.array([0.0, 1.0, 2.0, 3.0, 7.0])
+        x_new = np.array([4.0, 5.0, 6.0])
+
+        matrix = quadratic_spline_interpolation_matrix(x, x_new)
+
+        np.testing.assert_allclose(
+            matrix @ (2 * x**2 - 3 * x + 1), 2 * x_new**2 - 3 * x_new + 1
+        )
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from scripts.accounts import get_account_key
+from scripts.daily_series import DailyWeightSeries
+from scripts.process import (
+    get_goal_text,
+    get_history_start_date,
+    get_plan_text,
+    get_weight_dataframe_creator,
+)
+from scripts.weight_store import WeightStore
+
+# this week ends on Sunday, 2023-01-29
+DF_WEEKLY = pd.DataFrame(
+    {"date": [pd.Timestamp("2023-01-29")], "target_weight_7d": [80000]}
+)
+
+
+class TestGetGoalText(unittest.TestCase):
+    @mock.patch.dict(os.environ, {"TARGET_WEEKLY_CHANGE_PERCENTAGE": "-0.01"})
+    def test_goal_date_and_required_rate(self):
+        text = get_goal_text(
+            DF_WEEKLY, goal_weight=79000, end_date=pd.Timestamp("2023-02-26")
+        )
+
+        assert "goal weight reached in the week until: 2023-02-12" in text
+        assert "weekly change to reach it by 2023-02-26: -0.31%" in text
+
+    @mock.patch.dict(os.environ, {"TARGET_WEEKLY_CHANGE_PERCENTAGE": "0.0"})
+    def test_at_goal_without_change(self):
+        text = get_goal_text(DF_WEEKLY, goal_weight=80000, end_date=None)
+
+        assert "goal weight reached in the week until: 2023-01-29" in text
+
+    @mock.patch.dict(os.environ, {"TARGET_WEEKLY_CHANGE_PERCENTAGE": "-0.01"})
+    def test_no_required_rate_for_end_date_in_this_week(self):
+        text = get_goal_text(
+            DF_WEEKLY, goal_weight=79000, end_date=pd.Timestamp("2023-01-27")
+        )
+
+        assert "goal weight reached" in text
+        assert "weekly change" not in text
+
+
+class TestGetPlanText(unittest.TestCase):
+    def setUp(self):
+        # up to Wednesday, 2023-01-25
+        self.daily_series = DailyWeightSeries(
+            start_day=int(np.datetime64("2023-01-01", "D").astype(np.int64)),
+            weights=np.full(25, 80000),
+        )
+
+    @mock.patch.dict(os.environ, {"TARGET_WEEKLY_CHANGE_PERCENTAGE": "-0.01"})
+    def test_weeks_until_goal(self):
+        text = get_plan_text(
+            self.daily_series, DF_WEEKLY, goal_weight=79000, end_date=None
+        )
+
+        assert "2023-01-29    80000" in text
+        assert "2023-02-05    79200" in text
+        # the plan ends with the week the goal is reached in
+        assert "2023-02-12    79000" in text
+        assert "2023-02-19" not in text
+
+    @mock.patch.dict(os.environ, {"TARGET_WEEKLY_CHANGE_PERCENTAGE": "0.0"})
+    def test_no_plan_if_goal_is_never_reached(self):
+        text = get_plan_text(
+            self.daily_series,
+            DF_WEEKLY,
+            goal_weight=79000,
+            end_date=pd.Timestamp("2023-03-31"),
+        )
+
+        assert text == ""
+
+
+class TestHistoryWindow(unittest.TestCase):
+    def test_get_history_start_date(self):
+        # this week ends on Sunday, 2023-01-29, the week before the first one on 2023-01-08
+        assert get_history_start_date(2, today=date(2023, 1, 25)) == "2022-12-26"
+        assert get_history_start_date(2, today=date(2023, 1, 29)) == "2022-12-26"
+        assert get_history_start_date(2, today=date(2023, 1, 30)) == "2023-01-02"
+
+    def test_weights_of_the_window_are_loaded_from_the_store(self):
+        today = date.today()
+        with tempfile.TemporaryDirectory() as directory:
+            database_file = os.path.join(directory, "weight.sqlite")
+            with WeightStore(database_file) as weight_store:
+                weight_store.upsert_daily_weight_summaries(
+                    user_id=get_account_key("user@example.com"),
+                    summaries=[
+                        {
+                            "summaryDate": (today + timedelta(days=day)).isoformat(),
+                            "allWeightMetrics": [{"weight": 80000 + day}],
+                        }
+                        for day in range(-100, 3)
+                    ],
+                )
+
+            with mock.patch.dict(
+                os.environ,
+                {
+                    "WEIGHT_DATABASE_FILE": database_file,
+                    "GARMIN_EMAIL": "user@example.com",
+                    "WEIGHT_HISTORY_WEEKS": "4",
+                },
+            ):
+                daily_series = get_weight_dataframe_creator().get_daily_series()
+
+        start_day = date.fromisoformat(get_history_start_date(4, today))
+        assert daily_series.days[0] == np.datetime64(start_day, "D").astype(np.int64)
+        # the weigh-ins after today are not part of the window
+        assert daily_series.last_day == np.datetime64(today, "D").astype(np.int64)
+        assert daily_series.weights[-1] == 80000
@@ -1,4 +1,6 @@
+import json
 import os
+import tempfile
 import unittest
 from unittest.mock import patch
 
@@ -8,10 +10,12 @@ from pandas.testing import assert_frame_equal
 from scripts.columns import DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN
 from scripts.dataframe_creator import GarminWeightDataFrameCreator
 from scripts.process_weight_data import (
-    add_moving_average_and_change,
     add_target_weight_change,
+    create_weekly_table,
     filter_df_to_weekly_changes,
+    get_weekly_change_percentages_grid,
     process_weight_data,
+    sweep_target_weights,
 )
 
 
@@ -55,35 +59,41 @@ class TestAddMovingAverageAndChange(unittest.TestCase):
         self.df = pd.DataFrame(data)
         self.df.set_index("date", inplace=True)
 
-    def test_add_moving_average_and_change_7d(self):
-        expected_df = self.df.copy()
-        expected_df["weight_in_grams_7d"] = (
-            expected_df["weight_in_grams"].rolling(window=7).mean()
-        )
-        expected_df["weight_in_grams_7d_weekly"] = (
-            expected_df["weight_in_grams_7d"].resample("W").last()
-        )
-        expected_df["weight_in_grams_7d_weekly_change"] = expected_df[
-            "weight_in_grams_7d_weekly"
-        ].diff(periods=7)
 
-        add_moving_average_and_change(self.df, "weight_in_grams", 7)
-        assert_frame_equal(self.df, expected_df)
+def _add_sparse_weekly_columns(df: pd.DataFrame, window: int) -> None:
+    """
+    The moving average and its weekly values and changes as columns of the daily DataFrame,
+    NaN on all days but Sundays, like the processing computed them before.
+    """
+    column = f"weight_in_grams_{window}d"
+    df[column] = df["weight_in_grams"].rolling(window=window).mean()
+    df[f"{column}_weekly"] = df[column].resample("W").last()
+    df[f"{column}_weekly_change"] = df[f"{column}_weekly"].diff(periods=7)
+
 
-    def test_add_moving_average_and_change_14d(self):
-        expected_df = self.df.copy()
-        expected_df["weight_in_grams_14d"] = (
-            expected_df["weight_in_grams"].rolling(window=14).mean()
+class TestCreateWeeklyTable(unittest.TestCase):
+    def test_matches_sparse_weekly_columns(self):
+        # starts on a Thursday and ends on a Friday
+        df = pd.DataFrame(
+            {"weight_in_grams": [(day * 37) % 101 for day in range(100)]},
+            index=pd.date_range(start="2023-01-05", periods=100, freq="D", name="date"),
         )
-        expected_df["weight_in_grams_14d_weekly"] = (
-            expected_df["weight_in_grams_14d"].resample("W").last()
+        for window in (7, 14):
+            _add_sparse_weekly_columns(df, window)
+        weekly_columns = [
+            "weight_in_grams_7d_weekly",
+            "weight_in_grams_7d_weekly_change",
+            "weight_in_grams_14d_weekly",
+            "weight_in_grams_14d_weekly_change",
+        ]
+        expected_df = df[df.index.dayofweek == 6][weekly_columns]
+
+        result_df = create_weekly_table(
+            df[["weight_in_grams", "weight_in_grams_7d", "weight_in_grams_14d"]]
         )
-        expected_df["weight_in_grams_14d_weekly_change"] = expected_df[
-            "weight_in_grams_14d_weekly"
-        ].diff(periods=7)
 
-        add_moving_average_and_change(self.df, "weight_in_grams", 14)
-        assert_frame_equal(self.df, expected_df)
+        assert result_df.index[-1] == pd.Timestamp("2023-04-09")
+        assert_frame_equal(result_df, expected_df, check_freq=False)
 
 
 class TestProcessWeightData(unittest.TestCase):
@@ -257,6 +267,8 @@ class TestAddTargetWeightChange(unittest.TestCase):
 
         assert "target_weight_change_14d" in result_df.columns
         assert "target_weight_14d" in result_df.columns
+        # the input is not modified
+        assert "target_weight_14d" not in self.df.columns
 
         # for change column, remove last row and cast to int
         change_column = result_df["target_weight_change_14d"][:-1].astype(int)
@@ -264,6 +276,25 @@ class TestAddTargetWeightChange(unittest.TestCase):
 
         assert result_df["target_weight_14d"].tolist() == expected_target_weight
 
+    def test_sweep_target_weights(self):
+        weekly_change_percentages = get_weekly_change_percentages_grid()
+
+        target_weights = sweep_target_weights(
+            self.df, window=14, weekly_change_percentages=weekly_change_percentages
+        )
+
+        assert len(weekly_change_percentages) == 31
+        assert target_weights.shape == (31, len(self.df))
+        for weekly_change_percentage, row in zip(
+            weekly_change_percentages, target_weights, strict=True
+        ):
+            with patch.dict(
+                os.environ,
+                {"TARGET_WEEKLY_CHANGE_PERCENTAGE": str(weekly_change_percentage)},
+            ):
+                result_df = add_target_weight_change(self.df, window=14)
+            assert row.tolist() == result_df["target_weight_14d"].tolist()
+
 
 class TestCreateWeightDataFrame(unittest.TestCase):
     @patch("scripts.dataframe_creator.GarminWeightDataFrameCreator._load_data")
@@ -288,3 +319,29 @@ class TestCreateWeightDataFrame(unittest.TestCase):
         weight_dataframe_creator = GarminWeightDataFrameCreator()
         result_df = weight_dataframe_creator.get_dataframe()
         assert_frame_equal(result_df, expected_df, check_freq=False, check_names=False)
+
+    def test_create_weight_data_frame_streaming(self):
+        data = {
+            "dailyWeightSummaries": [
+                {"summaryDate": "2023-01-01", "allWeightMetrics": [{"weight": 70.4}]},
+                {"summaryDate": "2023-01-03", "allWeightMetrics": [{"weight": 72}]},
+                {"summaryDate": "2023-01-05", "allWeightMetrics": [{"weight": 74}]},
+            ],
+            "totalAverage": {"weight": 72},
+        }
+
+        with tempfile.TemporaryDirectory() as directory:
+            raw_data_file = os.path.join(directory, "weight.json")
+            with open(raw_data_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+
+            with patch("scripts.dataframe_creator.RAW_DATA_FILE", raw_data_file):
+                result_df = GarminWeightDataFrameCreator(streaming=True).get_dataframe()
+
+        with patch(
+            "scripts.dataframe_creator.GarminWeightDataFrameCreator._load_data",
+            return_value=data,
+        ):
+            expected_df = GarminWeightDataFrameCreator().get_dataframe()
+
+        assert_frame_equal(result_df, expected_df)
@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from scripts.columns import DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN
+from scripts.dataframe_creator import create_daily_dataframe
+from scripts.sparse_series import SparseWeightSeries
+
+FIRST_DAY = int(np.datetime64("2023-01-01", "D").astype(np.int64))
+
+
+class TestSparseWeightSeries(unittest.TestCase):
+    def setUp(self):
+        # weigh-ins on 2023-01-01, 01-02, 01-05 and 01-12, then a break until 2023-03-02
+        self.days = FIRST_DAY + np.array([0, 1, 4, 11, 60, 61])
+        self.weights = np.array([70000, 70101, 70400, 70003, 72000, 72100])
+        self.series = SparseWeightSeries(days=self.days, weights=self.weights)
+
+    def test_dataframe_matches_resampling(self):
+        index = pd.DatetimeIndex(
+            self.days.astype("datetime64[D]").astype("datetime64[ns]"),
+            name=DATE_COLUMN,
+        )
+        expected_df = (
+            pd.DataFrame({WEIGHT_IN_GRAMS_COLUMN: self.weights}, index=index)
+            .resample("D")
+            .asfreq()
+        )
+        expected_df[WEIGHT_IN_GRAMS_COLUMN] = (
+            expected_df[WEIGHT_IN_GRAMS_COLUMN]
+            .interpolate(method="linear")
+            .round()
+            .astype(int)
+        )
+
+        assert len(self.series) == 6
+        assert_frame_equal(self.series.to_dataframe(), expected_df)
+
+    def test_window_is_interpolated_like_full_history(self):
+        full_df = self.series.to_dataframe()
+
+        df = self.series.to_dataframe(start_day=FIRST_DAY + 5, end_day=FIRST_DAY + 20)
+
+        assert len(df) == 16
+        assert_frame_equal(df, full_df.iloc[5:21], check_freq=False)
+
+    def test_daily_series_marks_measured_days(self):
+        series = self.series.to_daily_series(end_day=FIRST_DAY + 5)
+
+        assert series.weights.tolist() == [70000, 70101, 70201, 70300, 70400, 70343]
+        assert series.measured.tolist() == [True, True, False, False, True, False]
+
+    def test_gaps(self):
+        assert self.series.get_gaps() == [
+            (FIRST_DAY + 2, 2),
+            (FIRST_DAY + 5, 6),
+            (FIRST_DAY + 12, 48),
+        ]
+        assert self.series.get_gaps(min_days=7) == [(FIRST_DAY + 12, 48)]
+
+    def test_split_at_long_gaps(self):
+        segments = self.series.split(max_interpolated_gap_days=6)
+
+        assert [segment.days.tolist() for segment in segments] == [
+            self.days[:4].tolist(),
+            self.days[4:].tolist(),
+        ]
+        assert self.series.get_last_segment(6).days.tolist() == self.days[4:].tolist()
+        assert self.series.get_last_segment(48) is self.series
+
+    def test_create_daily_dataframe_with_max_interpolated_gap(self):
+        df = create_daily_dataframe(
+            days=self.days, weights=self.weights, max_interpolated_gap_days=30
+        )
+
+        assert df[WEIGHT_IN_GRAMS_COLUMN].tolist() == [72000, 72100]
+        assert df.index[0] == pd.Timestamp("2023-03-02")
+
+    def test_unsorted_days_are_sorted(self):
+        series = SparseWeightSeries(days=self.days[::-1], weights=self.weights[::-1])
+
+        assert series.days.tolist() == self.days.tolist()
+        assert series.weights.tolist() == self.weights.tolist()
+
+    def test_empty_series(self):
+        df = SparseWeightSeries(
+            days=np.array([], dtype=np.int64), weights=np.array([], dtype=np.int64)
+        ).to_dataframe()
+
+        assert df.empty
+        assert df.index.dtype == np.dtype("datetime64[ns]")
@@ -0,0 +1,94 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from scripts.columns import DATE_COLUMN, WEIGHT_IN_GRAMS_COLUMN
+from scripts.trend import KalmanTrendEstimator, add_weekly_trend
+
+
+class TestKalmanTrendEstimator(unittest.TestCase):
+    def test_first_weigh_in_is_estimate(self):
+        estimator = KalmanTrendEstimator(users=2)
+
+        trends = estimator.update(np.array([80000, np.nan]))
+
+        np.testing.assert_array_equal(trends, [80000, np.nan])
+
+    def test_settles_to_exponentially_weighted_moving_average(self):
+        weights = 80000 + np.random.default_rng(0).normal(0, 400, size=200)
+        estimator = KalmanTrendEstimator()
+
+        trends = estimator.estimate(weights[np.newaxis])[0]
+
+        gain = (estimator.variances[0] + estimator.process_variance) / (
+            estimator.variances[0]
+            + estimator.process_variance
+            + estimator.measurement_variance
+        )
+        np.testing.assert_allclose(
+            trends[-1], trends[-2] + gain * (weights[-1] - trends[-2])
+        )
+        assert abs(trends[-1] - 80000) < 400
+
+    def test_missing_days_keep_estimate(self):
+        estimator = KalmanTrendEstimator()
+        estimator.estimate(np.array([[80000.0, 80200.0]]))
+        level, variance = estimator.levels[0], estimator.variances[0]
+
+        trends = estimator.estimate(np.array([[np.nan, np.nan]]))
+
+        np.testing.assert_array_equal(trends[0], [level, level])
+        assert estimator.variances[0] == variance + 2 * estimator.process_variance
+
+    def test_users_are_independent(self):
+        rng = np.random.default_rng(1)
+        weights = 80000 + rng.normal(0, 400, size=(3, 30))
+        weights[rng.random(size=weights.shape) < 0.3] = np.nan
+        weights[:, 0] = 80000
+
+        trends = KalmanTrendEstimator(users=3).estimate(weights)
+
+        for user in range(3):
+            np.testing.assert_array_equal(
+                trends[user],
+                KalmanTrendEstimator().estimate(weights[user : user + 1])[0],
+            )
+
+
+class TestAddWeeklyTrend(unittest.TestCase):
+    def test_weekly_trend(self):
+        df = pd.DataFrame(
+            {WEIGHT_IN_GRAMS_COLUMN: np.full(21, 80000)},
+            index=pd.date_range("2023-01-02", periods=21, freq="D", name=DATE_COLUMN),
+        )
+        df_weekly = pd.DataFrame(index=pd.DatetimeIndex(["2023-01-15", "2023-01-22"]))
+
+        result_df = add_weekly_trend(df_weekly, df)
+
+        assert result_df["weight_in_grams_trend_weekly"].tolist() == [80000, 80000]
+        assert result_df["weight_in_grams_trend_weekly_change"].tolist() == [0, 0]
+        assert df_weekly.columns.empty
+
+    def test_interpolated_days_do_not_update_the_trend(self):
+        # weigh-ins on Mondays only, interpolated in between
+        weights = 80000 - 100 * np.arange(21)
+        measured = np.arange(21) % 7 == 0
+        df = pd.DataFrame(
+            {WEIGHT_IN_GRAMS_COLUMN: weights},
+            index=pd.date_range("2023-01-02", periods=21, freq="D", name=DATE_COLUMN),
+        )
+        df_weekly = pd.DataFrame(index=pd.DatetimeIndex(["2023-01-15", "2023-01-22"]))
+
+        result_df = add_weekly_trend(df_weekly, df, measured=measured)
+
+        trend = KalmanTrendEstimator().estimate(
+            np.where(measured, weights, np.nan)[np.newaxis]
+        )[0]
+        assert result_df["weight_in_grams_trend_weekly"].tolist() == [
+            round(trend[13]),
+            round(trend[20]),
+        ]
+        assert result_df["weight_in_grams_trend_weekly"].tolist() != (
+            add_weekly_trend(df_weekly, df)["weight_in_grams_trend_weekly"].tolist()
+        )
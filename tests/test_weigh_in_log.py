@@ -0,0 +1,131 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from pandas.testing import assert_frame_equal
+
+from scripts.columns import WEIGHT_IN_GRAMS_COLUMN
+from scripts.dataframe_creator import DailyWeightAggregation
+from scripts.outliers import HampelFilter
+from scripts.weigh_in_log import (
+    GarminWeightLogDataFrameCreator,
+    append_weigh_ins,
+    compact,
+    needs_compaction,
+)
+
+
+def _summary(summary_date: str, weight: int) -> dict:
+    return {"summaryDate": summary_date, "allWeightMetrics": [{"weight": weight}]}
+
+
+class TestWeighInLog(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.log_file = os.path.join(directory.name, "weight.jsonl")
+
+        append_weigh_ins(
+            self.log_file,
+            [_summary("2023-01-01", 70), _summary("2023-01-03", 72)],
+            window_start="2023-01-01",
+        )
+        # the weigh-in on 2023-01-03 was edited, the one on 2023-01-05 is new
+        append_weigh_ins(
+            self.log_file,
+            [_summary("2023-01-03", 74), _summary("2023-01-05", 76)],
+            window_start="2023-01-02",
+        )
+
+    def _weights(self) -> list[int]:
+        df = GarminWeightLogDataFrameCreator(self.log_file).get_dataframe()
+        return df[WEIGHT_IN_GRAMS_COLUMN].tolist()
+
+    def test_uncompacted_log(self):
+        assert self._weights() == [70, 72, 74, 75, 76]
+
+    def test_replace_marker_removes_deleted_weigh_ins(self):
+        append_weigh_ins(
+            self.log_file, [_summary("2023-01-03", 74)], window_start="2023-01-03"
+        )
+        assert self._weights() == [70, 72, 74]
+
+    def test_compacted_log_with_tail(self):
+        uncompacted_df = GarminWeightLogDataFrameCreator(self.log_file).get_dataframe()
+
+        compact(self.log_file)
+        with open(self.log_file, "r", encoding="utf-8") as f:
+            assert len(f.readlines()) == 4
+        assert_frame_equal(
+            GarminWeightLogDataFrameCreator(self.log_file).get_dataframe(),
+            uncompacted_df,
+        )
+
+        append_weigh_ins(
+            self.log_file,
+            [_summary("2023-01-05", 80), _summary("2023-01-06", 82)],
+            window_start="2023-01-04",
+        )
+        assert self._weights() == [70, 72, 74, 77, 80, 82]
+
+    def test_incomplete_line_is_ignored_and_truncated(self):
+        with open(self.log_file, "a", encoding="utf-8") as f:
+            f.write('{"summaryDate": "2023-01-0')
+        assert self._weights() == [70, 72, 74, 75, 76]
+
+        append_weigh_ins(
+            self.log_file, [_summary("2023-01-06", 77)], window_start="2023-01-06"
+        )
+        assert self._weights() == [70, 72, 74, 75, 76, 77]
+
+    def test_interrupted_append_is_ignored(self):
+        # a crash after the replace marker and the first record of the window
+        with open(self.log_file, "a", encoding="utf-8") as f:
+            f.write(
+                json.dumps({"replaceFrom": "2023-01-01"})
+                + "\n"
+                + json.dumps(_summary("2023-01-01", 71))
+                + "\n"
+            )
+        assert self._weights() == [70, 72, 74, 75, 76]
+
+        append_weigh_ins(
+            self.log_file, [_summary("2023-01-06", 77)], window_start="2023-01-06"
+        )
+        assert self._weights() == [70, 72, 74, 75, 76, 77]
+
+        compact(self.log_file)
+        assert self._weights() == [70, 72, 74, 75, 76, 77]
+
+    def test_needs_compaction(self):
+        assert needs_compaction(self.log_file, minimum_tail_records=5)
+        assert not needs_compaction(self.log_file, minimum_tail_records=10)
+
+        compact(self.log_file)
+        assert not needs_compaction(self.log_file, minimum_tail_records=1)
+
+    def test_outlier_in_tail_is_filtered_with_compacted_weigh_ins(self):
+        append_weigh_ins(
+            self.log_file,
+            [_summary(f"2023-01-{day:02d}", 80000 + 10 * day) for day in range(1, 21)],
+            window_start="2023-01-01",
+        )
+        compact(self.log_file)
+        # a clothed weigh-in in the tail, followed by a regular one
+        append_weigh_ins(
+            self.log_file,
+            [_summary("2023-01-21", 90000), _summary("2023-01-22", 80220)],
+            window_start="2023-01-21",
+        )
+
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            df = GarminWeightLogDataFrameCreator(
+                self.log_file,
+                aggregation=DailyWeightAggregation(outlier_filter=HampelFilter()),
+            ).get_dataframe()
+
+        assert "2023-01-21: 90000 g" in output.getvalue()
+        assert df[WEIGHT_IN_GRAMS_COLUMN].tolist()[-3:] == [80200, 80210, 80220]
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from pandas.testing import assert_frame_equal
+
+from scripts.columns import WEIGHT_IN_GRAMS_COLUMN
+from scripts.dataframe_creator import create_daily_dataframe
+from scripts.weight_store import SqliteWeightDataFrameCreator, WeightStore
+
+
+def _summary(summary_date: str, weight: float) -> dict:
+    return {"summaryDate": summary_date, "allWeightMetrics": [{"weight": weight}]}
+
+
+class TestWeightStore(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.database_file = os.path.join(directory.name, "weight.sqlite")
+        self.weight_store = WeightStore(self.database_file)
+        self.addCleanup(self.weight_store.close)
+
+        self.weight_store.upsert_daily_weight_summaries(
+            user_id="a",
+            summaries=[
+                _summary("2023-01-01", 70000),
+                _summary("2023-01-03", 70200.4),
+                _summary("2023-01-06", 70500),
+            ],
+        )
+        self.weight_store.upsert_daily_weight_summaries(
+            user_id="b", summaries=[_summary("2023-01-02", 80000)]
+        )
+
+    def test_get_daily_weights(self):
+        days, weights = self.weight_store.get_daily_weights("a")
+
+        assert days.tolist() == [19358, 19360, 19363]
+        assert weights.tolist() == [70000, 70200, 70500]
+        assert self.weight_store.get_user_ids() == ["a", "b"]
+
+    def test_get_daily_weights_in_range(self):
+        days, weights = self.weight_store.get_daily_weights(
+            "a", start_date="2023-01-02", end_date="2023-01-05"
+        )
+
+        assert days.tolist() == [19360]
+        assert weights.tolist() == [70200]
+
+    def test_upsert_updates_existing_days(self):
+        self.weight_store.upsert_daily_weight_summaries(
+            user_id="a", summaries=[_summary("2023-01-03", 70300)]
+        )
+
+        _, weights = self.weight_store.get_daily_weights("a")
+        assert weights.tolist() == [70000, 70300, 70500]
+
+    def test_upsert_replaces_window(self):
+        self.weight_store.upsert_daily_weight_summaries(
+            user_id="a",
+            summaries=[_summary("2023-01-07", 70600)],
+            window_start="2023-01-03",
+        )
+
+        days, _ = self.weight_store.get_daily_weights("a")
+        assert days.tolist() == [19358, 19364]
+        _, weights = self.weight_store.get_daily_weights("b")
+        assert weights.tolist() == [80000]
+
+    def test_dataframe_of_window_matches_full_history(self):
+        days, weights = self.weight_store.get_daily_weights("a")
+        full_df = create_daily_dataframe(days=days, weights=weights)
+
+        df = SqliteWeightDataFrameCreator(
+            database_file=self.database_file, user_id="a", start_date="2023-01-02"
+        ).get_dataframe()
+
+        assert df[WEIGHT_IN_GRAMS_COLUMN].tolist() == [
+            70100,
+            70200,
+            70300,
+            70400,
+            70500,
+        ]
+        assert_frame_equal(df, full_df.iloc[1:], check_freq=False)
+
+    def test_dataframe_of_unknown_user_is_empty(self):
+        df = SqliteWeightDataFrameCreator(
+            database_file=self.database_file, user_id="c"
+        ).get_dataframe()
+
+        assert df.empty
+        assert df.index.dtype == np.dtype("datetime64[ns]")
+
+    def test_dataframe_of_window_interpolates_up_to_its_end(self):
+        days, weights = self.weight_store.get_daily_weights("a")
+        full_df = create_daily_dataframe(days=days, weights=weights)
+
+        df = SqliteWeightDataFrameCreator(
+            database_file=self.database_file,
+            user_id="a",
+            start_date="2023-01-02",
+            end_date="2023-01-04",
+        ).get_dataframe()
+
+        # 2023-01-04 lies between the weigh-ins of 2023-01-03 and 2023-01-06
+        assert df[WEIGHT_IN_GRAMS_COLUMN].tolist() == [70100, 70200, 70300]
+        assert_frame_equal(df, full_df.iloc[1:4], check_freq=False)